@@ -0,0 +1,5 @@
+"""
+STAGE-LEVEL BENCHMARKS OF THE NEIGHBORHOOD CHANGE INDEX ON SYNTHETIC TRACTS.
+
+    python -m benchmarks.run --sizes 1000,10000,100000,1000000 --output results.json
+"""
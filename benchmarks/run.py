@@ -0,0 +1,157 @@
+"""
+TIME EACH STAGE OF THE INDEX AND CHANGE CALCULATIONS ON SYNTHETIC TRACTS.
+
+Stages: z-score, negation, raw score, quantile, equal interval and natural breaks
+classification, change detection, spatial weights and local Moran's I. For every
+stage and size the results record wall time, rows per second and peak memory
+allocated during the stage (traced Python and NumPy allocations of this process;
+Moran's I worker processes are not included). Results are printed as a table and can be saved as JSON.
+
+Two regression checks make the run exit with status 1:
+    --thresholds   MAXIMUM MICROSECONDS PER ROW OF EACH STAGE (benchmarks/thresholds.json)
+    --baseline     A PREVIOUS RESULTS FILE; A STAGE FAILS WHEN IT IS SLOWER THAN THE
+                   BASELINE TIMES --tolerance
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+from benchmarks import synthetic
+from ncindex import change, classify, moran, pipeline, weights, zscore
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+# Stages shorter than this are too noisy to compare against a baseline
+_MINIMUM_COMPARABLE_SECONDS = 0.01
+
+
+# Create function to time one stage, keeping the fastest of several repeats
+def time_stage(stageFunction, repeat):
+    bestSeconds = None
+    peakBytes = 0
+    for attempt in range(repeat):
+        tracemalloc.start()
+        startTime = time.perf_counter()
+        result = stageFunction()
+        seconds = time.perf_counter() - startTime
+        peakBytes = max(peakBytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        bestSeconds = seconds if bestSeconds is None else min(bestSeconds, seconds)
+    return result, bestSeconds, peakBytes
+
+
+# Create function to run every stage for one synthetic size
+def benchmark_size(featureCount, repeat, moranMaxSize, permutations, processes, seed):
+    centroids, indicatorArray, yearFields = synthetic.generate_tracts(featureCount, seed)
+    varList = yearFields["00"]
+    negList = [name + "00" for name in synthetic.NEGATIVE_INDICATORS]
+    results = []
+
+    def record(stageName, stageFunction):
+        result, seconds, peakBytes = time_stage(stageFunction, repeat)
+        results.append({"stage": stageName, "size": featureCount, "seconds": seconds,
+                        "rows_per_second": featureCount / seconds if seconds > 0 else None,
+                        "peak_bytes": peakBytes})
+        return result
+
+    zScores = record("zscore", lambda: [zscore.calculate_zscores(indicatorArray[variable])[2] for variable in varList])
+    signedZScores = record("negation", lambda: [-values if variable in negList else values
+                                                for variable, values in zip(varList, zScores)])
+    rawScores = record("raw_score", lambda: numpy.sum(signedZScores, axis=0))
+    indexValues1 = record("quantile", lambda: classify.quantile_classes(rawScores, 6))
+    record("equal_interval", lambda: classify.equal_interval_classes(rawScores, 6))
+    record("natural_breaks", lambda: classify.natural_breaks_classes(rawScores, 6))
+
+    # The second year's index is set up outside the timed stages
+    laterColumns = pipeline.calculate_index(indicatorArray, yearFields["10"],
+                                            [name + "10" for name in synthetic.NEGATIVE_INDICATORS],
+                                            "10", "Quantile", 6)[0]
+    changeColumns = record("change", lambda: change.calculate_change(indexValues1, laterColumns["INDEX_10"],
+                                                                      "00", "10")[0])
+
+    if featureCount <= moranMaxSize:
+        # weights imports scipy.spatial when it first builds weights; import it here so that
+        # the stage times the build, not the import
+        try:
+            import scipy.spatial
+        except ImportError:
+            pass
+        spatialWeights = record("weights", lambda: weights.inverse_distance_weights(centroids))
+        record("local_morans_i", lambda: moran.local_morans_i(changeColumns["RCLSS_0010"], spatialWeights,
+                                                              permutations, seed, processes))
+    return results
+
+
+# Create function to list the stages that break a per-row threshold or a baseline
+def find_regressions(results, thresholds=None, baseline=None, tolerance=1.5):
+    regressions = []
+    for result in results:
+        stageName, featureCount, seconds = result["stage"], result["size"], result["seconds"]
+        if thresholds and stageName in thresholds and featureCount >= thresholds.get("minimum_size", 0):
+            microsecondsPerRow = 1e6 * seconds / featureCount
+            if microsecondsPerRow > thresholds[stageName]:
+                regressions.append("%s at %d rows: %.3f us/row, threshold %.3f us/row"
+                                   % (stageName, featureCount, microsecondsPerRow, thresholds[stageName]))
+        if baseline:
+            for previous in baseline:
+                if (previous["stage"], previous["size"]) == (stageName, featureCount) and \
+                        seconds > _MINIMUM_COMPARABLE_SECONDS and seconds > tolerance * previous["seconds"]:
+                    regressions.append("%s at %d rows: %.4f s, baseline %.4f s"
+                                       % (stageName, featureCount, seconds, previous["seconds"]))
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the neighborhood change index.")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="feature counts, separated by ','")
+    parser.add_argument("--repeat", type=int, default=3, help="repeats per stage; the fastest is kept")
+    parser.add_argument("--moran-max-size", type=int, default=100000, help="largest size that runs local Moran's I")
+    parser.add_argument("--permutations", type=int, default=99)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes for local Moran's I")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save results as JSON to this file")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="JSON file of maximum microseconds per row")
+    parser.add_argument("--baseline", help="previous JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown against the baseline")
+    options = parser.parse_args(arguments)
+
+    results = []
+    for featureCount in [int(size) for size in options.sizes.split(",")]:
+        results.extend(benchmark_size(featureCount, options.repeat, options.moran_max_size, options.permutations,
+                                      options.processes, options.seed))
+
+    print("%-16s %10s %12s %14s %14s" % ("STAGE", "ROWS", "SECONDS", "ROWS/SECOND", "PEAK MB"))
+    for result in results:
+        print("%-16s %10d %12.5f %14.0f %14.2f" % (result["stage"], result["size"], result["seconds"],
+                                                   result["rows_per_second"] or 0, result["peak_bytes"] / 1e6))
+
+    if options.output:
+        with open(options.output, "w") as outputFile:
+            json.dump({"python": sys.version.split()[0], "numpy": numpy.__version__, "machine": platform.platform(),
+                       "cpu_count": os.cpu_count(), "results": results}, outputFile, indent=2)
+
+    thresholds = None
+    if options.thresholds and os.path.exists(options.thresholds):
+        with open(options.thresholds) as thresholdFile:
+            thresholds = json.load(thresholdFile)
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as baselineFile:
+            baseline = json.load(baselineFile)["results"]
+    regressions = find_regressions(results, thresholds, baseline, options.tolerance)
+    for regression in regressions:
+        print("REGRESSION: " + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+SYNTHETIC TRACTS FOR BENCHMARKING.
+
+Each synthetic tract is a point (its centroid), with indicator columns that are
+correlated with each other and with distance to the middle of the region, so the
+index, its change and its spatial clusters behave like those of real tract data
+rather than pure noise.
+"""
+
+import numpy
+
+# Indicators of a synthetic year, the ones that detract from the score, and their correlation
+INDICATORS = ("POV", "VAC", "INC", "EDU", "OWN")
+NEGATIVE_INDICATORS = ("POV", "VAC")
+CORRELATION = numpy.array([[1.0, 0.6, -0.7, -0.5, -0.4],
+                           [0.6, 1.0, -0.4, -0.3, -0.5],
+                           [-0.7, -0.4, 1.0, 0.6, 0.5],
+                           [-0.5, -0.3, 0.6, 1.0, 0.3],
+                           [-0.4, -0.5, 0.5, 0.3, 1.0]])
+
+
+# Create function to place tract centroids on a jittered grid over a 100 km square; like
+# real tracts they tile the region, so every tract has a few close neighbors
+def tract_centroids(featureCount, random):
+    gridSide = int(numpy.ceil(numpy.sqrt(featureCount)))
+    cellSize = 100000.0 / gridSide
+    cells = random.permutation(gridSide * gridSide)[:featureCount]
+    cellCorners = numpy.column_stack([cells % gridSide, cells // gridSide]) * cellSize
+    return cellCorners + random.uniform(0.2, 0.8, size=(featureCount, 2)) * cellSize
+
+
+# Create function to generate correlated indicator columns for one year
+def indicator_columns(centroids, yearOfData, random, drift=0.0):
+    featureCount = len(centroids)
+    centerDistance = numpy.hypot(*(centroids - centroids.mean(axis=0)).T)
+    standardNormal = random.normal(size=(featureCount, len(INDICATORS))).dot(numpy.linalg.cholesky(CORRELATION).T)
+    # Tracts far from the middle of the region score a little better, plus a drift per year
+    spatialTrend = (centerDistance - centerDistance.mean()) / centerDistance.std()
+    values = standardNormal + 0.5 * spatialTrend[:, None] * numpy.array([-1, -1, 1, 1, 1]) + drift
+    indicatorArray = numpy.zeros(featureCount, dtype=[(name + yearOfData, numpy.float64) for name in INDICATORS])
+    for position, name in enumerate(INDICATORS):
+        indicatorArray[name + yearOfData] = values[:, position]
+    return indicatorArray
+
+
+# Create function to generate a synthetic set of tracts with two years of indicators
+def generate_tracts(featureCount, seed=0, years=("00", "10")):
+    """Return (centroids, indicatorArray, yearFields) for featureCount tracts."""
+    random = numpy.random.RandomState(seed)
+    centroids = tract_centroids(featureCount, random)
+    yearArrays = [indicator_columns(centroids, yearOfData, random, drift=0.1 * position)
+                  for position, yearOfData in enumerate(years)]
+    dtype = [(name, numpy.float64) for yearArray in yearArrays for name in yearArray.dtype.names]
+    indicatorArray = numpy.zeros(featureCount, dtype=dtype)
+    for yearArray in yearArrays:
+        for name in yearArray.dtype.names:
+            indicatorArray[name] = yearArray[name]
+    yearFields = dict((yearOfData, [name + yearOfData for name in INDICATORS]) for yearOfData in years)
+    return centroids, indicatorArray, yearFields
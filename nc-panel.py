@@ -0,0 +1,76 @@
+"""
+THIS SCRIPT CALCULATES THE INDEX OF NEIGHBORHOOD CHANGE FOR SEVERAL YEARS AND COMPARES
+THEM, ALL FROM ONE READ OF THE INPUT SHAPEFILE AND ONE WRITE OF THE OUTPUT SHAPEFILE:
+    1. CALCULATE THE INDEX OF EACH YEAR AS nc-pt1.py DOES (ZSCR, ZNEG, RAWSCR AND INDEX FIELDS)
+    2. CALCULATE THE CHANGE FIELDS OF nc-pt2.py (CHNGE, RCLSS AND RPRT) FOR CONSECUTIVE
+       YEARS OR FOR ALL PAIRS OF YEARS
+    3. COUNT HOW MANY RECORDS MOVED FROM EACH INDEX CLASS TO EACH INDEX CLASS (TRANSITION
+       MATRIX) FOR EVERY PAIR OF YEARS
+
+This replaces running nc-pt1.py once per year and nc-pt2.py once per pair of years.
+
+To create an ArcToolbox tool with which to execute this script, do the following.
+1   In  ArcMap > Catalog > Toolboxes > My Toolboxes, either select an existing toolbox
+    or right-click on My Toolboxes and use New > Toolbox to create (then rename) a new one.
+2   Drag (or use ArcToolbox > Add Toolbox to add) this toolbox to ArcToolbox.
+3   Right-click on the toolbox in ArcToolbox, and use Add > Script to open a dialog box.
+4   In this Add Script dialog box, use Label to name the tool being created, and press Next.
+5   In a new dialog box, browse to the .py file to be invoked by this tool, and press Next.
+6   In the next dialog box, specify the following inputs (using dropdown menus wherever possible)
+    before pressing OK or Finish.
+        DISPLAY NAME                                       DATA TYPE       PROPERTY>DIRECTION>VALUE
+        Input Shapefile                                    Shapefile       Input
+        Indicator fields of each year                      String          Input > (ex. '00: POV00;VAC00 | 10: POV10;VAC10')
+        Output Shapefile                                   Shapefile       Output
+        Indicators that should subtract from index         Field           Input > Type: Optional > MultiValue: Yes > Obtained from Input Shapefile
+        score if high (ex. high vacancy rates)
+        Choose Index Classification Method                 String          Input > Filter: Value List (Quantile, Equal Interval, Natural Breaks)
+        Choose number of classes                           Double          Input
+        Years to compare                                   String          Input > Filter: Value List (Consecutive, All) > Default 'Consecutive'
+        Transition matrix table                            File            Output > Type: Optional > (.csv)
+
+   Outside ArcGIS the tool also runs from the command line without arcpy, taking the
+   parameters above in order ('#' skips an optional one) and reading and writing the
+   shapefiles with NumPy:
+       python nc-panel.py tracts.shp "00: POV00;VAC00 | 10: POV10;VAC10" panel.shp "VAC00;VAC10" Quantile 6
+   Set NCINDEX_BACKEND to 'arcpy' or 'numpy' to choose (see ncindex/backends.py).
+
+   To later revise any of this, right-click to the tool's name and select Properties.
+"""
+
+# Import necessary modules
+import sys, traceback
+from ncindex import backends, panel, tools
+
+# Run only as a script, not when worker processes import this module
+if __name__ == "__main__":
+    # arcpy inside ArcGIS, NumPy for shapefiles on the command line; arcpy is only imported when used
+    backend = backends.choose_backend(sys.argv[1:2])
+    try:
+
+        # Request user inputs, name variables
+        nameOfInputShapefile  = backend.parameter(0)
+        yearFieldsText        = backend.parameter(1)
+        nameOfOutputShapefile = backend.parameter(2)
+        negVariables          = backend.parameter(3)
+        classificationMethod  = backend.parameter(4)
+        classNumber           = backend.parameter(5)
+        pairMode              = backend.parameter(6) or "Consecutive"
+        nameOfTransitionTable = backend.parameter(7)
+
+        yearFields = panel.parse_year_fields(yearFieldsText)  # an ordered mapping of each year to its indicator fields
+        negList = negVariables.split(";")  # indicator fields (of any year) that should detract from raw score
+
+        tools.run_panel_tool(backend, nameOfInputShapefile, yearFields, nameOfOutputShapefile, negList,
+                             classificationMethod, classNumber, pairMode, nameOfTransitionTable)
+
+    except Exception as e:
+        # If unsuccessful, end gracefully by indicating why
+        backend.error('\n' + "Script failed because: \t\t" + str(e))
+        # ... and where
+        exceptionreport = sys.exc_info()[2]
+        fullermessage   = traceback.format_tb(exceptionreport)[-1]
+        backend.error("at this location: \n\n" + fullermessage + "\n")
+        # A failed command-line run exits with an error status
+        if backend.name != "arcpy":
+            sys.exit(1)
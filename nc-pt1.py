@@ -26,370 +26,119 @@ To create an ArcToolbox tool with which to execute this script, do the following
         Output Shapefile                                   Shapefile       Output
         Indicators that should subtract from index         Field           Input > Type: Optional > MultiValue: Yes > Obtained from Input Shapefile
         score if high (ex. high vacancy rates)
-        Choose Index Classification Method                 String          Input > Filter: Value List (Quantile, Equal Interval)
+        Choose Index Classification Method                 String          Input > Filter: Value List (Quantile, Equal Interval, Natural Breaks)
         Choose number of classes                           Double          Input
+        Processing mode                                    String          Input > Type: Optional > Filter: Value List (Standard, Fused, Streaming) > Default 'Standard'
+        Streaming batch size (records)                     Long            Input > Type: Optional > Default 100000
+        Streaming quantile error bound (share of records)  Double          Input > Type: Optional > Default 0.001
+        Calculate index separately for each value of       Field           Input > Type: Optional > Obtained from Input Shapefile
+        (ex. county or metro area field)
+        Stage timing log                                   File            Output > Type: Optional > (.jsonl)
+        Natural breaks sample size (records)               Long            Input > Type: Optional
+        Classification variants                            String          Input > Type: Optional > (ex. 'Quantile 4; Quantile 5; Equal Interval 5')
+        Z-score store folder                               Folder          Input > Type: Optional
+        Columnar output file                               File            Output > Type: Optional > (.parquet, .feather or .npz)
+        Write only the columnar output                     Boolean         Input > Type: Optional > Default unchecked
+        Write results to an attribute table only           Boolean         Input > Type: Optional > Default unchecked
+        (no copy of the geometry)
+
+   The Fused processing mode reads the indicator fields once, calculates every score in
+   memory and writes only the final ZSCR, ZNEG, RAWSCR and INDEX fields in one cursor pass.
+   The Streaming processing mode writes the same fields for inputs too large for memory
+   (parcel level): it reads the indicators in batches, so memory use depends on the batch
+   size, and Quantile and Natural Breaks breaks come from a sketch whose rank error stays
+   within the error bound. Both modes keep the record order of the input shapefile.
+   When a group field is chosen, the z-scores, raw scores and classes are calculated
+   independently within each group (as if every group were its own shapefile), with the
+   groups spread over one worker process per CPU core; the Fused processing mode is used.
+   Natural Breaks are the optimal Jenks breaks of the raw score (ncindex/jenks.py). For
+   very large inputs, give a sample size: the breaks are then calculated from that many
+   randomly sampled raw scores, and the messages report how far (in records, with 95%
+   confidence) each break may be from its rank in the full data.
+   Classification variants are extra (method, number of classes) pairs, each written to
+   its own field named IDX + method letter (Q, E or N) + classes + year (ex. IDXQ4_10)
+   next to INDEX. They are all classified from one sort of the raw score and written in
+   the same cursor pass as INDEX, instead of rerunning the tool for every scheme; the
+   Streaming processing mode does not calculate them.
+   When a z-score store folder is chosen, the Fused processing mode saves each
+   indicator's mean, standard deviation and z-scores there, keyed by the content of
+   the input's attribute table and of the indicator, its name and the year. Later runs
+   read and calculate only the indicators that are new or whose values changed;
+   changing the negated indicators never calculates z-scores again. The Standard and
+   Streaming processing modes, and an index calculated for each group, do not use it.
+   When a columnar output file is chosen, the ZSCR, ZNEG, RAWSCR, INDEX and variant fields
+   are also written to it, as typed binary columns keyed by FID (the record number of each
+   feature, which joins them back to the input's geometry; see ncindex/columnar.py), and the
+   Fused processing mode is used. When only the columnar output is written, the input is
+   not copied and no output shapefile is created. The Streaming processing mode does not
+   write columnar output.
+   When results are written to an attribute table only, the input shapefile is never
+   copied: the fields go to a sidecar table named after the output with '_attr.dbf'
+   (ex. index10_attr.dbf), keyed by INPUT_FID, the FID of each input record, so that it
+   joins back to the input's geometry (see ncindex/sidecar.py). A sidecar that exists
+   already keeps its fields, so the index of several years can be added to one table.
+   The Fused processing mode is used; the Streaming processing mode writes a shapefile.
+   When a stage timing log is chosen, the wall time, record count, records per second and
+   peak memory of every stage are appended to it as JSON lines and listed in the messages
+   (see ncindex/timing.py, which also describes opt-in profiling of chosen stages).
+   Outside ArcGIS the tool also runs from the command line without arcpy, taking the
+   parameters above in order ('#' skips an optional one) and reading and writing the
+   shapefiles with NumPy, so that it starts in well under a second:
+       python nc-pt1.py tracts.shp "POV10;VAC10;INC10" 10 index10.shp "POV10;VAC10" Quantile 6 Fused
+   Set NCINDEX_BACKEND to 'arcpy' or 'numpy' to choose (see ncindex/backends.py); the
+   Standard processing mode needs arcpy, and runs as the Fused processing mode without it.
 
    To later revise any of this, right-click to the tool's name and select Properties.
 """
 
 # Import necessary modules
-import sys, os, string, math, arcpy, traceback
-
-# Allow output file to overwrite any existing file of the same name
-arcpy.env.overwriteOutput = True
-
-try:
-
-    # Request user inputs, name variables
-    nameOfInputShapefile  = arcpy.GetParameterAsText(0)
-    varFields             = arcpy.GetParameterAsText(1)
-    yearOfData            = arcpy.GetParameterAsText(2)
-    nameOfOutputShapefile = arcpy.GetParameterAsText(3)
-    negVariables          = arcpy.GetParameterAsText(4)
-    classificationMethod  = arcpy.GetParameterAsText(5)
-    classNumber           = arcpy.GetParameterAsText(6)
-
-    varList = varFields.split(";")  # a list of all variables for index
-    negList = negVariables.split(";")  # a list of the variables from varList that should be multiplied by -1 to detract from raw score (ie vacancy rate)
-    zScoreList = []  # a list of the variable fields that will count towards raw score (combination of z-scores and some z-scores * -1)
-    nameOfOutputShapefileTemp = nameOfOutputShapefile[:-4] + "_temp.shp"
-
-    # Report input and output files
-    arcpy.AddMessage('\n' + "The input shapefile name is " + nameOfInputShapefile)
-    arcpy.AddMessage("The output shapefile name is " + nameOfOutputShapefile)
-    arcpy.AddMessage("This is an index for year '" + yearOfData)
-    arcpy.AddMessage("The variables used as indicators in the index are " + str(varList) + "\n")
-
-    # Create function to calculate mean (source: http://arcpy.wordpress.com/2012/02/01/calculate-a-mean-value-from-a-field/)
-    def calculate_mean_value(table, field):
-        stats_table = r"in_memory\stats"
-        arcpy.Statistics_analysis(table, stats_table, [[field, "MEAN"]])
-        mean_field = "MEAN_{0}".format(field)
-        cursor = arcpy.SearchCursor(stats_table, "", "", mean_field)
-        row = cursor.next()
-        mean_value = row.getValue(mean_field)
-        del cursor
-        return mean_value
-
-    # Create function to calculate standard deviation
-    def calculate_STD_value(table, field):
-        stats_table = r"in_memory\stats"
-        arcpy.Statistics_analysis(table, stats_table, [[field, "STD"]])
-        STD_field = "STD_{0}".format(field)
-        cursor = arcpy.SearchCursor(stats_table, "", "", STD_field)
-        row = cursor.next()
-        STD_value = row.getValue(STD_field)
-        del cursor
-        return STD_value
-
-    # Create function to calculate range
-    def calculate_range_value(table, field):
-        stats_table = r"in_memory\stats"
-        arcpy.Statistics_analysis(table, stats_table, [[field, "RANGE"]])
-        RNG_field = "RANGE_{0}".format(field)
-        cursor = arcpy.SearchCursor(stats_table, "", "", RNG_field)
-        row = cursor.next()
-        RNG_value = row.getValue(RNG_field)
-        del cursor
-        return RNG_value
-
-    # Create function to calculate minimum value
-    def calculate_MIN_value(table, field):
-        stats_table = r"in_memory\stats"
-        arcpy.Statistics_analysis(table, stats_table, [[field, "MIN"]])
-        MIN_field = "MIN_{0}".format(field)
-        cursor = arcpy.SearchCursor(stats_table, "", "", MIN_field)
-        row = cursor.next()
-        MIN_value = row.getValue(MIN_field)
-        del cursor
-        return MIN_value
-
-    # Create function to calculate count of items
-    def calculate_COUNT_value(table, field):
-        stats_table = r"in_memory\stats"
-        arcpy.Statistics_analysis(table, stats_table, [[field, "COUNT"]])
-        COUNT_field = "COUNT_{0}".format(field)
-        cursor = arcpy.SearchCursor(stats_table, "", "", COUNT_field)
-        row = cursor.next()
-        COUNT_value = row.getValue(COUNT_field)
-        del cursor
-        return COUNT_value
-
-    # Replicate the input shapefile
-    arcpy.Copy_management(nameOfInputShapefile, nameOfOutputShapefileTemp)
-
-    """ STEP ONE: CALCULATE Z-SCORE OF EACH INDICATOR FIELD """
-    # Process each variable in the user-defined variable list
-    for variable in varList:
-        arcpy.AddMessage("Processing: " + variable)
-
-        # Concatenate the list order number to the field name and add a new field called "MEAN"
-        meanName = ("MEAN" + str(varList.index(variable)) + str("_" + yearOfData))
-        arcpy.AddField_management(nameOfOutputShapefileTemp, meanName, "FLOAT", 20, 10)
-
-        # Concatenate the list order number to the field name and add a new field called "STDDEV"
-        stdDevName = ("STDV" + str(varList.index(variable)) + str("_" + yearOfData))
-        arcpy.AddField_management(nameOfOutputShapefileTemp, stdDevName, "FLOAT", 20, 10)
-
-        # Concatenate the list order number to the field name and add another new field called "ZSCORE"
-        zName = ("ZSCR" + str(varList.index(variable)) + str("_" + yearOfData))
-        arcpy.AddField_management(nameOfOutputShapefileTemp, zName, "FLOAT", 20, 10)
-
-        # Create an enumeration of updatable records from the shapefile's attribute table
-        enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefileTemp)
-
-        # Loop through that enumeration, creating mean field column
-        for nextRecord in enumerationOfRecords:
-            # Calculate sample mean
-            mean = (calculate_mean_value(nameOfOutputShapefileTemp, variable))
-            nextRecord.setValue(meanName,mean)
-            enumerationOfRecords.updateRow(nextRecord)
-            # Calculate standard deviation
-            standardDev = (calculate_STD_value(nameOfOutputShapefileTemp, variable))
-            nextRecord.setValue(stdDevName,standardDev)
-            enumerationOfRecords.updateRow(nextRecord)
-            # Retrieve the row value, mean, and standard deviation
-            nextVar   = nextRecord.getValue(variable)
-            nextMean   = nextRecord.getValue(meanName)
-            nextStdDev = nextRecord.getValue(stdDevName)
-            # Calculate and record z-score
-            zScore   = (nextVar - nextMean) / nextStdDev
-            nextRecord.setValue(zName,zScore)
-            enumerationOfRecords.updateRow(nextRecord)
-
-        # add the zscore field name for this variable to the zScoreList
-        zScoreList.append(zName)
-
-        # Delete row and update cursor objects to avoid locking attribute table
-        del nextRecord
-        del enumerationOfRecords
-
-        arcpy.AddMessage("The mean value if this indicator is " + str(mean))
-        arcpy.AddMessage("The standard deviation of this indicator is " + str(standardDev))
-        arcpy.AddMessage("Z-score calculated" + "\n")
-
-
-        """ STEP TWO: MAKE THE ZSCORES OF USER CHOSEN VARIABLES NEGATIVE TO DETRACT FROM SCORE """
-        if variable in negList:
-            # Concatenate the list order number to the field name
-            # Add another new field called "ZNEG"
-            zNegName = ("ZNEG" + str(varList.index(variable)) + str("_" + yearOfData))
-            arcpy.AddField_management(nameOfOutputShapefileTemp, zNegName, "FLOAT", 20, 10)
-
-            # Create an enumeration of updatable records from the shapefile's attribute table
-            enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefileTemp)
-            for nextRecord in enumerationOfRecords:
-                #Multiply z-score by -1
-                nextNeg   = nextRecord.getValue(zName)
-                calcNegZ   = nextNeg * -1
-                nextRecord.setValue(zNegName,calcNegZ)
-                enumerationOfRecords.updateRow(nextRecord)
-
-            # add the zscore field name for the negative variable to the zScoreList, and remove the
-            # regular zscore field name for this same variable from the list
-            zScoreList.append(zNegName)
-            zScoreList.remove(zName)
-
-            # Add message
-            arcpy.AddMessage("Negative of Z-score calculated" + "\n")
-
-            # Delete row and update cursor objects to avoid locking attribute table
-            del nextRecord
-            del enumerationOfRecords
-
-    """ STEP THREE: ADD Z-SCORES TOGETHER FOR RAW INDEX SCORE """
-    arcpy.AddMessage("These fields are used to calculate the z-score: " + str(zScoreList))
-    rawField = ("RAWSCR_" + yearOfData)
-    arcpy.AddField_management(nameOfOutputShapefileTemp, rawField, "FLOAT", 20, 10)
-
-    # Create an enumeration of updatable records from the shapefile's attribute table
-    enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefileTemp)
-
-    # Loop through that enumeration, calculating each record's raw score
-    for nextRecord in enumerationOfRecords:
-        newList = []
-        for i in list(zScoreList):
-            newList.append(nextRecord.getValue(i))
-        rawScore = sum(newList)
-        nextRecord.setValue(rawField,rawScore)
-        enumerationOfRecords.updateRow(nextRecord)
-
-    # Add message
-    arcpy.AddMessage("Raw score calculated" + "\n")
-
-    # Delete row and update cursor objects to avoid locking attribute table
-    del nextRecord
-    del enumerationOfRecords
-
-    rawFieldList = arcpy.ListFields(nameOfOutputShapefileTemp, rawField)
-
-    """ STEP FOUR: DEFINE CLASSIFICATION AND ASSIGN INDEX SCORE """
-    """ STEP 4.01: IF USER CHOOSES QUANTILE CLASSIFICATION """
-    if classificationMethod == "Quantile":
-        arcpy.AddMessage("Calculating index score based on Quantile classification method")
-
-        # Find count of raw score field
-        scoreCount = calculate_COUNT_value(nameOfOutputShapefileTemp, rawField)
-        arcpy.AddMessage("Count of features is " + str(scoreCount))
-
-        # Divide count into specified number of groups to get the size of each classification group
-        # for the quantile classification method
-        groupSize = int(scoreCount) / int(classNumber)
-        groupSizeInt = int(groupSize) #make group size an integer
-        arcpy.AddMessage("Index groups each have " + str(groupSizeInt) + " features in them" + "\n")
-
-        # Create list that that goes from the user specified number of classes to 0
-        # (ex. 6 - 0 for 6 classes)
-        classNumberList = []
-        classNumberList.append(int(classNumber))
-        for n in classNumberList:
-            classNumberList.append(n - 1)
-            if n < 2: break
-
-        # Sort class number list in ascending order
-        classNumberList.sort()
-
-        """ STEP 4.02: ASSIGN INDEX SCORE BASED ON QUANTILE CLASSIFICATION """
-        # Create index field
-        index = ("INDEX_" + yearOfData)
-        arcpy.AddField_management(nameOfOutputShapefileTemp, index, "FLOAT", 20, 10)
-
-        arcpy.AddMessage("Assigning index score to each feature" + "\n")
-
-        # Create index assignment list, which will be 1 - whatever the user chose for
-        # number of classes
-        indexNumberList = []
-        for n in classNumberList:
-            indexNumberList.append(n + 1) # add 1 to make list 1,2,3 etc instead of 0,1,2
-        indexNumberListInter = list(indexNumberList) # make it a list again instead of integers
-        indexNumberListShort = indexNumberListInter[:-1] # remove the last item to get correct ending index number
-
-        # Sort table based on rawField
-        arcpy.Sort_management(nameOfOutputShapefileTemp, nameOfOutputShapefile, [[rawField, "ASCENDING"]])
-
-        # Assign index numbers for sorted rawField
-        # Create an enumeration of updatable records from the shapefile's attribute table
-        enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefile)
-        # Loop through that enumeration, calculating each record's index score
-        b = 0
-        m = 0
-        for nextRecord in enumerationOfRecords:
-            indexScore = indexNumberList[m]
-            nextRecord.setValue(index,indexScore)
-            b = b + 1
-            if b >= groupSizeInt and m <= (len(indexNumberListShort)-1):
-                m = m + 1
-                b = 0
-            if indexScore > (len(indexNumberListShort)):
-                indexScore = indexScore - 1
-                nextRecord.setValue(index,indexScore)
-            enumerationOfRecords.updateRow(nextRecord)
-        # Delete row and update cursor objects to avoid locking attribute table
-        del nextRecord
-        del enumerationOfRecords
-
-        # Delete temporary file
-        arcpy.Delete_management(nameOfOutputShapefileTemp)
-
-    """ STEP 4.03: IF USER CHOOSES EQUAL INTERVAL CLASSIFICATION """
-    if classificationMethod == "Equal Interval":
-        arcpy.AddMessage("Calculating index score based on Equal Interval classification method")
-
-        # Find value range of raw score field
-        scoreRange = calculate_range_value(nameOfOutputShapefileTemp, rawField)
-        arcpy.AddMessage("The range of raw score values is " + str(scoreRange))
-
-        # Divide range into user specified number of groups to get the size of each
-        # classification group for the equal interval classification method
-        groupSize2 = scoreRange / float(classNumber)
-        arcpy.AddMessage("Index groups each have a value range of " + str(groupSize2))
-
-        # Find minimum value of raw score field
-        scoreMin = calculate_MIN_value(nameOfOutputShapefileTemp, rawField)
-        arcpy.AddMessage("The minimum value of the raw score field is " + str(scoreMin) + "\n")
-
-        # Create list that that goes from the user specified number of classes to 0
-        # (ex. 6 - 0) for 6 classes
-        classNumberList = []
-        classNumberList.append(int(classNumber))
-        for n in classNumberList:
-            classNumberList.append(n - 1)
-            if n < 2: break
-
-        # Sort class number list in ascending order and modify so that it specifies
-        # the correct number of break points (ex. 0 - 4)
-        classNumberList.sort()
-        classNumberListFinal = classNumberList[0:-2] # number of break points should be one less than number of classes requested
-
-        # Define break point locations for each classification group in list based
-        # on the groupSize2 variable
-        breakLocationList = []
-        for n in classNumberListFinal:
-            breakLocationList.append(groupSize2 * (n+1))
-
-        # Define value of variable feature at break point locations in list
-        breakValueList = []
-        for n in breakLocationList:
-            breakValueList.append(scoreMin + n)
-
-        """ STEP 4.04: ASSIGN INDEX SCORE BASED ON EQUAL INTERVAL CLASSIFICATION """
-        # Create index field
-        index = ("INDEX_" + yearOfData)
-        arcpy.AddField_management(nameOfOutputShapefileTemp, index, "FLOAT", 20, 10)
-
-        arcpy.AddMessage("Assigning index score to each feature" + "\n")
-
-        # Create other lists and variables needed for the index assignment process
-        classNumberListShort = classNumberListFinal[:-1] # Remove last break point from list
-        final = len(classNumberListShort)
-
-        arcpy.Sort_management(nameOfOutputShapefileTemp, nameOfOutputShapefile, [[rawField, "ASCENDING"]])
-
-        # Assign index numbers for sorted rawField
-        # Create an enumeration of updatable records from the shapefile's attribute table
-        enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefile)
-        # Loop through that enumeration, calculating each record's index score
-        for nextRecord in enumerationOfRecords:
-            for m in classNumberListShort:
-                current = classNumberListShort[m]
-                next = current + 1
-                if nextRecord.getValue(rawField) >= breakValueList[current] and nextRecord.getValue(rawField) < breakValueList[next]:
-                    indexScore = next + 1
-                    nextRecord.setValue(index,indexScore)
-                    enumerationOfRecords.updateRow(nextRecord)
-                elif nextRecord.getValue(rawField) < breakValueList[0]:
-                    indexScore = 1
-                    nextRecord.setValue(index,indexScore)
-                    enumerationOfRecords.updateRow(nextRecord)
-                elif nextRecord.getValue(rawField) >= breakValueList[final]:
-                    indexScore = len(classNumberList)-1
-                    nextRecord.setValue(index,indexScore)
-                    enumerationOfRecords.updateRow(nextRecord)
-                elif m >= len(classNumberListShort): break
-        # Delete row and update cursor objects to avoid locking attribute table
-        del nextRecord
-        del enumerationOfRecords
-
-        # Delete temporary file
-        arcpy.Delete_management(nameOfOutputShapefileTemp)
-
-    """ STEP FIVE: DELETE INTERMEDIATE COLUMNS """
-    # Delete intermediate columns for each variable in the user-defined variable list
-    for variable in varList:
-        arcpy.AddMessage("Deleting intermediate columns for: " + variable)
-
-        # Concatenate the list order number to the field name and delete the field called "MEAN"
-        meanName = ("MEAN" + str(varList.index(variable)) + str("_" + yearOfData))
-        arcpy.DeleteField_management (nameOfOutputShapefile, meanName)
-
-        # Concatenate the list order number to the field name and delete the field called "STDDEV"
-        stdDevName = ("STDV" + str(varList.index(variable)) + str("_" + yearOfData))
-        arcpy.DeleteField_management (nameOfOutputShapefile, stdDevName)
-
-except Exception as e:
-    # If unsuccessful, end gracefully by indicating why
-    arcpy.AddError('\n' + "Script failed because: \t\t" + e.message )
-    # ... and where
-    exceptionreport = sys.exc_info()[2]
-    fullermessage   = traceback.format_tb(exceptionreport)[0]
-    arcpy.AddError("at this location: \n\n" + fullermessage + "\n")
+import sys, traceback
+from ncindex import backends, classify, timing, tools
+
+# Run only as a script, not when worker processes import this module
+if __name__ == "__main__":
+    # arcpy inside ArcGIS, NumPy for shapefiles on the command line; arcpy is only imported when used
+    backend = backends.choose_backend(sys.argv[1:2])
+    try:
+
+        # Request user inputs, name variables
+        nameOfInputShapefile  = backend.parameter(0)
+        varFields             = backend.parameter(1)
+        yearOfData            = backend.parameter(2)
+        nameOfOutputShapefile = backend.parameter(3)
+        negVariables          = backend.parameter(4)
+        classificationMethod  = backend.parameter(5)
+        classNumber           = backend.parameter(6)
+        processingMode        = backend.parameter(7) or "Standard"
+        chunkSize             = int(backend.parameter(8) or 100000)
+        quantileErrorBound    = float(backend.parameter(9) or 0.001)
+        groupField            = backend.parameter(10)
+        timingLog             = backend.parameter(11)
+        breaksSampleSize      = int(backend.parameter(12) or 0) or None
+        variants              = classify.parse_variants(backend.parameter(13))
+        zScoreStoreFolder     = backend.parameter(14)
+        columnarOutput        = backend.parameter(15)
+        columnarOnly          = backend.parameter(16) == "true"
+        attributeOnly         = backend.parameter(17) == "true"
+
+        # Time each stage when a timing log is chosen (or NCINDEX_TIMING / NCINDEX_PROFILE are set)
+        timer = timing.StageRecorder.from_environment(timingLog)
+
+        varList = varFields.split(";")  # a list of all variables for index
+        negList = negVariables.split(";")  # a list of the variables from varList that should be multiplied by -1 to detract from raw score (ie vacancy rate)
+
+        tools.run_index_tool(backend, nameOfInputShapefile, varList, negList, yearOfData, nameOfOutputShapefile,
+                             classificationMethod, classNumber, processingMode, chunkSize, quantileErrorBound,
+                             groupField, breaksSampleSize, variants, zScoreStoreFolder, columnarOutput, columnarOnly,
+                             attributeOnly, timer)
+
+    except Exception as e:
+        # If unsuccessful, end gracefully by indicating why
+        backend.error('\n' + "Script failed because: \t\t" + str(e))
+        # ... and where
+        exceptionreport = sys.exc_info()[2]
+        fullermessage   = traceback.format_tb(exceptionreport)[-1]
+        backend.error("at this location: \n\n" + fullermessage + "\n")
+        # A failed command-line run exits with an error status
+        if backend.name != "arcpy":
+            sys.exit(1)
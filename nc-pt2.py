@@ -15,133 +15,101 @@ To create an ArcToolbox tool with which to execute this script, do the following
 6   In the next dialog box, specify the following inputs (using dropdown menus wherever possible)
     before pressing OK or Finish.
         DISPLAY NAME                                       DATA TYPE       PROPERTY>DIRECTION>VALUE
-        Input Shapefile for year 1 and 2                   Shapefile       Input
+        Input Shapefile for year 1 and 2                   Table View      Input
         Index field for year 1                             Field           Input > Obtained from Input Shapefile for year 1
         Index field for year 2                             Field           Input > Obtained from Input Shapefile for year 2
         2-digit date of year 1                             String          Input > Default '00'
         2-digit date of year 2                             String          Input > Default '10'
         Output Shapefile                                   Shapefile       Output
+        Cluster and outlier analysis engine                String          Input > Type: Optional > Filter: Value List (ArcGIS, Native) > Default 'ArcGIS'
+        Number of permutations                             Long            Input > Type: Optional > Default 499
+        Random seed for permutations                       Long            Input > Type: Optional
+        Distance threshold for neighbors                   Double          Input > Type: Optional
+        Spatial weights cache folder                       Folder          Input > Type: Optional
+        Stage timing log                                   File            Output > Type: Optional > (.jsonl)
+        Columnar output file                               File            Output > Type: Optional > (.parquet, .feather or .npz)
+        Write only the columnar output                     Boolean         Input > Type: Optional > Default unchecked
+        Write results to an attribute table only           Boolean         Input > Type: Optional > Default unchecked
+        (no copy of the geometry)
+        Shapefile with the geometry of the input records   Shapefile       Input > Type: Optional
+
+   The Native engine replaces arcpy.ClustersOutliers_stats with the Local Moran's I in
+   ncindex/moran.py: inverse-distance weights between feature centroids within the
+   distance threshold (by default the smallest distance that gives every feature a
+   neighbor), with conditional permutations spread over one worker process per CPU core.
+   It writes the same LMiIndex, LMiZScore, LMiPValue and COType fields, with LMiIndex
+   scaled as ArcGIS does (by the variance of the other n - 1 features); give a random
+   seed to make the pseudo p-values reproducible. Its spatial weights are saved in the
+   cache folder (by default %NCINDEX_CACHE% or .ncindex\weights in the user's home
+   folder), so later runs on the same tract geometry skip the neighbor search.
+   When a columnar output file is chosen, the CHNGE, RCLSS and RPRT fields (and with the
+   Native engine the LMiIndex, LMiZScore, LMiPValue and COType fields) are also written to
+   it, as typed binary columns keyed by FID (the record number of each feature, which joins
+   them back to the input's geometry; see ncindex/columnar.py). When only the columnar
+   output is written, the Native engine creates no shapefile at all; the ArcGIS engine
+   needs the output shapefiles, so they are still written with it.
+   When results are written to an attribute table only, no shapefile is copied: the
+   change fields (and with the Native engine the cluster and outlier fields) go to a
+   sidecar table named after the output with '_attr.dbf', keyed by INPUT_FID, the FID of
+   each input record (see ncindex/sidecar.py). The input can then be the attribute table
+   written by nc-pt1.py in the same way, with the shapefile it was calculated from given
+   as the geometry shapefile; geometry is only read for the feature centroids of the
+   Native engine. The ArcGIS engine runs on a layer of the geometry joined to the sidecar,
+   so the only geometry written is that of its own output (_SA_rclss).
+   When a stage timing log is chosen, the wall time, record count, records per second and
+   peak memory of every stage are appended to it as JSON lines and listed in the messages.
+   Outside ArcGIS the tool also runs from the command line without arcpy, taking the
+   parameters above in order ('#' skips an optional one) and reading and writing the
+   shapefiles with NumPy, so that it starts in well under a second:
+       python nc-pt2.py index.shp INDEX_00 INDEX_10 00 10 change.shp Native 499 1
+   Set NCINDEX_BACKEND to 'arcpy' or 'numpy' to choose (see ncindex/backends.py); the
+   ArcGIS engine needs arcpy, and the Native engine is used without it.
 
    To later revise any of this, right-click to the tool's name and select Properties.
 """
 
 # Import necessary modules
-import sys, os, string, math, arcpy, traceback
-
-# Allow output file to overwrite any existing file of the same name
-arcpy.env.overwriteOutput = True
-
-try:
-
-    # Request user inputs, name variables
-    nameOfInputShapefile1  = arcpy.GetParameterAsText(0)
-    yearField1             = arcpy.GetParameterAsText(1)
-    yearField2             = arcpy.GetParameterAsText(2)
-    yearOfData1            = arcpy.GetParameterAsText(3)
-    yearOfData2            = arcpy.GetParameterAsText(4)
-    nameOfOutputShapefile  = arcpy.GetParameterAsText(5)
-
-    # Report input and output files
-    arcpy.AddMessage('\n' + "The input shapefile name for year 1 is " + nameOfInputShapefile1)
-
-    arcpy.AddMessage("The output shapefile name is " + nameOfOutputShapefile)
-    arcpy.AddMessage("This is a report for the change in index score for years '" + yearOfData1 + " and '" + yearOfData2 + "\n")
-
-    # Replicate the input shapefile
-    arcpy.Copy_management(nameOfInputShapefile1, nameOfOutputShapefile)
-
-    """ STEP ONE: CALCULATE INDEX CATEGORY SHIFT """
-    # Add a new field called "CHNGE + years of comparison"
-    chngeName = ("CHNGE" + str("_" + yearOfData1) + str(yearOfData2))
-    arcpy.AddField_management(nameOfOutputShapefile, chngeName, "FLOAT", 20, 10)
-
-    # Create an enumeration of updatable records from the shapefile's attribute table
-    enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefile)
-
-    for nextRecord in enumerationOfRecords:
-        #Subtract year 1 value from year 2 value
-        nextYear1   = nextRecord.getValue(yearField1)
-        nextYear2   = nextRecord.getValue(yearField2)
-        indexChange = nextYear2 - nextYear1
-        nextRecord.setValue(chngeName,indexChange)
-        enumerationOfRecords.updateRow(nextRecord)
-
-    # Add message
-    arcpy.AddMessage("Change of index score between years '" + str(yearOfData1) + " and '" + str(yearOfData2) + " calculated")
-
-        # Delete row and update cursor objects to avoid locking attribute table
-    del nextRecord
-    del enumerationOfRecords
-
-    """ STEP TWO: RECLASSIFY POSITIVE CHANGE, NO CHANGE, NEGATIVE CHANGE """
-    # Add a new field called "RCLSS + years of comparison"
-    reclassName = ("RCLSS" + str("_" + yearOfData1) + str(yearOfData2))
-    arcpy.AddField_management(nameOfOutputShapefile, reclassName, "FLOAT", 20, 10)
-
-    # Create an enumeration of updatable records from the shapefile's attribute table
-    enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefile)
-
-    for nextRecord in enumerationOfRecords:
-        #Reclassify values to -1, 0, and 1
-        changeValue   = nextRecord.getValue(chngeName)
-        if changeValue < 0:
-            reclassValue = -1
-            nextRecord.setValue(reclassName,reclassValue)
-            enumerationOfRecords.updateRow(nextRecord)
-        elif changeValue == 0:
-            reclassValue = 0
-            nextRecord.setValue(reclassName,reclassValue)
-            enumerationOfRecords.updateRow(nextRecord)
-        else:
-            reclassValue = 1
-            nextRecord.setValue(reclassName,reclassValue)
-            enumerationOfRecords.updateRow(nextRecord)
-
-    # Add message
-    arcpy.AddMessage("Positive/No/Negative change reclassification between years '" + str(yearOfData1) + " and '" + str(yearOfData2) + " calculated")
-
-        # Delete row and update cursor objects to avoid locking attribute table
-    del nextRecord
-    del enumerationOfRecords
-
-    """ STEP THREE: REPORT INDEX CHANGE IN A STRING """
-    # Add a new field called "RCLSS + years of comparison"
-    reportName = ("RPRT" + str("_" + yearOfData1) + str(yearOfData2))
-    arcpy.AddField_management(nameOfOutputShapefile, reportName, "TEXT")
-
-    # Create an enumeration of updatable records from the shapefile's attribute table
-    enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefile)
-
-    for nextRecord in enumerationOfRecords:
-        #Report index value change
-        yearValue1   = nextRecord.getValue(yearField1)
-        yearValue2   = nextRecord.getValue(yearField2)
-        reportValue  = (str(yearValue1) + " to " + str(yearValue2))
-        nextRecord.setValue(reportName,reportValue)
-        enumerationOfRecords.updateRow(nextRecord)
-
-    # Add message
-    arcpy.AddMessage("Index value change between years '" + str(yearOfData1) + " and '" + str(yearOfData2) + " reported" + "\n")
-
-        # Delete row and update cursor objects to avoid locking attribute table
-    del nextRecord
-    del enumerationOfRecords
-
-    """ STEP FOUR: SPATIAL ANALYSIS """
-    nameOfOutputShapefile2 = nameOfOutputShapefile[:-4] + "_SA"
-
-    # Replicate the output shapefile
-    arcpy.Copy_management(nameOfOutputShapefile, nameOfOutputShapefile2)
-
-    secondOutput = (nameOfOutputShapefile2 + "_rclss")
-    arcpy.ClustersOutliers_stats(nameOfOutputShapefile2, reclassName,secondOutput,
-                             "INVERSE_DISTANCE","EUCLIDEAN_DISTANCE",
-                             "NONE","", "","")
-
-except Exception as e:
-    # If unsuccessful, end gracefully by indicating why
-    arcpy.AddError('\n' + "Script failed because: \t\t" + e.message )
-    # ... and where
-    exceptionreport = sys.exc_info()[2]
-    fullermessage   = traceback.format_tb(exceptionreport)[0]
-    arcpy.AddError("at this location: \n\n" + fullermessage + "\n")
+import sys, traceback
+from ncindex import backends, timing, tools
+
+# Run only as a script, not when worker processes import this module
+if __name__ == "__main__":
+    # arcpy inside ArcGIS, NumPy for shapefiles on the command line; arcpy is only imported when used
+    backend = backends.choose_backend(sys.argv[1:2] + sys.argv[16:17])
+    try:
+
+        # Request user inputs, name variables
+        nameOfInputShapefile1  = backend.parameter(0)
+        yearField1             = backend.parameter(1)
+        yearField2             = backend.parameter(2)
+        yearOfData1            = backend.parameter(3)
+        yearOfData2            = backend.parameter(4)
+        nameOfOutputShapefile  = backend.parameter(5)
+        clusterEngine          = backend.parameter(6) or "ArcGIS"
+        permutations           = int(backend.parameter(7) or 499)
+        randomSeed             = backend.parameter(8)
+        distanceThreshold      = backend.parameter(9)
+        weightsCacheFolder     = backend.parameter(10)
+        timingLog              = backend.parameter(11)
+        columnarOutput         = backend.parameter(12)
+        columnarOnly           = backend.parameter(13) == "true"
+        attributeOnly          = backend.parameter(14) == "true"
+        geometryShapefile      = backend.parameter(15)
+
+        # Time each stage when a timing log is chosen (or NCINDEX_TIMING / NCINDEX_PROFILE are set)
+        timer = timing.StageRecorder.from_environment(timingLog)
+
+        tools.run_change_tool(backend, nameOfInputShapefile1, yearField1, yearField2, yearOfData1, yearOfData2,
+                              nameOfOutputShapefile, clusterEngine, permutations, randomSeed, distanceThreshold,
+                              weightsCacheFolder, columnarOutput, columnarOnly, attributeOnly, geometryShapefile, timer)
+
+    except Exception as e:
+        # If unsuccessful, end gracefully by indicating why
+        backend.error('\n' + "Script failed because: \t\t" + str(e))
+        # ... and where
+        exceptionreport = sys.exc_info()[2]
+        fullermessage   = traceback.format_tb(exceptionreport)[-1]
+        backend.error("at this location: \n\n" + fullermessage + "\n")
+        # A failed command-line run exits with an error status
+        if backend.name != "arcpy":
+            sys.exit(1)
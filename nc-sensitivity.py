@@ -0,0 +1,94 @@
+"""
+THIS SCRIPT MEASURES HOW STABLE EACH RECORD'S INDEX CLASS IS WHEN THE INDEX IS PERTURBED:
+    1. CALCULATE THE INDEX AS nc-pt1.py DOES (INDEX FIELD)
+    2. RECALCULATE IT FOR THOUSANDS OF REPLICATES WITH RANDOMLY WEIGHTED INDICATORS
+       (DIRICHLET WEIGHTS) OR BOOTSTRAPPED INDICATOR STATISTICS, OPTIONALLY WITH NOISE
+    3. RECORD EACH RECORD'S MODAL CLASS OVER THE REPLICATES (MODCLS), THE SHARE OF
+       REPLICATES IN THAT CLASS (PMODE) AND THE SHARE IN ITS OWN INDEX CLASS (PINDEX)
+
+The replicates are calculated together as matrix products rather than as separate
+runs of nc-pt1.py (see ncindex/sensitivity.py).
+
+To create an ArcToolbox tool with which to execute this script, do the following.
+1   In  ArcMap > Catalog > Toolboxes > My Toolboxes, either select an existing toolbox
+    or right-click on My Toolboxes and use New > Toolbox to create (then rename) a new one.
+2   Drag (or use ArcToolbox > Add Toolbox to add) this toolbox to ArcToolbox.
+3   Right-click on the toolbox in ArcToolbox, and use Add > Script to open a dialog box.
+4   In this Add Script dialog box, use Label to name the tool being created, and press Next.
+5   In a new dialog box, browse to the .py file to be invoked by this tool, and press Next.
+6   In the next dialog box, specify the following inputs (using dropdown menus wherever possible)
+    before pressing OK or Finish.
+        DISPLAY NAME                                       DATA TYPE       PROPERTY>DIRECTION>VALUE
+        Input Shapefile                                    Shapefile       Input
+        Fields used as indicators in index                 Field           Input > MultiValue: Yes > Obtained from Input Shapefile
+        2-digit date of variable data                      String          Input > Default '10'
+        Output Shapefile                                   Shapefile       Output
+        Indicators that should subtract from index         Field           Input > Type: Optional > MultiValue: Yes > Obtained from Input Shapefile
+        score if high (ex. high vacancy rates)
+        Choose Index Classification Method                 String          Input > Filter: Value List (Quantile, Equal Interval, Natural Breaks)
+        Choose number of classes                           Double          Input
+        Number of replicates                               Long            Input > Type: Optional > Default 1000
+        Perturbation                                       String          Input > Type: Optional > Filter: Value List (Weights, Bootstrap) > Default 'Weights'
+        Weight concentration (higher = closer to equal)    Double          Input > Type: Optional > Default 10
+        Noise added to each z-score (standard deviations)  Double          Input > Type: Optional > Default 0
+        Random seed                                        Long            Input > Type: Optional
+        Natural breaks sample size (records)               Long            Input > Type: Optional > Default 2000
+
+   With Natural Breaks, every replicate runs its own Jenks optimization. Its breaks are
+   calculated from the given number of randomly sampled raw scores (by default 2000,
+   which keeps 1000 replicates to seconds); the messages report how far, in records
+   with 95% confidence, a sampled break may be from its rank in the full data. A sample
+   size of 0 uses every record, which takes about a second per replicate for 70,000
+   records.
+
+   Outside ArcGIS the tool also runs from the command line without arcpy, taking the
+   parameters above in order ('#' skips an optional one) and reading and writing the
+   shapefiles with NumPy:
+       python nc-sensitivity.py tracts.shp "POV10;VAC10;INC10" 10 stability10.shp "VAC10" Quantile 6 1000
+   Set NCINDEX_BACKEND to 'arcpy' or 'numpy' to choose (see ncindex/backends.py).
+
+   To later revise any of this, right-click to the tool's name and select Properties.
+"""
+
+# Import necessary modules
+import sys, traceback
+from ncindex import backends, sensitivity, tools
+
+# Run only as a script, not when worker processes import this module
+if __name__ == "__main__":
+    # arcpy inside ArcGIS, NumPy for shapefiles on the command line; arcpy is only imported when used
+    backend = backends.choose_backend(sys.argv[1:2])
+    try:
+
+        # Request user inputs, name variables
+        nameOfInputShapefile  = backend.parameter(0)
+        varFields             = backend.parameter(1)
+        yearOfData            = backend.parameter(2)
+        nameOfOutputShapefile = backend.parameter(3)
+        negVariables          = backend.parameter(4)
+        classificationMethod  = backend.parameter(5)
+        classNumber           = backend.parameter(6)
+        replicateCount        = int(backend.parameter(7) or 1000)
+        perturbation          = backend.parameter(8) or "Weights"
+        concentration         = float(backend.parameter(9) or 10)
+        noiseScale            = float(backend.parameter(10) or 0)
+        randomSeed            = backend.parameter(11)
+        breaksSampleSize      = int(backend.parameter(12) or sensitivity.BREAKS_SAMPLE_SIZE) or None
+
+        varList = varFields.split(";")  # a list of all variables for index
+        negList = negVariables.split(";")  # variables from varList that detract from raw score
+
+        tools.run_sensitivity_tool(backend, nameOfInputShapefile, varList, negList, yearOfData, nameOfOutputShapefile,
+                                   classificationMethod, classNumber, replicateCount, perturbation, concentration,
+                                   noiseScale, int(randomSeed) if randomSeed else None, breaksSampleSize)
+
+    except Exception as e:
+        # If unsuccessful, end gracefully by indicating why
+        backend.error('\n' + "Script failed because: \t\t" + str(e))
+        # ... and where
+        exceptionreport = sys.exc_info()[2]
+        fullermessage   = traceback.format_tb(exceptionreport)[-1]
+        backend.error("at this location: \n\n" + fullermessage + "\n")
+        # A failed command-line run exits with an error status
+        if backend.name != "arcpy":
+            sys.exit(1)
@@ -0,0 +1,6 @@
+"""
+SUPPORT MODULES FOR THE NEIGHBORHOOD CHANGE INDEX TOOLS (nc-pt1.py AND nc-pt2.py).
+
+The ArcToolbox scripts import these modules from the folder they live in, so this
+package must stay next to the .py files that the toolbox scripts point to.
+"""
@@ -0,0 +1,72 @@
+"""
+BULK ATTRIBUTE INPUT AND OUTPUT THROUGH ARCPY.
+
+Columns are read into a NumPy structured array with one arcpy.da.TableToNumPyArray
+call, and any number of result columns are written back with one arcpy.da.UpdateCursor
+pass, instead of one arcpy.UpdateCursor pass per field.
+"""
+
+import arcpy
+import numpy
+
+
+# Create function to read the named columns of a table into a structured array
+def read_columns(table, fields):
+    return arcpy.da.TableToNumPyArray(table, list(fields))
+
+
+# Create function to add several fields with the precision and scale the tools use
+def add_fields(table, fieldSpecs):
+    """fieldSpecs is a list of (name, type, precision, scale, length) tuples."""
+    for name, fieldType, precision, scale, length in fieldSpecs:
+        arcpy.AddField_management(table, name, fieldType, precision, scale, length)
+
+
+# Create function to write several columns in a single cursor pass
+def write_columns(table, columns):
+    """columns is an ordered mapping of field name to an array with one value per record."""
+    fieldNames = list(columns.keys())
+    columnValues = [columns[name] for name in fieldNames]
+    with arcpy.da.UpdateCursor(table, fieldNames) as enumerationOfRecords:
+        for recordNumber, nextRecord in enumerate(enumerationOfRecords):
+            enumerationOfRecords.updateRow([values[recordNumber] for values in columnValues])
+
+
+# Create function to count the records of a table without reading them
+def count_rows(table):
+    return int(arcpy.GetCount_management(table).getOutput(0))
+
+
+# Create function to read the named columns in batches of at most chunkSize records
+def read_chunks(table, fields, chunkSize):
+    """Yield two-dimensional float arrays with one column per field."""
+    rows = []
+    with arcpy.da.SearchCursor(table, list(fields)) as enumerationOfRecords:
+        for nextRecord in enumerationOfRecords:
+            rows.append(nextRecord)
+            if len(rows) >= chunkSize:
+                yield numpy.array(rows, dtype=numpy.float64)
+                rows = []
+    if rows:
+        yield numpy.array(rows, dtype=numpy.float64)
+
+
+# Create function to read the centroid (x, y) of every feature into an (n, 2) array
+def read_centroids(featureClass):
+    return arcpy.da.FeatureClassToNumPyArray(featureClass, ["SHAPE@XY"])["SHAPE@XY"]
+
+
+# Create function to join a table to a feature class in a feature layer, keyed by the feature class's FID
+def join_table(featureClass, table, keyField, layerName):
+    """Return the name of the joined layer; no geometry or attributes are copied."""
+    arcpy.MakeFeatureLayer_management(featureClass, layerName)
+    arcpy.AddJoin_management(layerName, arcpy.Describe(featureClass).OIDFieldName, table, keyField, "KEEP_ALL")
+    return layerName
+
+
+# Create function to find the qualified name (table.field) of a field in a joined layer
+def joined_field_name(layer, fieldName):
+    for field in arcpy.ListFields(layer):
+        if field.name.split(".")[-1].upper() == fieldName.upper():
+            return field.name
+    raise ValueError("field " + fieldName + " is not in " + layer)
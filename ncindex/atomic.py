@@ -0,0 +1,48 @@
+"""
+FILES AND FOLDERS WRITTEN UNDER A TEMPORARY NAME, THEN PUT IN PLACE IN ONE STEP.
+
+Readers (and runs that start while another is writing) never see a half-written
+output: a file is written as name + ".partial" and swapped in with replace_file; a
+folder of arrays (the spatial weights cache, the z-score store) is written into a
+temporary folder next to it and renamed with save_entry_folder.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy
+
+
+# Create function to put a finished file in place of another, replacing it if it exists
+def replace_file(partialFile, targetFile):
+    if hasattr(os, "replace"):
+        os.replace(partialFile, targetFile)
+    else:
+        if os.path.exists(targetFile):
+            os.remove(targetFile)
+        os.rename(partialFile, targetFile)
+
+
+# Create function to write a folder of .npy arrays and JSON files atomically
+def save_entry_folder(entryFolder, arrays, jsonFiles, replace=False):
+    """arrays maps each name to an array saved as name.npy, and jsonFiles maps each file
+    name to the content dumped into it. An existing entryFolder is kept unless replace;
+    when another run saves the same entry first, its entry is kept."""
+    parentFolder = os.path.dirname(entryFolder)
+    if not os.path.isdir(parentFolder):
+        os.makedirs(parentFolder)
+    partialEntry = tempfile.mkdtemp(dir=parentFolder)
+    try:
+        for name, values in arrays.items():
+            numpy.save(os.path.join(partialEntry, name + ".npy"), values)
+        for fileName, content in jsonFiles.items():
+            with open(os.path.join(partialEntry, fileName), "w") as jsonFile:
+                json.dump(content, jsonFile)
+        if replace and os.path.isdir(entryFolder):
+            shutil.rmtree(entryFolder, ignore_errors=True)
+        os.rename(partialEntry, entryFolder)
+    except OSError:
+        # Another run saved the same entry first
+        shutil.rmtree(partialEntry, ignore_errors=True)
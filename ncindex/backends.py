@@ -0,0 +1,172 @@
+"""
+ATTRIBUTE INPUT, OUTPUT AND MESSAGES OF THE TOOLS, FROM ARCPY OR WITHOUT IT.
+
+The tools (ncindex/tools.py) read and write tables only through a backend:
+    ArcpyBackend    ARCPY (ncindex/arcio.py): ANY TABLE OR FEATURE CLASS ARCGIS READS,
+                    TOOL PARAMETERS AND MESSAGES OF THE GEOPROCESSING FRAMEWORK
+    NumpyBackend    NO ARCPY: SHAPEFILES AND .dbf TABLES THROUGH ncindex/dbf.py AND
+                    ncindex/shp.py, PARAMETERS FROM THE COMMAND LINE, MESSAGES PRINTED
+arcpy is imported only when an ArcpyBackend is created. Importing and licensing it
+takes several seconds, longer than the whole calculation for a county's tracts, so
+command-line and batch runs on shapefiles start in well under a second without it.
+
+choose_backend picks the backend of a run: the one named in NCINDEX_BACKEND ("arcpy"
+or "numpy") if set; otherwise arcpy inside ArcMap or ArcGIS Pro (or when arcpy is
+already imported), or when an input is not a shapefile or .dbf table; otherwise NumPy.
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+from collections import OrderedDict
+
+from ncindex import dbf, shp
+from ncindex.fields import FLOAT_FIELD
+
+BACKENDS = ("arcpy", "numpy")
+
+# File types the NumPy backend reads
+NUMPY_TABLE_EXTENSIONS = (".shp", ".dbf")
+
+# Files that make up a shapefile, copied along with the .shp
+SHAPEFILE_EXTENSIONS = (".shp", ".shx", ".dbf", ".prj", ".cpg", ".sbn", ".sbx", ".shp.xml")
+
+
+# Create function to copy every file of a shapefile to a new name
+def copy_shapefile(inputShapefile, outputShapefile):
+    inputBase = os.path.splitext(inputShapefile)[0]
+    outputBase = os.path.splitext(outputShapefile)[0]
+    for extension in SHAPEFILE_EXTENSIONS:
+        if os.path.exists(inputBase + extension):
+            shutil.copyfile(inputBase + extension, outputBase + extension)
+
+
+class NumpyBackend(object):
+    """Shapefiles and .dbf tables read and written with NumPy, without arcpy."""
+
+    name = "numpy"
+
+    def __init__(self, arguments=None):
+        self.arguments = list(sys.argv[1:] if arguments is None else arguments)
+
+    # Parameters are the command-line arguments, in the order of the tool's parameters ('#' skips one)
+    def parameter(self, position):
+        value = self.arguments[position] if position < len(self.arguments) else ""
+        return "" if value == "#" else value
+
+    def message(self, text):
+        print(text)
+
+    def warning(self, text):
+        print("WARNING: " + text)
+
+    def error(self, text):
+        print("ERROR: " + text, file=sys.stderr)
+
+    def read_columns(self, table, fields):
+        return dbf.read_columns(table, fields)
+
+    def count_rows(self, table):
+        return dbf.read_header(dbf.dbf_path(table))[0]
+
+    def read_chunks(self, table, fields, chunkSize):
+        return dbf.read_chunks(table, fields, chunkSize)
+
+    def read_centroids(self, featureClass):
+        return shp.read_centroids(featureClass)
+
+    def copy(self, inputTable, outputTable):
+        copy_shapefile(inputTable, outputTable)
+
+    # Create function to add any missing fields and write the columns in one bulk write
+    def write_fields(self, table, columns, fieldSpecs):
+        dbf.write_columns(table, columns, fieldSpecs)
+
+    # Create function to write the Streaming processing mode's fields, batch by batch
+    def write_streaming_scores(self, table, varList, streamingIndex, chunkSize):
+        outputFields = streamingIndex.output_field_names()
+        dbf.add_fields(table, OrderedDict((name, FLOAT_FIELD) for name in outputFields))
+        start = 0
+        for chunkValues in dbf.read_chunks(table, varList, chunkSize):
+            dbf.write_rows(table, start, OrderedDict(zip(outputFields, streamingIndex.score_chunk(chunkValues))))
+            start += len(chunkValues)
+
+
+class ArcpyBackend(object):
+    """Tables and feature classes read and written through arcpy."""
+
+    name = "arcpy"
+
+    def __init__(self):
+        import arcpy
+        from ncindex import arcio
+        self.arcpy = arcpy
+        self.arcio = arcio
+        # Allow output file to overwrite any existing file of the same name
+        arcpy.env.overwriteOutput = True
+
+    def parameter(self, position):
+        return self.arcpy.GetParameterAsText(position)
+
+    def message(self, text):
+        self.arcpy.AddMessage(text)
+
+    def warning(self, text):
+        self.arcpy.AddWarning(text)
+
+    def error(self, text):
+        self.arcpy.AddError(text)
+
+    def read_columns(self, table, fields):
+        return self.arcio.read_columns(table, fields)
+
+    def count_rows(self, table):
+        return self.arcio.count_rows(table)
+
+    def read_chunks(self, table, fields, chunkSize):
+        return self.arcio.read_chunks(table, fields, chunkSize)
+
+    def read_centroids(self, featureClass):
+        return self.arcio.read_centroids(featureClass)
+
+    def copy(self, inputTable, outputTable):
+        self.arcpy.Copy_management(inputTable, outputTable)
+
+    def write_fields(self, table, columns, fieldSpecs):
+        self.arcio.add_fields(table, [(name,) + fieldSpecs[name] for name in columns])
+        self.arcio.write_columns(table, columns)
+
+    def write_streaming_scores(self, table, varList, streamingIndex, chunkSize):
+        outputFields = streamingIndex.output_field_names()
+        self.arcio.add_fields(table, [(name,) + FLOAT_FIELD for name in outputFields])
+        with self.arcpy.da.UpdateCursor(table, varList + outputFields) as enumerationOfRecords:
+            for nextRecord in enumerationOfRecords:
+                inputValues = list(nextRecord[:len(varList)])
+                enumerationOfRecords.updateRow(inputValues + streamingIndex.score_row(inputValues))
+
+    # Create function to run arcpy's Cluster and Outlier Analysis (Anselin Local Moran's I) of one field
+    def clusters_outliers(self, featureClass, fieldName, outputFeatureClass):
+        self.arcpy.ClustersOutliers_stats(featureClass, fieldName, outputFeatureClass,
+                                          "INVERSE_DISTANCE","EUCLIDEAN_DISTANCE",
+                                          "NONE","", "","")
+
+    def join_table(self, featureClass, table, keyField, layerName):
+        return self.arcio.join_table(featureClass, table, keyField, layerName)
+
+    def joined_field_name(self, layer, fieldName):
+        return self.arcio.joined_field_name(layer, fieldName)
+
+
+# Create function to pick the backend of a run from NCINDEX_BACKEND, the application and the input tables
+def choose_backend(tables=()):
+    backendName = os.environ.get("NCINDEX_BACKEND", "").strip().lower()
+    if backendName and backendName not in BACKENDS:
+        raise ValueError("NCINDEX_BACKEND must be one of " + ", ".join(BACKENDS) + ", not " + backendName)
+    if not backendName:
+        # Inside ArcMap/ArcGIS Pro sys.executable is the application, not the Python interpreter
+        insideArcGIS = "arcpy" in sys.modules or not os.path.basename(sys.executable).lower().startswith("python")
+        numpyReadable = all(os.path.splitext(table)[1].lower() in NUMPY_TABLE_EXTENSIONS for table in tables if table)
+        backendName = "arcpy" if insideArcGIS or not numpyReadable else "numpy"
+    return ArcpyBackend() if backendName == "arcpy" else NumpyBackend()
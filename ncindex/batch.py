@@ -0,0 +1,435 @@
+"""
+BATCH RUNNER FOR MANY INDEX AND CHANGE JOBS, WITHOUT ARCPY.
+
+A job file (JSON) lists the jobs of a run:
+
+    {"jobs": [
+        {"name": "index00", "type": "index", "input": "tracts.shp", "output": "index_attr.dbf",
+         "fields": ["POV00", "VAC00", "INC00"], "year": "00", "negative": ["POV00", "VAC00"],
+         "method": "Quantile", "classes": 6},
+        {"name": "index10", "type": "index", "input": "tracts.shp", "output": "index_attr.dbf",
+         "fields": "POV10;VAC10;INC10", "year": "10", "negative": "POV10;VAC10",
+         "variants": "Equal Interval 5", "columnar": "index10.parquet"},
+        {"name": "change", "type": "change", "from": "index00", "to": "index10",
+         "output": "change.parquet"}
+    ]}
+
+    python -m ncindex.batch jobs.json [--workers 4] [--timing stages.jsonl] [--restart]
+
+INDEX JOBS calculate what nc-pt1.py calculates (Fused processing mode). CHANGE JOBS
+calculate the CHNGE, RCLSS and RPRT fields of nc-pt2.py, from the INDEX fields of the
+index jobs named in "from" and "to" (or from "field1" and "field2" of their own
+"input", with "year1" and "year2"). An output is a shapefile (a copy of the input with
+the fields added), a .dbf sidecar table or a .parquet/.feather/.npz file; "columnar"
+adds a columnar file to a shapefile or sidecar output.
+
+The jobs form a graph: a change job runs after the index jobs it compares, a job whose
+input is another job's output runs after it, and jobs writing the same output run in
+the order of the job file. Every distinct input is read once, for the fields of all
+of its jobs, and each indicator's z-scores are calculated once however many jobs use
+them; an input is released when its last job finishes. Jobs whose dependencies are
+finished run together in a pool of worker threads, which share the loaded inputs
+without copying them (the sorts, matrix products and writes that make up a job run
+outside the interpreter lock).
+
+Every finished job is recorded in a state file next to the job file (jobs.json.state).
+Running the same job file again skips the jobs that finished with the same
+definition and whose outputs still exist, so a run that failed resumes where it
+stopped; jobs that depend on a job that runs again run again too. A failed job
+stops only the jobs that depend on it.
+"""
+
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from ncindex import atomic, backends, change, classify, columnar, dbf, jenks, pipeline, sidecar, timing, zscore
+
+JOB_TYPES = ("index", "change")
+
+
+# Create function to accept a list of fields as a JSON list or a ';'-separated string
+def field_list(value):
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(field) for field in value]
+    return [field.strip() for field in str(value).split(";") if field.strip()]
+
+
+# Create function to compare file paths
+def _same_path(path):
+    return os.path.normcase(os.path.abspath(path)) if path else None
+
+
+# Create function to check the jobs of a job file and fill in their defaults
+def load_jobs(jobFile):
+    """Return an ordered mapping of job name to job (a dictionary)."""
+    with open(jobFile) as jobContent:
+        jobSpecs = json.load(jobContent, object_pairs_hook=OrderedDict)
+    jobFolder = os.path.dirname(os.path.abspath(jobFile))
+    jobs = OrderedDict()
+    for position, job in enumerate(jobSpecs["jobs"] if isinstance(jobSpecs, dict) else jobSpecs):
+        job = OrderedDict(job)
+        job.setdefault("name", "job" + str(position + 1))
+        job.setdefault("type", "index")
+        if job["name"] in jobs:
+            raise ValueError("two jobs are named " + job["name"])
+        if job["type"] not in JOB_TYPES:
+            raise ValueError("job " + job["name"] + " has an unknown type: " + str(job["type"]))
+        # Paths are relative to the job file
+        for key in ("input", "output", "columnar"):
+            if job.get(key):
+                job[key] = os.path.join(jobFolder, job[key])
+        if job["type"] == "index":
+            for key in ("input", "output", "fields", "year"):
+                if not job.get(key):
+                    raise ValueError("index job " + job["name"] + " has no " + key)
+            job["fields"] = field_list(job["fields"])
+            job["negative"] = field_list(job.get("negative"))
+            job.setdefault("method", "Quantile")
+            job.setdefault("classes", 6)
+            if job["method"] not in classify.CLASSIFICATION_METHODS:
+                raise ValueError("index job " + job["name"] + " has an unknown method: " + str(job["method"]))
+        else:
+            if not job.get("output"):
+                raise ValueError("change job " + job["name"] + " has no output")
+            if not (job.get("from") and job.get("to")) and not (job.get("input") and job.get("field1") and job.get("field2")):
+                raise ValueError("change job " + job["name"] + " needs 'from' and 'to' jobs, or an input with 'field1' and 'field2'")
+        jobs[job["name"]] = job
+
+    # Index fields and years of change jobs that compare index jobs
+    for job in jobs.values():
+        if job["type"] == "change" and job.get("from"):
+            for key, yearKey in (("from", "year1"), ("to", "year2")):
+                if jobs.get(job[key], {}).get("type") != "index":
+                    raise ValueError("change job " + job["name"] + " compares " + str(job[key]) + ", which is not an index job")
+                job.setdefault(yearKey, jobs[job[key]]["year"])
+            job.setdefault("input", jobs[job["from"]]["input"])
+        job.setdefault("year1", "1")
+        job.setdefault("year2", "2")
+    return jobs
+
+
+# Create function to find the jobs each job must wait for
+def job_dependencies(jobs):
+    """Return (dependencies, dataDependencies), both mapping each job to a list of jobs.
+
+    dataDependencies are the jobs whose results a job uses (the jobs it compares, the
+    job that writes its input, and the jobs it is told to run after); dependencies
+    also include the earlier jobs writing the same output, which only set the order.
+    """
+    dependencies = OrderedDict((name, []) for name in jobs)
+    dataDependencies = OrderedDict((name, []) for name in jobs)
+    names = list(jobs)
+    for position, name in enumerate(names):
+        job = jobs[name]
+        if job["type"] == "change" and job.get("from"):
+            dataDependencies[name].extend([job["from"], job["to"]])
+        jobOutputs = set([_same_path(job.get("output")), _same_path(job.get("columnar"))]) - set([None])
+        for earlierName in names[:position]:
+            earlierJob = jobs[earlierName]
+            earlierOutputs = set([_same_path(earlierJob.get("output")), _same_path(earlierJob.get("columnar"))]) - set([None])
+            if _same_path(job.get("input")) in earlierOutputs:
+                dataDependencies[name].append(earlierName)
+            elif earlierOutputs & jobOutputs:
+                dependencies[name].append(earlierName)
+        for dependency in job.get("after", []):
+            if dependency not in jobs:
+                raise ValueError("job " + name + " runs after " + dependency + ", which is not a job")
+            dataDependencies[name].append(dependency)
+        dataDependencies[name] = list(OrderedDict.fromkeys(dataDependencies[name]))
+        dependencies[name] = list(OrderedDict.fromkeys(dataDependencies[name] + dependencies[name]))
+    return dependencies, dataDependencies
+
+
+# Create function to order the jobs so that every job comes after its dependencies
+def job_order(dependencies):
+    order = []
+    state = {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError("the jobs depend on each other in a cycle: " + " -> ".join(path + [name]))
+        state[name] = "visiting"
+        for dependency in dependencies[name]:
+            visit(dependency, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in dependencies:
+        visit(name, [])
+    return order
+
+
+# Create function to fingerprint a job's definition
+def job_signature(job):
+    return hashlib.sha1(json.dumps(job, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class InputCache(object):
+    """Inputs read once for all of their jobs, with each indicator's z-scores calculated once."""
+
+    def __init__(self, jobs, jobNames):
+        self.fieldsByInput = OrderedDict()
+        self.remainingJobs = {}
+        self.jobInputs = {}
+        for name in jobNames:
+            job = jobs[name]
+            fields = job["fields"] if job["type"] == "index" else ([] if job.get("from") else [job["field1"], job["field2"]])
+            if fields:
+                inputKey = _same_path(job["input"])
+                self.fieldsByInput.setdefault(inputKey, OrderedDict()).update((field, None) for field in fields)
+                self.remainingJobs[inputKey] = self.remainingJobs.get(inputKey, 0) + 1
+                self.jobInputs[name] = inputKey
+        self.arrays = {}
+        self.zScoreResults = {}
+        self.locks = dict((inputKey, threading.Lock()) for inputKey in self.fieldsByInput)
+
+    # Return the columns of an input, reading every field its jobs need on first use
+    def columns(self, inputTable, timer, stagePrefix=""):
+        inputKey = _same_path(inputTable)
+        with self.locks[inputKey]:
+            if inputKey not in self.arrays:
+                # Fields missing from the input fail only the jobs that use them
+                tableFields = set(field.name.upper() for field in dbf.read_header(dbf.dbf_path(inputTable))[3])
+                with timer.stage(stagePrefix + "READ " + os.path.basename(inputTable)):
+                    self.arrays[inputKey] = dbf.read_columns(inputTable, [field for field in self.fieldsByInput[inputKey]
+                                                                          if field.upper() in tableFields])
+                self.zScoreResults[inputKey] = {}
+            return self.arrays[inputKey]
+
+    # Return (mean, standard deviation, z-scores) of every field, calculating each once
+    def zscores(self, inputTable, varList, timer, stagePrefix=""):
+        indicatorArray = self.columns(inputTable, timer, stagePrefix)
+        inputKey = _same_path(inputTable)
+        with self.locks[inputKey]:
+            results = self.zScoreResults[inputKey]
+            newFields = [variable for variable in varList if variable not in results]
+            for variable in newFields:
+                if variable not in indicatorArray.dtype.names:
+                    raise ValueError("field " + variable + " is not in " + inputTable)
+            if newFields:
+                with timer.stage(stagePrefix + "Z-SCORES", len(indicatorArray)):
+                    for variable in newFields:
+                        results[variable] = zscore.calculate_zscores(indicatorArray[variable])
+            return OrderedDict((variable, results[variable]) for variable in varList)
+
+    # Release the input of a job once the input's last job has finished
+    def finish(self, jobName):
+        inputKey = self.jobInputs.get(jobName)
+        if inputKey is None:
+            return
+        with self.locks[inputKey]:
+            self.remainingJobs[inputKey] -= 1
+            if self.remainingJobs[inputKey] == 0:
+                self.arrays.pop(inputKey, None)
+                self.zScoreResults.pop(inputKey, None)
+
+
+# Create function to read the INDEX field written by a finished index job
+def read_index(job):
+    indexName = "INDEX_" + job["year"]
+    if job.get("columnar"):
+        return columnar.read_columns(job["columnar"])[indexName]
+    if os.path.splitext(job["output"])[1].lower() in columnar.COLUMNAR_FORMATS:
+        return columnar.read_columns(job["output"])[indexName]
+    return dbf.read_columns(job["output"], [indexName])[indexName]
+
+
+class BatchRunner(object):
+    """Runs the jobs of a job file in dependency order, resuming from its state file."""
+
+    def __init__(self, jobFile, workers=1, timingLog=None, restart=False, log=print):
+        self.jobs = load_jobs(jobFile)
+        self.dependencies, self.dataDependencies = job_dependencies(self.jobs)
+        self.order = job_order(self.dependencies)
+        self.workers = max(int(workers), 1)
+        self.timingLog = timingLog
+        self.log = log
+        self.stateFile = jobFile + ".state"
+        self.state = {} if restart else self._load_state()
+        self.indexResults = {}
+        self.results = OrderedDict()
+
+    def _load_state(self):
+        if not os.path.exists(self.stateFile):
+            return {}
+        with open(self.stateFile) as stateContent:
+            return json.load(stateContent)
+
+    def _save_state(self):
+        partialFile = self.stateFile + ".partial"
+        with open(partialFile, "w") as stateContent:
+            json.dump(self.state, stateContent, indent=1)
+        atomic.replace_file(partialFile, self.stateFile)
+
+    # Create function to list the jobs that must run: changed or unfinished jobs, and everything after them
+    def jobs_to_run(self):
+        toRun = []
+        for name in self.order:
+            job = self.jobs[name]
+            finished = self.state.get(name, {}).get("signature") == job_signature(job)
+            outputsExist = all(os.path.exists(dbf.dbf_path(path) if path.lower().endswith((".shp", ".dbf")) else path)
+                               for path in [job["output"], job.get("columnar")] if path)
+            if not (finished and outputsExist) or any(dependency in toRun for dependency in self.dataDependencies[name]):
+                toRun.append(name)
+        return toRun
+
+    def _run_index(self, job, inputCache, timer):
+        stagePrefix = job["name"] + ": "
+        zScoreResults = inputCache.zscores(job["input"], job["fields"], timer, stagePrefix)
+        with timer.stage(stagePrefix + "INDEX", len(zScoreResults[job["fields"][0]][2])):
+            outputColumns, statistics, naturalBreaks = pipeline.combine_index(
+                zScoreResults, job["fields"], job["negative"], job["year"], job["method"], job["classes"],
+                job.get("sampleSize"), classify.parse_variants(job.get("variants", "")))
+        if naturalBreaks is not None:
+            for breaksMessage in jenks.breaks_messages(naturalBreaks):
+                self.log(job["name"] + ": " + breaksMessage)
+        self._write(job, outputColumns, timer, stagePrefix)
+        self.indexResults[job["name"]] = outputColumns["INDEX_" + job["year"]]
+
+    def _run_change(self, job, inputCache, timer):
+        stagePrefix = job["name"] + ": "
+        if job.get("from"):
+            indexValues = [self.indexResults[name] if name in self.indexResults else read_index(self.jobs[name])
+                           for name in (job["from"], job["to"])]
+        else:
+            indexArray = inputCache.columns(job["input"], timer, stagePrefix)
+            for field in (job["field1"], job["field2"]):
+                if field not in indexArray.dtype.names:
+                    raise ValueError("field " + field + " is not in " + job["input"])
+            indexValues = [indexArray[job["field1"]], indexArray[job["field2"]]]
+        with timer.stage(stagePrefix + "CHANGE", len(indexValues[0])):
+            changeColumns, reportCodes, reportLabels = change.calculate_change(indexValues[0], indexValues[1],
+                                                                               job["year1"], job["year2"])
+        self._write(job, changeColumns, timer, stagePrefix)
+
+    # Create function to write a job's columns to its columnar file, sidecar table or copy of the input
+    def _write(self, job, outputColumns, timer, stagePrefix):
+        recordCount = len(next(iter(outputColumns.values())))
+        output = job["output"]
+        columnarOutput = os.path.splitext(output)[1].lower() in columnar.COLUMNAR_FORMATS
+        for columnarFile in [output if columnarOutput else None, job.get("columnar")]:
+            if columnarFile:
+                with timer.stage(stagePrefix + "COLUMNAR WRITE", recordCount):
+                    columnar.write_columns(columnarFile, outputColumns)
+        if columnarOutput:
+            return
+        if output.lower().endswith(".dbf"):
+            with timer.stage(stagePrefix + "SIDECAR WRITE", recordCount):
+                sidecar.write_sidecar(output, outputColumns)
+        else:
+            with timer.stage(stagePrefix + "COPY INPUT"):
+                backends.copy_shapefile(job["input"], output)
+            with timer.stage(stagePrefix + "WRITE", recordCount):
+                dbf.write_columns(output, outputColumns, dbf.column_field_specs(outputColumns))
+
+    # Create function to run one job, returning (name, error text or None, timer)
+    def _run_job(self, name, inputCache):
+        job = self.jobs[name]
+        timer = timing.StageRecorder(True, self.timingLog)
+        startTime = time.time()
+        try:
+            if job["type"] == "index":
+                self._run_index(job, inputCache, timer)
+            else:
+                self._run_change(job, inputCache, timer)
+            error = None
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            inputCache.finish(name)
+        return name, error, time.time() - startTime, timer
+
+    def run(self):
+        """Run every job that must run; return an ordered mapping of job name to result."""
+        toRun = self.jobs_to_run()
+        for name in self.order:
+            if name not in toRun:
+                self.results[name] = {"status": "skipped", "seconds": self.state[name].get("seconds")}
+                self.log("Skipping " + name + " (finished in an earlier run)")
+        inputCache = InputCache(self.jobs, toRun)
+        finishedJobs = queue.Queue()
+        waiting = list(toRun)
+        runningCount = 0
+        pool = ThreadPool(self.workers)
+        try:
+            while waiting or runningCount:
+                for name in list(waiting):
+                    blocking = [dependency for dependency in self.dependencies[name]
+                                if self.results.get(dependency, {}).get("status") not in ("finished", "skipped")]
+                    failedDependencies = [dependency for dependency in blocking
+                                          if self.results.get(dependency, {}).get("status") in ("failed", "blocked")]
+                    if any(dependency in self.dataDependencies[name] for dependency in failedDependencies):
+                        waiting.remove(name)
+                        inputCache.finish(name)
+                        self.results[name] = {"status": "blocked", "seconds": None}
+                        self.log("Not running " + name + ": a job it depends on failed")
+                    elif len(failedDependencies) == len(blocking):
+                        waiting.remove(name)
+                        runningCount += 1
+                        self.log("Running " + name)
+                        pool.apply_async(self._run_job, (name, inputCache), callback=finishedJobs.put)
+                if not runningCount:
+                    continue
+                name, error, seconds, timer = finishedJobs.get()
+                runningCount -= 1
+                stagePeaks = [stageRecord["peak_rss_bytes"] for stageRecord in timer.records if stageRecord["peak_rss_bytes"]]
+                if error:
+                    self.results[name] = {"status": "failed", "seconds": seconds, "error": error}
+                    self.log("Job " + name + " failed after " + "%.3f" % seconds + " seconds:\n" + error)
+                else:
+                    self.results[name] = {"status": "finished", "seconds": seconds,
+                                          "peak_rss_bytes": max(stagePeaks) if stagePeaks else None}
+                    self.state[name] = {"signature": job_signature(self.jobs[name]), "seconds": seconds}
+                    self._save_state()
+                    self.log("Finished " + name + " in " + "%.3f" % seconds + " seconds")
+        finally:
+            pool.close()
+            pool.join()
+        return self.results
+
+    def summary(self):
+        lines = ["%-30s %-10s %10s %12s" % ("JOB", "STATUS", "SECONDS", "PEAK MB")]
+        for name in self.order:
+            result = self.results.get(name, {})
+            lines.append("%-30s %-10s %10s %12s" % (
+                name[:30], result.get("status", ""),
+                "" if result.get("seconds") is None else "%.3f" % result["seconds"],
+                "" if not result.get("peak_rss_bytes") else "%.1f" % (result["peak_rss_bytes"] / 1e6)))
+        return "\n".join(lines)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Run the index and change jobs of a job file.")
+    parser.add_argument("jobs", help="job file (JSON)")
+    parser.add_argument("--workers", type=int, default=1, help="jobs run at the same time")
+    parser.add_argument("--timing", help="append the timing of every stage of every job to this JSON lines file")
+    parser.add_argument("--restart", action="store_true", help="run every job, ignoring the state of earlier runs")
+    options = parser.parse_args(arguments)
+
+    runner = BatchRunner(options.jobs, options.workers, options.timing, options.restart)
+    results = runner.run()
+    print(runner.summary())
+    return 1 if any(result["status"] in ("failed", "blocked") for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+CHANGE IN INDEX CLASS BETWEEN TWO YEARS, CALCULATED IN ONE VECTORIZED PASS.
+
+From the INDEX arrays of year 1 and year 2 this produces the three fields of nc-pt2.py:
+    CHNGE_   HOW MANY CLASSES THE INDEX SHIFTED (YEAR 2 - YEAR 1)
+    RCLSS_   -1 FOR NEGATIVE CHANGE, 0 FOR NO CHANGE, 1 FOR POSITIVE CHANGE
+    RPRT_    WHICH CLASS TO WHICH CLASS THE RECORD MOVED (I.E. "6.0 TO 5.0")
+The report is dictionary-encoded: with k classes there are at most k * k distinct
+reports, so each record gets a small integer code and the label strings are built
+once per code, not once per record.
+"""
+
+from collections import OrderedDict
+
+import numpy
+
+
+# Create function to name the change fields of a pair of years
+def change_field_names(yearOfData1, yearOfData2):
+    years = "_" + yearOfData1 + yearOfData2
+    return "CHNGE" + years, "RCLSS" + years, "RPRT" + years
+
+
+# Create function to give every record a report code and build the label of each code
+def encode_report(indexValues1, indexValues2):
+    """Return (reportCodes, reportLabels); reportLabels[reportCodes] is the report of each record."""
+    classes1, classCodes1 = numpy.unique(indexValues1, return_inverse=True)
+    classes2, classCodes2 = numpy.unique(indexValues2, return_inverse=True)
+    pairCodes, reportCodes = numpy.unique(classCodes1.ravel() * len(classes2) + classCodes2.ravel(),
+                                          return_inverse=True)
+    # Labels read like str() of the FLOAT index values, as the cursor version wrote them
+    reportLabels = numpy.array([str(float(classes1[pairCode // len(classes2)])) + " to " +
+                                str(float(classes2[pairCode % len(classes2)])) for pairCode in pairCodes])
+    return reportCodes.ravel(), reportLabels
+
+
+# Create function to calculate the change, reclassification and report of every record
+def calculate_change(indexValues1, indexValues2, yearOfData1, yearOfData2):
+    """Return (columns, reportCodes, reportLabels).
+
+    columns is an ordered mapping of the CHNGE_, RCLSS_ and RPRT_ field names to arrays.
+    """
+    indexValues1 = numpy.asarray(indexValues1, dtype=numpy.float64)
+    indexValues2 = numpy.asarray(indexValues2, dtype=numpy.float64)
+    chngeName, reclassName, reportName = change_field_names(yearOfData1, yearOfData2)
+
+    """ STEP ONE: INDEX CATEGORY SHIFT """
+    indexChange = indexValues2 - indexValues1
+
+    """ STEP TWO: POSITIVE CHANGE, NO CHANGE, NEGATIVE CHANGE """
+    reclassValues = numpy.where(indexChange < 0, -1.0, numpy.where(indexChange == 0, 0.0, 1.0))
+
+    """ STEP THREE: REPORT OF INDEX CHANGE """
+    reportCodes, reportLabels = encode_report(indexValues1, indexValues2)
+
+    columns = OrderedDict([(chngeName, indexChange), (reclassName, reclassValues),
+                           (reportName, reportLabels[reportCodes])])
+    return columns, reportCodes, reportLabels
@@ -0,0 +1,150 @@
+"""
+VECTORIZED INDEX CLASSIFICATION OF RAW SCORES.
+
+The classifiers take the RAWSCR array and return the index class (1 to the number of
+classes) of every record in the order the records were given, so the attribute table
+never has to be sorted or copied to assign classes:
+    QUANTILE        EACH RECORD'S RANK COMES FROM ONE STABLE ARGSORT; EVERY CLASS HOLDS
+                    int(count / classes) RECORDS AND THE REMAINDER JOINS THE TOP CLASS
+    EQUAL INTERVAL  EACH RECORD'S CLASS IS A BINARY SEARCH OF ITS RAW SCORE AGAINST THE
+                    BREAK VALUES; A SCORE EQUAL TO A BREAK VALUE MOVES UP A CLASS
+    NATURAL BREAKS  THE JENKS BREAKS OF ncindex/jenks.py (OPTIONALLY FROM A SAMPLE OF THE
+                    RAW SCORES), THEN THE SAME BINARY SEARCH AS EQUAL INTERVAL
+
+Several variants (method and number of classes) can be classified together from one
+sort of the raw scores: every Quantile variant uses the same ranks, every Equal
+Interval variant the same minimum and maximum, and every Natural Breaks variant one
+run of the Jenks dynamic program up to the largest number of classes.
+"""
+
+import numpy
+
+from ncindex import jenks
+
+CLASSIFICATION_METHODS = ("Quantile", "Equal Interval", "Natural Breaks")
+
+# Letter of each method in the field names of classification variants
+VARIANT_CODES = {"Quantile": "Q", "Equal Interval": "E", "Natural Breaks": "N"}
+
+
+# Create function to rank records by raw score, keeping ties in record order
+def rank_scores(rawScores):
+    sortOrder = numpy.argsort(rawScores, kind="mergesort")
+    ranks = numpy.empty(len(rawScores), dtype=numpy.int64)
+    ranks[sortOrder] = numpy.arange(len(rawScores))
+    return ranks
+
+
+# Create function to find the number of records in each quantile group
+def quantile_group_size(scoreCount, classNumber):
+    return max(int(scoreCount) // int(float(classNumber)), 1)
+
+
+# Create function to assign quantile classes
+def quantile_classes(rawScores, classNumber):
+    classNumber = int(float(classNumber))
+    groupSize = quantile_group_size(len(rawScores), classNumber)
+    return numpy.minimum(rank_scores(rawScores) // groupSize + 1, classNumber).astype(numpy.float64)
+
+
+# Create function to find the break values of the equal interval classification
+def equal_interval_breaks(rawScores, classNumber):
+    classNumber = int(float(classNumber))
+    scoreMin = rawScores.min()
+    groupSize = (rawScores.max() - scoreMin) / float(classNumber)
+    return scoreMin + groupSize * numpy.arange(1, classNumber)
+
+
+# Create function to assign classes by binary search against ascending break values
+def classes_from_breaks(rawScores, breakValues):
+    return (numpy.searchsorted(breakValues, rawScores, side="right") + 1).astype(numpy.float64)
+
+
+# Create function to assign equal interval classes
+def equal_interval_classes(rawScores, classNumber):
+    return classes_from_breaks(rawScores, equal_interval_breaks(rawScores, classNumber))
+
+
+# Create function to assign natural breaks classes
+def natural_breaks_classes(rawScores, classNumber, sampleSize=None):
+    return classes_from_breaks(rawScores, jenks.natural_breaks(rawScores, classNumber, sampleSize).breakValues)
+
+
+# Create function to classify raw scores with the method the user chose; sampleSize only
+# applies to natural breaks, whose breaks then come from that many sampled raw scores
+def classify_scores(rawScores, classificationMethod, classNumber, sampleSize=None):
+    rawScores = numpy.asarray(rawScores, dtype=numpy.float64)
+    if classificationMethod == "Quantile":
+        return quantile_classes(rawScores, classNumber)
+    if classificationMethod == "Equal Interval":
+        return equal_interval_classes(rawScores, classNumber)
+    if classificationMethod == "Natural Breaks":
+        return natural_breaks_classes(rawScores, classNumber, sampleSize)
+    raise ValueError("unknown classification method: " + str(classificationMethod))
+
+
+# Create function to read a variant list such as "Quantile 4; Quantile 6; Equal Interval 5"
+def parse_variants(variantsText):
+    variants = []
+    for variantEntry in variantsText.split(";"):
+        if not variantEntry.strip():
+            continue
+        classificationMethod, classNumber = variantEntry.strip().rsplit(None, 1)
+        if classificationMethod not in VARIANT_CODES:
+            raise ValueError("unknown classification method: " + str(classificationMethod))
+        variants.append((classificationMethod, int(float(classNumber))))
+    return variants
+
+
+# Create function to name the index field of a variant (ex. IDXQ6_10), within the 10
+# characters of a shapefile field name
+def variant_field_name(classificationMethod, classNumber, yearOfData):
+    return "IDX" + VARIANT_CODES[classificationMethod] + str(int(float(classNumber))) + "_" + yearOfData
+
+
+# Create function to classify raw scores with several (method, number of classes) variants
+def classify_variants(rawScores, variants, sampleSize=None, sortOrder=None):
+    """Return a list with the class array of each variant, all from one sort of rawScores.
+
+    sortOrder is the stable argsort of rawScores, when it is already known.
+    """
+    return classify_variants_with_breaks(rawScores, variants, sampleSize, sortOrder)[0]
+
+
+# Create function to classify several variants and keep the natural breaks found for them
+def classify_variants_with_breaks(rawScores, variants, sampleSize=None, sortOrder=None):
+    """Return (class arrays, natural breaks) like classify_variants, where natural breaks
+    maps the class number of every Natural Breaks variant to its jenks.NaturalBreaks."""
+    rawScores = numpy.asarray(rawScores, dtype=numpy.float64)
+    if sortOrder is None:
+        sortOrder = numpy.argsort(rawScores, kind="mergesort")
+    sortedScores = rawScores[sortOrder]
+    variants = [(classificationMethod, int(float(classNumber))) for classificationMethod, classNumber in variants]
+
+    # Ranks for every Quantile variant, breaks of every Natural Breaks variant from one run
+    ranks = None
+    if any(classificationMethod == "Quantile" for classificationMethod, classNumber in variants):
+        ranks = numpy.empty(len(rawScores), dtype=numpy.int64)
+        ranks[sortOrder] = numpy.arange(len(rawScores))
+    naturalClassNumbers = sorted(set(classNumber for classificationMethod, classNumber in variants
+                                     if classificationMethod == "Natural Breaks"))
+    naturalBreaks = {}
+    if naturalClassNumbers:
+        # Sampled from the scores in record order, as natural_breaks_classes does, so that
+        # adding variants never moves the breaks of the index itself
+        naturalBreaks = dict(zip(naturalClassNumbers,
+                                 jenks.natural_breaks_for(rawScores, naturalClassNumbers, sampleSize)))
+
+    variantClasses = []
+    for classificationMethod, classNumber in variants:
+        if classificationMethod == "Quantile":
+            groupSize = quantile_group_size(len(rawScores), classNumber)
+            variantClasses.append(numpy.minimum(ranks // groupSize + 1, classNumber).astype(numpy.float64))
+        elif classificationMethod == "Equal Interval":
+            groupSize = (sortedScores[-1] - sortedScores[0]) / float(classNumber)
+            variantClasses.append(classes_from_breaks(rawScores, sortedScores[0] + groupSize * numpy.arange(1, classNumber)))
+        elif classificationMethod == "Natural Breaks":
+            variantClasses.append(classes_from_breaks(rawScores, naturalBreaks[classNumber].breakValues))
+        else:
+            raise ValueError("unknown classification method: " + str(classificationMethod))
+    return variantClasses, naturalBreaks
@@ -0,0 +1,102 @@
+"""
+RESULT COLUMNS WRITTEN TO A COLUMNAR FILE, KEYED BY FEATURE ID.
+
+Instead of (or as well as) the output shapefile, the computed columns can be written
+to one binary file that pandas and other dataframe tools read directly:
+    .parquet             PARQUET (COMPRESSED, REQUIRES pyarrow)
+    .feather / .arrow    FEATHER / ARROW IPC, UNCOMPRESSED SO THAT READERS CAN MEMORY MAP
+                         IT WITHOUT COPYING (REQUIRES pyarrow)
+    .npz                 NUMPY ARCHIVE OF ONE .npy PER COLUMN (NO EXTRA DEPENDENCY)
+Numbers are stored as typed 64-bit values instead of the FLOAT (20, 10) text of a
+.dbf, and field names are not limited to 10 characters. Text columns with few distinct
+values (the RPRT change reports) are dictionary-encoded in Arrow files.
+
+The first column, FID, is the record number of each feature in the input shapefile
+(0 for the first record), which is the shapefile's own FID, so the results join back
+to the geometry with FID as the key.
+"""
+
+import os
+from collections import OrderedDict
+
+import numpy
+
+from ncindex import atomic
+
+# Name of the join key column
+FID_FIELD = "FID"
+
+# Columnar format of each output file extension
+COLUMNAR_FORMATS = OrderedDict([(".parquet", "Parquet"), (".feather", "Feather"), (".arrow", "Feather"),
+                                (".npz", "NPZ")])
+
+
+# Create function to import pyarrow on first use (it is slow to load), or return None without it
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+# Create function to find the columnar format of an output file from its extension
+def columnar_format(outputFile):
+    extension = os.path.splitext(outputFile)[1].lower()
+    if extension not in COLUMNAR_FORMATS:
+        raise ValueError("columnar output must end in one of " + ", ".join(COLUMNAR_FORMATS) + ": " + outputFile)
+    columnarFormat = COLUMNAR_FORMATS[extension]
+    if columnarFormat != "NPZ" and _arrow() is None:
+        raise ValueError(columnarFormat + " output requires the pyarrow package; use a .npz file instead")
+    return columnarFormat
+
+
+# Create function to put the FID key in front of the result columns
+def keyed_columns(columns):
+    columnValues = list(columns.values())
+    recordCount = len(columnValues[0]) if columnValues else 0
+    keyedColumns = OrderedDict([(FID_FIELD, numpy.arange(recordCount, dtype=numpy.int64))])
+    for name, values in columns.items():
+        values = numpy.asarray(values)
+        if len(values) != recordCount:
+            raise ValueError("column " + name + " has " + str(len(values)) + " values, not " + str(recordCount))
+        # Text columns are stored as text, everything else as 64-bit floats like the FLOAT fields
+        keyedColumns[name] = values.astype(numpy.str_) if values.dtype.kind in "USO" else values.astype(numpy.float64)
+    return keyedColumns
+
+
+# Create function to write result columns (field name -> array) to a columnar file in one bulk write
+def write_columns(outputFile, columns):
+    columnarFormat = columnar_format(outputFile)
+    keyedColumns = keyed_columns(columns)
+    partialFile = outputFile + ".partial"
+    if columnarFormat == "NPZ":
+        with open(partialFile, "wb") as partial:
+            numpy.savez(partial, **keyedColumns)
+    else:
+        pyarrow = _arrow()
+        arrowColumns = [pyarrow.array(values).dictionary_encode() if values.dtype.kind == "U" else pyarrow.array(values)
+                        for values in keyedColumns.values()]
+        table = pyarrow.Table.from_arrays(arrowColumns, names=list(keyedColumns))
+        if columnarFormat == "Parquet":
+            pyarrow.parquet.write_table(table, partialFile)
+        else:
+            pyarrow.feather.write_feather(table, partialFile, compression="uncompressed")
+    # Readers never see a half-written file
+    atomic.replace_file(partialFile, outputFile)
+
+
+# Create function to read a columnar file back into an ordered mapping of arrays
+def read_columns(inputFile):
+    columnarFormat = columnar_format(inputFile)
+    if columnarFormat == "NPZ":
+        with numpy.load(inputFile, allow_pickle=False) as archive:
+            return OrderedDict((name, archive[name]) for name in archive.files)
+    pyarrow = _arrow()
+    if columnarFormat == "Parquet":
+        table = pyarrow.parquet.read_table(inputFile)
+    else:
+        table = pyarrow.feather.read_table(inputFile, memory_map=True)
+    return OrderedDict((name, table.column(name).to_numpy()) for name in table.column_names)
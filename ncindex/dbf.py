@@ -0,0 +1,324 @@
+"""
+MEMORY-MAPPED DBF ATTRIBUTE TABLES, READ AND WRITTEN WITHOUT ARCPY.
+
+The records of a shapefile's .dbf are fixed-width, so the whole table maps onto a NumPy
+structured array with one byte-string column per field. Reading a column is a view
+into the mapped file plus one vectorized text-to-number conversion; no Python object
+is created per record. Result columns are written back in bulk:
+    EXISTING FIELDS     OVERWRITTEN IN PLACE THROUGH THE MEMORY MAP
+    NEW FIELDS          APPENDED BY WRITING THE TABLE ONCE, WITH THE OLD RECORDS COPIED
+                        COLUMN BY COLUMN, THEN SWAPPED IN FOR THE ORIGINAL .dbf
+A new table holding only result columns (an attribute table with no geometry) is
+written the same way, in one pass. New fields use the same definitions as the arcpy
+tools: FLOAT (20, 10) becomes a DBF numeric field 20 characters wide with 10 decimals,
+and TEXT a 254-character field.
+
+Text is read and written in the table's encoding, as ArcGIS does: the code page named
+in the shapefile's .cpg, else the one of the language driver byte of the .dbf header,
+else latin-1 (which decodes any byte, so an unknown code page never stops a run).
+"""
+
+from __future__ import division
+
+import codecs
+import datetime
+import os
+import struct
+from collections import OrderedDict, namedtuple
+
+import numpy
+
+from ncindex import atomic
+from ncindex.fields import FLOAT_FIELD, TEXT_FIELD
+
+DbfField = namedtuple("DbfField", ["name", "type", "length", "decimals"])
+
+_HEADER = struct.Struct("<BBBBIHH")
+_FIELD = struct.Struct("<11sc4xBB14x")
+_NUMERIC_TYPES = (b"N", b"F")
+
+# Encoding of text in tables with neither a .cpg nor a known language driver
+DEFAULT_ENCODING = "latin-1"
+
+# Code pages of the language driver byte (header byte 29) that ArcGIS and dBASE write
+_LANGUAGE_DRIVERS = {0x01: "cp437", 0x02: "cp850", 0x03: "cp1252", 0x08: "cp865", 0x09: "cp437", 0x0A: "cp850",
+                     0x0B: "cp437", 0x0D: "cp437", 0x0E: "cp850", 0x0F: "cp437", 0x10: "cp850", 0x11: "cp437",
+                     0x12: "cp850", 0x13: "cp932", 0x14: "cp850", 0x15: "cp437", 0x16: "cp850", 0x17: "cp865",
+                     0x18: "cp437", 0x19: "cp437", 0x1A: "cp850", 0x1B: "cp437", 0x1C: "cp863", 0x1D: "cp850",
+                     0x1F: "cp852", 0x22: "cp852", 0x23: "cp852", 0x24: "cp860", 0x25: "cp850", 0x26: "cp866",
+                     0x37: "cp850", 0x40: "cp852", 0x4D: "cp936", 0x4E: "cp949", 0x4F: "cp950", 0x50: "cp874",
+                     0x57: "cp1252", 0x58: "cp1252", 0x59: "cp1252", 0x64: "cp852", 0x65: "cp866", 0x66: "cp865",
+                     0x67: "cp861", 0x6A: "cp737", 0x6B: "cp857", 0x6C: "cp863", 0x78: "cp950", 0x79: "cp949",
+                     0x7A: "cp936", 0x7B: "cp932", 0x7C: "cp874", 0x7D: "cp1255", 0x7E: "cp1256", 0x87: "cp852",
+                     0x88: "cp857", 0xC8: "cp1250", 0xC9: "cp1251", 0xCA: "cp1254", 0xCB: "cp1253", 0xCC: "cp1257"}
+
+
+# Create function to find the .dbf of a shapefile (or accept a .dbf path as it is)
+def dbf_path(table):
+    base, extension = os.path.splitext(table)
+    return table if extension.lower() == ".dbf" else base + ".dbf"
+
+
+# Create function to read the header and field descriptors of a .dbf
+def read_header(dbfFile):
+    """Return (recordCount, headerLength, recordLength, fields, headerTail) of the table.
+
+    headerTail holds header bytes 12 to 31 (including the language driver), which are
+    kept as they are when the table is rewritten.
+    """
+    with open(dbfFile, "rb") as table:
+        header = table.read(32)
+        version, year, month, day, recordCount, headerLength, recordLength = _HEADER.unpack(header[:12])
+        fields = []
+        while table.tell() < headerLength - 1:
+            descriptor = table.read(32)
+            if descriptor[:1] == b"\r":
+                break
+            name, fieldType, length, decimals = _FIELD.unpack(descriptor)
+            fields.append(DbfField(name.split(b"\x00")[0].decode("ascii"), fieldType, length, decimals))
+    return recordCount, headerLength, recordLength, fields, header[12:32]
+
+
+# Create function to translate the code page named in a .cpg file into a Python codec name
+def _codec_name(codePage):
+    """Accept codec names (UTF-8, ISO-8859-1) and the numbers ArcGIS writes (1252,
+    ANSI 1252, 65001, 88591); return None when the code page is unknown."""
+    codePage = codePage.strip()
+    if codePage.upper().startswith("ANSI "):
+        codePage = codePage[5:].strip()
+    if codePage.isdigit():
+        if codePage == "65001":
+            codePage = "utf-8"
+        elif codePage.startswith("8859") and len(codePage) > 4:
+            codePage = "iso8859-" + codePage[4:]
+        else:
+            codePage = "cp" + codePage
+    try:
+        return codecs.lookup(codePage).name
+    except LookupError:
+        return None
+
+
+# Create function to find the encoding of a table's text: its .cpg, its language driver or latin-1
+def table_encoding(table):
+    dbfFile = dbf_path(table)
+    codePageFile = os.path.splitext(dbfFile)[0] + ".cpg"
+    if os.path.isfile(codePageFile):
+        with open(codePageFile) as codePage:
+            encoding = _codec_name(codePage.read())
+        if encoding:
+            return encoding
+    # headerTail starts at header byte 12, so the language driver is its byte 17
+    headerTail = read_header(dbfFile)[4]
+    return codecs.lookup(_LANGUAGE_DRIVERS.get(bytearray(headerTail)[17], DEFAULT_ENCODING)).name
+
+
+# Create function to build the structured record type of a list of fields
+def record_dtype(fields, recordLength=None):
+    names = ["DeletionFlag"] + [field.name for field in fields]
+    formats = ["S1"] + ["S" + str(field.length) for field in fields]
+    offsets = list(numpy.cumsum([0, 1] + [field.length for field in fields[:-1]]))
+    itemSize = recordLength or 1 + sum(field.length for field in fields)
+    return numpy.dtype({"names": names, "formats": formats, "offsets": [int(offset) for offset in offsets],
+                        "itemsize": itemSize})
+
+
+# Create function to map every record of a .dbf without reading it into memory
+def open_records(table, mode="r"):
+    """Return (records, fields); records is a numpy.memmap of the fixed-width records."""
+    dbfFile = dbf_path(table)
+    recordCount, headerLength, recordLength, fields, headerTail = read_header(dbfFile)
+    if recordCount == 0:
+        return numpy.zeros(0, dtype=record_dtype(fields, recordLength)), fields
+    records = numpy.memmap(dbfFile, dtype=record_dtype(fields, recordLength), mode=mode, offset=headerLength,
+                           shape=(recordCount,))
+    return records, fields
+
+
+# Create function to convert one raw field column into numbers (blank = NaN) or text
+def decode_column(rawValues, field, encoding="utf-8"):
+    strippedValues = numpy.char.strip(rawValues)
+    if field.type in _NUMERIC_TYPES:
+        blank = (strippedValues == b"") | (numpy.char.find(strippedValues, b"*") >= 0)
+        return numpy.where(blank, b"nan", strippedValues).astype(numpy.float64)
+    return numpy.char.decode(strippedValues, encoding)
+
+
+# Create function to list the numeric fields of a table
+def numeric_field_names(table):
+    recordCount, headerLength, recordLength, fields, headerTail = read_header(dbf_path(table))
+    return [field.name for field in fields if field.type in _NUMERIC_TYPES]
+
+
+# Create function to read the named columns into a structured array, like TableToNumPyArray
+def read_columns(table, fieldNames, encoding=None):
+    """Text fields are decoded with encoding, by default the table's (see table_encoding)."""
+    records, fields = open_records(table)
+    if not fieldNames:
+        return numpy.zeros(len(records), dtype=numpy.dtype([]))
+    encoding = encoding or table_encoding(table)
+    fieldsByName = dict((field.name.upper(), field) for field in fields)
+    columns = []
+    for name in fieldNames:
+        if name.upper() not in fieldsByName:
+            raise ValueError("field " + name + " is not in " + dbf_path(table))
+        field = fieldsByName[name.upper()]
+        columns.append(decode_column(records[field.name], field, encoding))
+    return numpy.rec.fromarrays(columns, names=list(fieldNames)).view(numpy.ndarray)
+
+
+# Create function to read the named numeric columns in batches of at most chunkSize records
+def read_chunks(table, fieldNames, chunkSize):
+    """Yield two-dimensional float arrays with one column per field, like arcio.read_chunks."""
+    records, fields = open_records(table)
+    fieldsByName = dict((field.name.upper(), field) for field in fields)
+    chunkFields = [fieldsByName[name.upper()] for name in fieldNames]
+    for start in range(0, len(records), chunkSize):
+        chunk = records[start:start + chunkSize]
+        yield numpy.column_stack([decode_column(chunk[field.name], field) for field in chunkFields])
+
+
+# Create function to translate an arcpy field definition (type, precision, scale, length)
+def dbf_field(name, fieldSpec):
+    if len(name) > 10:
+        raise ValueError("field name " + name + " is longer than the 10 characters a .dbf allows")
+    fieldType, precision, scale, length = fieldSpec
+    if fieldType in ("FLOAT", "DOUBLE"):
+        return DbfField(name, b"F" if fieldType == "FLOAT" else b"N", int(precision or 19), int(scale or 11))
+    if fieldType in ("SHORT", "LONG"):
+        return DbfField(name, b"N", int(precision or (5 if fieldType == "SHORT" else 10)), 0)
+    if fieldType == "TEXT":
+        return DbfField(name, b"C", min(int(length or 254), 254), 0)
+    raise ValueError("field type " + str(fieldType) + " cannot be written to a .dbf")
+
+
+# Create function to format a column of values as fixed-width field text
+def encode_column(values, field, encoding="utf-8"):
+    if field.type in _NUMERIC_TYPES:
+        values = numpy.asarray(values, dtype=numpy.float64)
+        text = numpy.char.mod("%." + str(field.decimals) + "f", values)
+        # Values too wide for the field fall back to exponent notation
+        tooWide = numpy.char.str_len(text) > field.length
+        if tooWide.any():
+            exponentDigits = max(field.length - 8, 1)
+            text[tooWide] = numpy.char.mod("%." + str(exponentDigits) + "e", values[tooWide])
+        text[numpy.isnan(values)] = ""
+        return numpy.char.encode(numpy.char.rjust(text, field.length), "ascii").astype("S" + str(field.length))
+    encoded = numpy.char.encode(numpy.asarray(values).astype(numpy.str_), encoding).astype("S" + str(field.length))
+    return numpy.char.ljust(encoded, field.length, b" ").astype("S" + str(field.length))
+
+
+# Create function to build the header and field descriptors of a table
+def _header_bytes(recordCount, fields, headerTail):
+    today = datetime.date.today()
+    headerLength = 32 + 32 * len(fields) + 1
+    recordLength = 1 + sum(field.length for field in fields)
+    header = [_HEADER.pack(3, today.year - 1900, today.month, today.day, recordCount, headerLength, recordLength),
+              headerTail]
+    for field in fields:
+        header.append(_FIELD.pack(field.name.encode("ascii"), field.type, field.length, field.decimals))
+    header.append(b"\r")
+    return b"".join(header)
+
+
+# Create function to write a new table's records in one pass, then swap it in for the .dbf
+def _write_table(dbfFile, recordCount, allFields, headerTail, columns, copyRecords=False, encoding="utf-8"):
+    """Write columns into a table of allFields; with copyRecords, the fields of the
+    existing dbfFile are copied first."""
+    partialFile = dbfFile + ".partial"
+    header = _header_bytes(recordCount, allFields, headerTail)
+    with open(partialFile, "wb") as partial:
+        partial.write(header)
+        partial.truncate(len(header) + recordCount * record_dtype(allFields).itemsize)
+        partial.seek(0, os.SEEK_END)
+        partial.write(b"\x1a")
+    if recordCount:
+        newRecords = numpy.memmap(partialFile, dtype=record_dtype(allFields), mode="r+", offset=len(header),
+                                  shape=(recordCount,))
+        # Fields not written below are left blank
+        for name in newRecords.dtype.names:
+            newRecords[name] = b" " * newRecords.dtype[name].itemsize
+        if copyRecords:
+            oldRecords, fields = open_records(dbfFile)
+            for name in oldRecords.dtype.names:
+                newRecords[name] = oldRecords[name]
+            del oldRecords
+        for field in allFields:
+            matches = [name for name in columns if name.upper() == field.name.upper()]
+            if matches:
+                newRecords[field.name] = encode_column(columns[matches[0]], field, encoding)
+        newRecords.flush()
+        del newRecords
+    atomic.replace_file(partialFile, dbfFile)
+
+
+# Create function to write a new table (no geometry) holding only the given columns
+def create_table(table, columns, fieldSpecs, encoding="utf-8"):
+    """Write columns (field name -> array) as a new .dbf, replacing any table of that name.
+
+    fieldSpecs maps each field name to its arcpy-style (type, precision, scale, length)
+    definition. A .cpg file next to the table records the text encoding.
+    """
+    dbfFile = dbf_path(table)
+    recordCount = len(next(iter(columns.values()))) if columns else 0
+    fields = [dbf_field(name, fieldSpecs[name]) for name in columns]
+    _write_table(dbfFile, recordCount, fields, b"\x00" * 20, columns, encoding=encoding)
+    with open(os.path.splitext(dbfFile)[0] + ".cpg", "w") as codePage:
+        codePage.write(encoding.upper())
+
+
+# Create function to add blank fields to a table, to be filled in batches with write_rows
+def add_fields(table, fieldSpecs):
+    """fieldSpecs maps each new field name to its arcpy-style definition; existing fields are kept."""
+    dbfFile = dbf_path(table)
+    recordCount, headerLength, recordLength, fields, headerTail = read_header(dbfFile)
+    existingNames = set(field.name.upper() for field in fields)
+    newFields = [dbf_field(name, fieldSpec) for name, fieldSpec in fieldSpecs.items() if name.upper() not in existingNames]
+    if newFields:
+        _write_table(dbfFile, recordCount, fields + newFields, headerTail, {}, True)
+
+
+# Create function to overwrite existing fields of the records from start onwards
+def write_rows(table, start, columns, encoding=None):
+    encoding = encoding or table_encoding(table)
+    records, fields = open_records(table, "r+")
+    fieldsByName = dict((field.name.upper(), field) for field in fields)
+    for name, values in columns.items():
+        field = fieldsByName[name.upper()]
+        records[field.name][start:start + len(values)] = encode_column(values, field, encoding)
+    records.flush()
+    del records
+
+
+# Create function to choose the field definition of each result column: TEXT for text, FLOAT otherwise
+def column_field_specs(columns):
+    return OrderedDict((name, TEXT_FIELD if numpy.asarray(values).dtype.kind in "USO" else FLOAT_FIELD)
+                       for name, values in columns.items())
+
+
+# Create function to write result columns to a .dbf in one bulk operation
+def write_columns(table, columns, fieldSpecs, encoding=None):
+    """Write columns (field name -> array) into the table.
+
+    fieldSpecs maps each field name to its arcpy-style (type, precision, scale, length)
+    definition, used when the field has to be added to the table. Text is encoded with
+    encoding, by default the table's (see table_encoding).
+    """
+    dbfFile = dbf_path(table)
+    encoding = encoding or table_encoding(dbfFile)
+    recordCount, headerLength, recordLength, fields, headerTail = read_header(dbfFile)
+    existingNames = dict((field.name.upper(), field) for field in fields)
+    newFields = [dbf_field(name, fieldSpecs[name]) for name in columns if name.upper() not in existingNames]
+
+    if not newFields:
+        # Every field exists already: overwrite the columns in place
+        records, fields = open_records(dbfFile, "r+")
+        for name, values in columns.items():
+            field = existingNames[name.upper()]
+            records[field.name] = encode_column(values, field, encoding)
+        if recordCount:
+            records.flush()
+        return
+
+    # Write the table once with the new fields appended, then swap it in for the original
+    _write_table(dbfFile, recordCount, fields + newFields, headerTail, columns, True, encoding)
@@ -0,0 +1,11 @@
+"""
+FIELD DEFINITIONS SHARED BY THE ARCPY AND DBF ATTRIBUTE WRITERS.
+
+Each definition is (type, precision, scale, length) in arcpy.AddField_management terms.
+"""
+
+# Numeric result columns (z-scores, raw scores, index classes...)
+FLOAT_FIELD = ("FLOAT", 20, 10, "")
+
+# Text result columns (change reports, cluster types...)
+TEXT_FIELD = ("TEXT", "", "", "")
@@ -0,0 +1,78 @@
+"""
+INDEX CALCULATED SEPARATELY WITHIN EACH GROUP OF RECORDS (COUNTY, METRO AREA...).
+
+The z-scores, raw scores and index classes of every group are calculated independently
+of the other groups, exactly as if each group had been split into its own shapefile and
+run through the tool. Groups are spread over a pool of worker processes and the results
+are merged back into columns in the order of the input table.
+"""
+
+import multiprocessing
+from collections import OrderedDict
+
+import numpy
+
+from ncindex import parallel, pipeline
+
+
+# Create function to calculate the index of one group; runs inside a worker process
+def _calculate_group(task):
+    groupValue, groupArray, varList, negList, yearOfData, classificationMethod, classNumber, sampleSize, variants = task
+    try:
+        columns, statistics, naturalBreaks = pipeline.calculate_index(groupArray, varList, negList, yearOfData,
+                                                                      classificationMethod, classNumber, sampleSize,
+                                                                      variants)
+    except ValueError as e:
+        raise ValueError("group " + str(groupValue) + ": " + str(e))
+    return columns, statistics, naturalBreaks
+
+
+# Create function to calculate every output column of the index within each group
+def calculate_grouped_index(indicatorArray, groupValues, varList, negList, yearOfData,
+                            classificationMethod, classNumber, processes=None, sampleSize=None,
+                            variants=None):
+    """Return (columns, statistics, groupBreaks) like pipeline.calculate_index.
+
+    statistics is a list of (group value, variable, mean, standard deviation) tuples,
+    and groupBreaks a list of (group value, jenks.NaturalBreaks) pairs with the Natural
+    Breaks method (empty otherwise).
+    processes is the size of the worker pool; by default one worker per CPU core.
+    sampleSize is the natural breaks sample size within each group, and variants the
+    extra classification variants of pipeline.calculate_index.
+    """
+    groupNames, groupCodes = numpy.unique(numpy.asarray(groupValues), return_inverse=True)
+
+    # Records of each group, in input order
+    recordOrder = numpy.argsort(groupCodes, kind="mergesort")
+    groupStarts = numpy.searchsorted(groupCodes[recordOrder], numpy.arange(len(groupNames) + 1))
+    groupRecords = [recordOrder[groupStarts[code]:groupStarts[code + 1]] for code in range(len(groupNames))]
+
+    tasks = [(groupNames[code], indicatorArray[groupRecords[code]], varList, negList, yearOfData,
+              classificationMethod, classNumber, sampleSize, variants) for code in range(len(groupNames))]
+
+    # Groups run in parallel unless a single worker (or a single group) is requested
+    processes = processes or multiprocessing.cpu_count()
+    if processes > 1 and len(tasks) > 1:
+        pool = parallel.create_pool(min(processes, len(tasks)))
+        try:
+            results = pool.map(_calculate_group, tasks, chunksize=max(len(tasks) // (4 * processes), 1))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_calculate_group(task) for task in tasks]
+
+    # Merge the results of every group back into input order
+    columns = None
+    statistics = []
+    groupBreaks = []
+    for code, (groupColumns, groupStatistics, naturalBreaks) in enumerate(results):
+        if columns is None:
+            columns = OrderedDict((name, numpy.empty(len(indicatorArray), dtype=numpy.float64))
+                                  for name in groupColumns)
+        for name, values in groupColumns.items():
+            columns[name][groupRecords[code]] = values
+        statistics.extend((groupNames[code],) + variableStatistics for variableStatistics in groupStatistics)
+        if naturalBreaks is not None:
+            groupBreaks.append((groupNames[code], naturalBreaks))
+    return columns, statistics, groupBreaks
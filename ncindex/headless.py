@@ -0,0 +1,60 @@
+"""
+RUN THE INDEX CALCULATION WITHOUT ARCPY (LINUX BATCH NODES).
+
+A command line for tools.run_index_tool with the NumPy backend (ncindex/backends.py):
+the same calculation, processing modes and outputs as nc-pt1.py, with options named
+instead of positional parameters. The indicator columns are read from the input
+shapefile's .dbf through a memory map, and the fields are added to a copy of the
+shapefile's files in one bulk write.
+
+    python -m ncindex.headless tracts.shp index10.shp --fields POV10;VAC10;INC10
+        --year 10 --negative POV10;VAC10 --method Quantile --classes 6 [--timing stages.jsonl]
+        [--mode Fused|Streaming] [--group COUNTY] [--sample-size 10000]
+        [--zscore-store folder] [--columnar index10.parquet]
+
+With --columnar the same fields are also written to a Parquet, Feather or NPZ file keyed
+by FID (see ncindex/columnar.py); give "-" as the output shapefile to write only that file.
+An output ending in .dbf is a sidecar attribute table keyed by INPUT_FID (see
+ncindex/sidecar.py), written without copying the input's geometry.
+"""
+
+import argparse
+
+from ncindex import backends, classify, timing, tools
+
+PROCESSING_MODES = ("Fused", "Streaming")
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Calculate the neighborhood change index without ArcGIS.")
+    parser.add_argument("input", help="input shapefile")
+    parser.add_argument("output", help="output shapefile, or .dbf sidecar table ('-' to write only the columnar output)")
+    parser.add_argument("--fields", required=True, help="indicator fields, separated by ';'")
+    parser.add_argument("--year", required=True, help="2-digit date of the indicator data")
+    parser.add_argument("--negative", default="", help="indicator fields that subtract from the index, separated by ';'")
+    parser.add_argument("--method", default="Quantile", choices=classify.CLASSIFICATION_METHODS)
+    parser.add_argument("--classes", default="6", help="number of index classes")
+    parser.add_argument("--mode", default="Fused", choices=PROCESSING_MODES, help="processing mode")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Streaming batch size (records)")
+    parser.add_argument("--error-bound", type=float, default=0.001,
+                        help="Streaming quantile error bound (share of records)")
+    parser.add_argument("--group", default="", help="calculate the index separately for each value of this field")
+    parser.add_argument("--sample-size", type=int, help="calculate natural breaks from this many sampled raw scores")
+    parser.add_argument("--variants", default="", help="extra classifications, ex. 'Quantile 4; Equal Interval 5'")
+    parser.add_argument("--zscore-store", default="", help="folder of stored z-scores to reuse and extend")
+    parser.add_argument("--columnar", default="", help="also write the fields to this .parquet, .feather or .npz file, keyed by FID")
+    parser.add_argument("--timing", help="append the timing of each stage to this JSON lines file")
+    options = parser.parse_args(arguments)
+    if options.output == "-" and not options.columnar:
+        parser.error("an output of '-' needs --columnar")
+
+    tools.run_index_tool(backends.NumpyBackend([]), options.input, options.fields.split(";"),
+                         options.negative.split(";"), options.year, options.output, options.method, options.classes,
+                         options.mode, options.chunk_size, options.error_bound, options.group, options.sample_size,
+                         classify.parse_variants(options.variants), options.zscore_store, options.columnar,
+                         options.output == "-", options.output.lower().endswith(".dbf"),
+                         timing.StageRecorder.from_environment(options.timing))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+JENKS NATURAL BREAKS CLASSIFICATION OF RAW SCORES.
+
+The breaks minimize the sum of squared deviations of every class from its class mean
+(the Fisher-Jenks optimum). The distinct raw scores are sorted once and weighted by
+how many records share them, and the dynamic program over the sorted values
+    cost(c, j) = min over i of cost(c - 1, i - 1) + SSD(values i to j)
+finds every class count's optimum with divide and conquer: the best start i of the
+last class never moves left as j grows, so each layer takes O(N log N) instead of
+O(N^2), and O(k N log N) in all. Every recursion level of a layer is evaluated for
+all of its segments at once with NumPy.
+
+For very large inputs the breaks can come from a random sample of the raw scores.
+By the Dvoretzky-Kiefer-Wolfowitz inequality, every break then sits within
+    sqrt(ln(2 / (1 - confidence)) / (2 * sampleSize)) * N
+records of the rank it has in the sample, with the given confidence; this bound and
+the goodness of variance fit of the breaks on the full data are reported.
+
+Each break value is the lowest raw score of the class above it, so classes are
+assigned by a binary search that moves a score equal to a break value up a class,
+as for the equal interval breaks.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy
+
+# Break values, goodness of variance fit on all records, records the breaks were
+# calculated from, and the sampling bound on the rank of every break (in records)
+NaturalBreaks = namedtuple("NaturalBreaks", ["breakValues", "goodnessOfFit", "sampleSize", "rankErrorBound"])
+
+
+# Create function to find the optimal breaks of weighted values for several class numbers
+def optimal_breaks_for(values, weights, classNumbers):
+    """Return a list of ascending break values (at most k - 1 of them) for each k in classNumbers.
+
+    values need not be sorted or distinct; weights are the number of records each
+    value stands for. With fewer distinct values than classes, every distinct value
+    becomes its own class. The dynamic program runs once, up to the largest class
+    number: its layer for k classes holds the optimum for k classes.
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    weights = numpy.asarray(weights, dtype=numpy.float64)
+    sortOrder = numpy.argsort(values, kind="mergesort")
+    distinctValues, firstPositions = numpy.unique(values[sortOrder], return_index=True)
+    distinctWeights = numpy.add.reduceat(weights[sortOrder], firstPositions)
+    valueCount = len(distinctValues)
+    classNumbers = [min(int(float(classNumber)), valueCount) for classNumber in classNumbers]
+    classNumber = max(classNumbers + [1])
+    if classNumber <= 1:
+        return [distinctValues[:0] for classNumber in classNumbers]
+
+    # Prefix sums of weight, weighted value and weighted square, of values centered on
+    # their mean so that the sums of squares lose little precision
+    centeredValues = distinctValues - numpy.average(distinctValues, weights=distinctWeights)
+    weightSums = numpy.concatenate([[0.0], numpy.cumsum(distinctWeights)])
+    valueSums = numpy.concatenate([[0.0], numpy.cumsum(distinctWeights * centeredValues)])
+    squareSums = numpy.concatenate([[0.0], numpy.cumsum(distinctWeights * centeredValues * centeredValues)])
+
+    # Sum of squared deviations of the values first to last (inclusive)
+    def deviations(first, last):
+        valueSum = valueSums[last + 1] - valueSums[first]
+        return squareSums[last + 1] - squareSums[first] - valueSum * valueSum / (weightSums[last + 1] - weightSums[first])
+
+    previousCosts = deviations(numpy.zeros(valueCount, dtype=numpy.int64), numpy.arange(valueCount))
+    classStarts = numpy.zeros((classNumber, valueCount), dtype=numpy.int64)
+    for classIndex in range(1, classNumber):
+        costs = numpy.full(valueCount, numpy.inf)
+        # Pending segments: last values low to high, whose last class starts between startLow and startHigh
+        low = numpy.array([classIndex])
+        high = numpy.array([valueCount - 1])
+        startLow = numpy.array([classIndex])
+        startHigh = numpy.array([valueCount - 1])
+        while len(low):
+            middle = (low + high) // 2
+            candidateCounts = numpy.minimum(middle, startHigh) - startLow + 1
+            segmentStarts = numpy.concatenate([[0], numpy.cumsum(candidateCounts)[:-1]])
+            starts = numpy.repeat(startLow - segmentStarts, candidateCounts) + numpy.arange(candidateCounts.sum())
+            candidateCosts = previousCosts[starts - 1] + deviations(starts, numpy.repeat(middle, candidateCounts))
+
+            # Lowest cost of each segment, taking the first start that reaches it
+            lowestCosts = numpy.minimum.reduceat(candidateCosts, segmentStarts)
+            lowestPositions = numpy.flatnonzero(candidateCosts == numpy.repeat(lowestCosts, candidateCounts))
+            bestStarts = starts[lowestPositions[numpy.searchsorted(lowestPositions, segmentStarts)]]
+            costs[middle] = lowestCosts
+            classStarts[classIndex, middle] = bestStarts
+
+            hasLeft = low < middle
+            hasRight = middle < high
+            low, high, startLow, startHigh = (
+                numpy.concatenate([low[hasLeft], middle[hasRight] + 1]),
+                numpy.concatenate([middle[hasLeft] - 1, high[hasRight]]),
+                numpy.concatenate([startLow[hasLeft], bestStarts[hasRight]]),
+                numpy.concatenate([bestStarts[hasLeft], startHigh[hasRight]]))
+        previousCosts = costs
+
+    # Follow the best starts back from the last value
+    breakValueLists = []
+    for classNumber in classNumbers:
+        breakPositions = []
+        lastValue = valueCount - 1
+        for classIndex in range(classNumber - 1, 0, -1):
+            breakPositions.append(classStarts[classIndex, lastValue])
+            lastValue = breakPositions[-1] - 1
+        breakValueLists.append(distinctValues[numpy.array(breakPositions[::-1], dtype=numpy.int64)])
+    return breakValueLists
+
+
+# Create function to find the optimal breaks of weighted values
+def optimal_breaks(values, weights, classNumber):
+    return optimal_breaks_for(values, weights, [classNumber])[0]
+
+
+# Create function to measure how much of the variance the classes explain (1 is a perfect fit)
+def goodness_of_fit(values, classes):
+    values = numpy.asarray(values, dtype=numpy.float64)
+    classCodes = numpy.asarray(classes).astype(numpy.int64)
+    centeredValues = values - values.mean()
+    totalDeviations = numpy.dot(centeredValues, centeredValues)
+    if totalDeviations == 0:
+        return 1.0
+    classCounts = numpy.bincount(classCodes)
+    classSums = numpy.bincount(classCodes, weights=centeredValues)
+    occupied = classCounts > 0
+    classDeviations = totalDeviations - numpy.sum(classSums[occupied] ** 2 / classCounts[occupied])
+    return 1.0 - classDeviations / totalDeviations
+
+
+# Create function to bound, in records, how far a break from sampleSize sampled scores may be
+# from its rank among scoreCount scores (Dvoretzky-Kiefer-Wolfowitz inequality)
+def sample_rank_error_bound(scoreCount, sampleSize, confidence=0.95):
+    return int(math.ceil(scoreCount * math.sqrt(math.log(2.0 / (1.0 - confidence)) / (2.0 * sampleSize))))
+
+
+# Create function to calculate the natural breaks of raw scores for several class numbers,
+# from one sample (if the raw scores are many) and one run of the dynamic program
+def natural_breaks_for(rawScores, classNumbers, sampleSize=None, seed=0, confidence=0.95):
+    """Return a NaturalBreaks tuple for each class number."""
+    rawScores = numpy.asarray(rawScores, dtype=numpy.float64)
+    scoreCount = len(rawScores)
+    if sampleSize and int(sampleSize) < scoreCount:
+        sampleSize = int(sampleSize)
+        sample = rawScores[numpy.random.RandomState(seed).randint(scoreCount, size=sampleSize)]
+        rankErrorBound = sample_rank_error_bound(scoreCount, sampleSize, confidence)
+    else:
+        sampleSize, sample, rankErrorBound = scoreCount, rawScores, 0
+    naturalBreaks = []
+    for breakValues in optimal_breaks_for(sample, numpy.ones(len(sample)), classNumbers):
+        classes = numpy.searchsorted(breakValues, rawScores, side="right")
+        naturalBreaks.append(NaturalBreaks(breakValues, goodness_of_fit(rawScores, classes), sampleSize, rankErrorBound))
+    return naturalBreaks
+
+
+# Create function to calculate the natural breaks of raw scores, from a sample if they are many
+def natural_breaks(rawScores, classNumber, sampleSize=None, seed=0, confidence=0.95):
+    return natural_breaks_for(rawScores, [classNumber], sampleSize, seed, confidence)[0]
+
+
+# Create function to describe natural breaks in the messages of the tools
+def breaks_messages(naturalBreaks):
+    """Return the message lines reporting the break values, their goodness of variance fit
+    and, for sampled breaks, the 95% bound on their rank."""
+    messages = ["The break values between index groups are " + str([float(value) for value in naturalBreaks.breakValues]),
+                "The goodness of variance fit of these breaks is " + str(naturalBreaks.goodnessOfFit)]
+    if naturalBreaks.rankErrorBound:
+        messages.append("Breaks calculated from a sample of " + str(naturalBreaks.sampleSize) +
+                        " raw scores; with 95% confidence each break is within " +
+                        str(naturalBreaks.rankErrorBound) + " records of its sampled rank")
+    return messages
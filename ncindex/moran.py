@@ -0,0 +1,153 @@
+"""
+LOCAL MORAN'S I (ANSELIN CLUSTER AND OUTLIER ANALYSIS) WITH PERMUTATION INFERENCE.
+
+Produces the same fields as arcpy.ClustersOutliers_stats:
+    LMiIndex    LOCAL MORAN'S I OF EACH FEATURE, NORMALIZED AS ARCGIS DOES:
+                I_i = (x_i - mean) / S_i^2 * SUM_j w_ij (x_j - mean), WHERE
+                S_i^2 = SUM_(j != i) (x_j - mean)^2 / (n - 1)
+    LMiZScore   Z-SCORE OF LMiIndex AGAINST ITS PERMUTATION DISTRIBUTION
+    LMiPValue   PSEUDO P-VALUE FROM CONDITIONAL PERMUTATIONS
+    COType      HH / LL (CLUSTERS) OR HL / LH (OUTLIERS) WHEN LMiPValue < 0.05, ELSE EMPTY
+
+Significance comes from conditional permutations: each feature keeps its own value
+while the values of its neighbors are drawn at random from all the other features.
+Features are processed in fixed-size chunks, each with its own random stream derived
+from the seed, so results depend on the seed but not on the number of worker processes.
+"""
+
+from __future__ import division
+
+import multiprocessing
+
+import numpy
+
+from ncindex import parallel
+from ncindex import weights as spatialweights
+
+MORAN_FIELDS = ("LMiIndex", "LMiZScore", "LMiPValue", "COType")
+
+# Number of features that share one random stream (and one worker task)
+CHUNK_SIZE = 1024
+
+# Largest number of permuted neighbor values held in memory at once, per worker
+_BATCH_VALUES = 4000000
+
+# Arrays shared by every task of a worker process, set by _initialize_worker
+_shared = {}
+
+
+def _initialize_worker(deviations, secondMoments, localI, spatialWeights, permutations, seed):
+    _shared.update(deviations=deviations, secondMoments=secondMoments, localI=localI,
+                   spatialWeights=spatialWeights, permutations=permutations, seed=seed)
+
+
+# Create function to draw, for every permutation, neighborCount distinct values out of
+# featureCount: rows with a repeated value are drawn again while repeats are rare, and
+# dense neighborhoods take the positions of the neighborCount smallest random keys
+def _draw_distinct(random, featureCount, permutations, neighborCount):
+    if neighborCount * neighborCount <= featureCount:
+        draws = random.randint(0, featureCount, size=(permutations, neighborCount))
+        while neighborCount > 1:
+            sortedDraws = numpy.sort(draws, axis=1)
+            repeated = (sortedDraws[:, 1:] == sortedDraws[:, :-1]).any(axis=1)
+            if not repeated.any():
+                break
+            draws[repeated] = random.randint(0, featureCount, size=(repeated.sum(), neighborCount))
+        return draws
+    draws = numpy.empty((permutations, neighborCount), dtype=numpy.int64)
+    rowsPerBlock = max(_BATCH_VALUES // featureCount, 1)
+    for blockStart in range(0, permutations, rowsPerBlock):
+        keys = random.random_sample((min(rowsPerBlock, permutations - blockStart), featureCount))
+        draws[blockStart:blockStart + len(keys)] = numpy.argpartition(keys, neighborCount - 1, axis=1)[:, :neighborCount]
+    return draws
+
+
+# Create function to find the permutation z-score and pseudo p-value of one chunk of features
+def _permutation_chunk(chunkNumber):
+    deviations = _shared["deviations"]
+    secondMoments = _shared["secondMoments"]
+    spatialWeights = _shared["spatialWeights"]
+    permutations = _shared["permutations"]
+    featureCount = len(deviations)
+
+    start = chunkNumber * CHUNK_SIZE
+    features = numpy.arange(start, min(start + CHUNK_SIZE, featureCount))
+    neighborCounts = numpy.diff(spatialWeights.indptr)[features]
+    maxNeighbors = int(neighborCounts.max()) if len(features) else 0
+
+    # One random stream per chunk, derived from the seed and the chunk number
+    seed = _shared["seed"]
+    random = numpy.random.RandomState(None if seed is None else [seed, chunkNumber])
+
+    # Random neighbor positions among the other featureCount - 1 features, shared by the
+    # features of this chunk; positions at or after a feature skip over the feature itself
+    draws = _draw_distinct(random, featureCount - 1, permutations, maxNeighbors)
+
+    # Neighbor weights of the chunk, padded with zeros to maxNeighbors
+    paddedWeights = numpy.zeros((len(features), maxNeighbors))
+    for row, feature in enumerate(features):
+        featureWeights = spatialWeights.weights[spatialWeights.indptr[feature]:spatialWeights.indptr[feature + 1]]
+        paddedWeights[row, :len(featureWeights)] = featureWeights
+
+    zScores = numpy.empty(len(features))
+    pValues = numpy.empty(len(features))
+    batchSize = max(_BATCH_VALUES // max(permutations * maxNeighbors, 1), 1)
+    for batchStart in range(0, len(features), batchSize):
+        batch = slice(batchStart, batchStart + batchSize)
+        batchFeatures = features[batch]
+        neighborPositions = draws[None, :, :] + (draws[None, :, :] >= batchFeatures[:, None, None])
+        permutedLags = numpy.einsum("frk,fk->fr", deviations[neighborPositions], paddedWeights[batch])
+        permutedI = (deviations[batchFeatures] / secondMoments[batchFeatures])[:, None] * permutedLags
+        observedI = _shared["localI"][batchFeatures]
+        permutedStd = permutedI.std(axis=1)
+        zScores[batch] = (observedI - permutedI.mean(axis=1)) / numpy.where(permutedStd > 0, permutedStd, numpy.nan)
+
+        # Folded pseudo p-value: share of permutations at least as extreme, on the observed side
+        # (ties count on both sides, so discrete fields with many ties are not overstated)
+        larger = (permutedI >= observedI[:, None]).sum(axis=1)
+        lower = (permutedI <= observedI[:, None]).sum(axis=1)
+        extreme = numpy.minimum(larger, lower)
+        pValues[batch] = (extreme + 1.0) / (permutations + 1.0)
+
+    # A feature without neighbors has no local association to test
+    isolated = neighborCounts == 0
+    zScores[isolated] = 0.0
+    pValues[isolated] = 1.0
+    return zScores, pValues
+
+
+# Create function to calculate Local Moran's I for every feature
+def local_morans_i(values, spatialWeights, permutations=499, seed=None, processes=None, significance=0.05):
+    """Return an ordered list of (field name, array) pairs named as in MORAN_FIELDS."""
+    values = numpy.asarray(values, dtype=numpy.float64)
+    deviations = values - values.mean()
+    # S_i^2 of every feature: the variance of the other features' values about the mean
+    squaredDeviations = deviations ** 2
+    secondMoments = (squaredDeviations.sum() - squaredDeviations) / (len(values) - 1)
+    localI = deviations / secondMoments * spatialweights.spatial_lag(spatialWeights, deviations)
+
+    # Permutation inference, chunk by chunk, in parallel when there is more than one chunk
+    chunkNumbers = range((len(values) + CHUNK_SIZE - 1) // CHUNK_SIZE)
+    processes = processes or multiprocessing.cpu_count()
+    initialization = (deviations, secondMoments, localI, spatialWeights, permutations, seed)
+    if processes > 1 and len(chunkNumbers) > 1:
+        pool = parallel.create_pool(min(processes, len(chunkNumbers)), _initialize_worker, initialization)
+        try:
+            chunkResults = pool.map(_permutation_chunk, chunkNumbers)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _initialize_worker(*initialization)
+        chunkResults = [_permutation_chunk(chunkNumber) for chunkNumber in chunkNumbers]
+    zScores = numpy.concatenate([chunkZScores for chunkZScores, chunkPValues in chunkResults])
+    pValues = numpy.concatenate([chunkPValues for chunkZScores, chunkPValues in chunkResults])
+
+    # Cluster (HH, LL) or outlier (HL, LH) type of every significant feature
+    clusterTypes = numpy.full(len(values), "", dtype="U2")
+    significant = pValues < significance
+    clusterTypes[significant & (deviations > 0) & (localI > 0)] = "HH"
+    clusterTypes[significant & (deviations < 0) & (localI > 0)] = "LL"
+    clusterTypes[significant & (deviations > 0) & (localI < 0)] = "HL"
+    clusterTypes[significant & (deviations < 0) & (localI < 0)] = "LH"
+    return list(zip(MORAN_FIELDS, (localI, zScores, pValues, clusterTypes)))
@@ -0,0 +1,92 @@
+"""
+MULTI-YEAR PANEL: EVERY YEAR'S INDEX AND EVERY YEAR-TO-YEAR CHANGE IN ONE RUN.
+
+Given a mapping of each year to its indicator fields, the index of every year is
+calculated from one read of the table (as nc-pt1.py would for that year), then the
+change fields of nc-pt2.py are calculated for each pair of years, either consecutive
+years (00 to 10, 10 to 20) or all pairs (also 00 to 20). For each pair a k x k
+transition matrix counts how many records moved from each class to each class.
+"""
+
+import csv
+from collections import OrderedDict
+from itertools import combinations
+
+import numpy
+
+from ncindex import change, pipeline
+
+PAIR_MODES = ("Consecutive", "All")
+
+
+# Create function to read a year-to-fields specification such as "00: POV00;VAC00 | 10: POV10;VAC10"
+def parse_year_fields(yearFieldsText):
+    yearFields = OrderedDict()
+    for yearEntry in yearFieldsText.split("|"):
+        if not yearEntry.strip():
+            continue
+        year, fields = yearEntry.split(":", 1)
+        yearFields[year.strip()] = [field.strip() for field in fields.split(";") if field.strip()]
+    return yearFields
+
+
+# Create function to list the pairs of years to compare
+def year_pairs(years, pairMode="Consecutive"):
+    years = list(years)
+    if pairMode == "Consecutive":
+        return list(zip(years[:-1], years[1:]))
+    if pairMode == "All":
+        return list(combinations(years, 2))
+    raise ValueError("unknown year pair mode: " + str(pairMode))
+
+
+# Create function to count the records that moved from each class to each class
+def transition_matrix(indexValues1, indexValues2, classNumber):
+    """Return a classNumber x classNumber array; row = year 1 class, column = year 2 class."""
+    classNumber = int(float(classNumber))
+    classCodes1 = numpy.asarray(indexValues1).astype(numpy.int64) - 1
+    classCodes2 = numpy.asarray(indexValues2).astype(numpy.int64) - 1
+    counts = numpy.bincount(classCodes1 * classNumber + classCodes2, minlength=classNumber * classNumber)
+    return counts.reshape(classNumber, classNumber)
+
+
+# Create function to calculate the index of every year and the change between years
+def calculate_panel(indicatorArray, yearFields, negList, classificationMethod, classNumber, pairMode="Consecutive"):
+    """Return (columns, transitions, statistics).
+
+    columns maps every output field name to an array, transitions maps each
+    (year 1, year 2) pair to its transition matrix, and statistics is a list of
+    (year, variable, mean, standard deviation) tuples.
+    """
+    columns = OrderedDict()
+    statistics = []
+
+    """ INDEX OF EACH YEAR """
+    for yearOfData, varList in yearFields.items():
+        yearColumns, yearStatistics, naturalBreaks = pipeline.calculate_index(indicatorArray, varList, negList,
+                                                                              yearOfData, classificationMethod,
+                                                                              classNumber)
+        columns.update(yearColumns)
+        statistics.extend((yearOfData,) + variableStatistics for variableStatistics in yearStatistics)
+
+    """ CHANGE AND TRANSITIONS BETWEEN YEARS """
+    transitions = OrderedDict()
+    for yearOfData1, yearOfData2 in year_pairs(yearFields.keys(), pairMode):
+        indexValues1 = columns["INDEX_" + yearOfData1]
+        indexValues2 = columns["INDEX_" + yearOfData2]
+        changeColumns, reportCodes, reportLabels = change.calculate_change(indexValues1, indexValues2,
+                                                                           yearOfData1, yearOfData2)
+        columns.update(changeColumns)
+        transitions[(yearOfData1, yearOfData2)] = transition_matrix(indexValues1, indexValues2, classNumber)
+    return columns, transitions, statistics
+
+
+# Create function to write the transition matrices to a CSV table (one row per class pair)
+def write_transitions(csvFile, transitions):
+    with open(csvFile, "w") as transitionTable:
+        writer = csv.writer(transitionTable, lineterminator="\n")
+        writer.writerow(["YEAR1", "YEAR2", "FROM_CLASS", "TO_CLASS", "COUNT"])
+        for (yearOfData1, yearOfData2), counts in transitions.items():
+            for fromClass in range(counts.shape[0]):
+                for toClass in range(counts.shape[1]):
+                    writer.writerow([yearOfData1, yearOfData2, fromClass + 1, toClass + 1, int(counts[fromClass, toClass])])
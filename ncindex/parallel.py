@@ -0,0 +1,16 @@
+"""
+WORKER PROCESS POOLS THAT ALSO START INSIDE ARCMAP AND ARCGIS PRO.
+"""
+
+import multiprocessing
+import os
+import sys
+
+
+# Create function to start a process pool, also when the script runs inside ArcGIS
+def create_pool(processes, initializer=None, initargs=()):
+    # Inside ArcMap/ArcGIS Pro sys.executable is the application, not the Python
+    # interpreter, so worker processes must be pointed at python.exe explicitly
+    if sys.platform == "win32" and not os.path.basename(sys.executable).lower().startswith("python"):
+        multiprocessing.set_executable(os.path.join(sys.exec_prefix, "python.exe"))
+    return multiprocessing.Pool(processes, initializer, initargs)
@@ -0,0 +1,84 @@
+"""
+FUSED IN-MEMORY CALCULATION OF THE NEIGHBORHOOD CHANGE INDEX.
+
+The indicator columns are read once, and the z-scores, negated z-scores, raw score and
+index are all calculated as arrays. Only the fields that nc-pt1.py keeps in its output
+(ZSCR, ZNEG, RAWSCR and INDEX) are produced; the MEAN and STDV columns that the
+standard mode adds and later deletes are never created. Records keep the order of
+the input table.
+
+combine_index starts from z-scores that are already known (for example from the
+z-score store of ncindex/zstore.py): negation is only a change of sign, so choosing
+other negated indicators never needs the z-scores to be calculated again.
+"""
+
+from collections import OrderedDict
+
+import numpy
+
+from ncindex import classify, jenks, zscore
+
+
+# Create function to calculate every output column of the index in memory
+def calculate_index(indicatorArray, varList, negList, yearOfData, classificationMethod, classNumber,
+                    sampleSize=None, variants=None):
+    """Return (columns, statistics, naturalBreaks).
+
+    columns is an ordered mapping of output field name to array, and statistics is a
+    list of (variable, mean, standard deviation) tuples for reporting. naturalBreaks is
+    the jenks.NaturalBreaks of INDEX (break values, goodness of variance fit and the
+    sampling bound) with the Natural Breaks method, and None otherwise. sampleSize is
+    the natural breaks sample size (all records when None). variants is a list of
+    extra (method, number of classes) pairs, each written to its own IDX field next
+    to INDEX; all of them are classified from one sort of the raw score.
+    """
+    """ STEP ONE: Z-SCORES """
+    zScoreResults = OrderedDict((variable, zscore.calculate_zscores(indicatorArray[variable])) for variable in varList)
+    return combine_index(zScoreResults, varList, negList, yearOfData, classificationMethod, classNumber,
+                         sampleSize, variants)
+
+
+# Create function to calculate every output column of the index from known z-scores
+def combine_index(zScoreResults, varList, negList, yearOfData, classificationMethod, classNumber,
+                  sampleSize=None, variants=None):
+    """Return (columns, statistics, naturalBreaks) like calculate_index.
+
+    zScoreResults maps each variable to its (mean, standard deviation, z-scores).
+    """
+    columns = OrderedDict()
+    statistics = []
+    rawScores = numpy.zeros(len(zScoreResults[varList[0]][2]), dtype=numpy.float64)
+
+    """ STEP TWO: Z-SCORES, NEGATED FOR INDICATORS THAT DETRACT FROM SCORE """
+    for position, variable in enumerate(varList):
+        mean, standardDev, zScores = zScoreResults[variable]
+        statistics.append((variable, mean, standardDev))
+        columns["ZSCR" + str(position) + "_" + yearOfData] = zScores
+        if variable in negList:
+            columns["ZNEG" + str(position) + "_" + yearOfData] = -zScores
+            rawScores -= zScores
+        else:
+            rawScores += zScores
+
+    """ STEP THREE: RAW SCORE """
+    columns["RAWSCR_" + yearOfData] = rawScores
+
+    """ STEP FOUR: CLASSIFICATION """
+    naturalBreaks = None
+    if variants:
+        variantClasses, variantBreaks = classify.classify_variants_with_breaks(
+            rawScores, [(classificationMethod, classNumber)] + list(variants), sampleSize)
+        columns["INDEX_" + yearOfData] = variantClasses[0]
+        for (variantMethod, variantClassNumber), classes in zip(variants, variantClasses[1:]):
+            columns[classify.variant_field_name(variantMethod, variantClassNumber, yearOfData)] = classes
+        if classificationMethod == "Natural Breaks":
+            naturalBreaks = variantBreaks[int(float(classNumber))]
+    elif classificationMethod == "Natural Breaks":
+        # Keep the breaks, their goodness of fit and sampling bound for the messages
+        naturalBreaks = jenks.natural_breaks(rawScores, classNumber, sampleSize)
+        columns["INDEX_" + yearOfData] = classify.classes_from_breaks(rawScores, naturalBreaks.breakValues)
+    else:
+        columns["INDEX_" + yearOfData] = classify.classify_scores(rawScores, classificationMethod, classNumber,
+                                                                  sampleSize)
+
+    return columns, statistics, naturalBreaks
@@ -0,0 +1,174 @@
+"""
+MONTE CARLO SENSITIVITY OF EACH RECORD'S INDEX CLASS.
+
+The raw score is an unweighted sum of (signed) z-scores. Each replicate perturbs that
+sum and classifies the result again, and the share of replicates that put a record in
+each class measures how stable the record's class is:
+    WEIGHTS      INDICATOR WEIGHTS ARE DRAWN FROM A DIRICHLET DISTRIBUTION SCALED TO A
+                 MEAN OF ONE (A HIGHER CONCENTRATION KEEPS THEM CLOSER TO EQUAL WEIGHTS)
+    BOOTSTRAP    EACH INDICATOR'S MEAN AND STANDARD DEVIATION ARE RECALCULATED FROM A
+                 BOOTSTRAP RESAMPLE OF THE RECORDS
+Either perturbation can add Gaussian noise (in standard deviations) to every z-score.
+
+Every perturbation only rescales and shifts the z-score columns, so the raw scores of
+R replicates are one matrix product, (N x V z-scores) . (V x R coefficients) plus an
+offset per replicate, and they are classified in bulk. A bootstrap resample is drawn
+as the number of times each record is picked, so the resampled means and variances
+are matrix products too. Replicates run in chunks sized to a memory budget; each
+replicate's random stream comes from the seed and the replicate number, so results
+depend on the seed but not on the chunk size.
+
+Output fields, per record:
+    MODCLS_yy    MODAL INDEX CLASS OVER THE REPLICATES
+    PMODE_yy     SHARE OF REPLICATES IN THE MODAL CLASS
+    PINDEX_yy    SHARE OF REPLICATES IN THE RECORD'S UNPERTURBED INDEX CLASS
+"""
+
+from collections import OrderedDict
+
+import numpy
+
+from ncindex import classify, jenks, zscore
+
+PERTURBATIONS = ("Weights", "Bootstrap")
+STABILITY_FIELDS = ("MODCLS", "PMODE", "PINDEX")
+
+# Default memory budget, in bytes, of the replicate arrays of one chunk
+MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Default number of sampled raw scores the natural breaks of each replicate come from in
+# nc-sensitivity.py: a Jenks optimization of 2000 values takes about 10 milliseconds
+BREAKS_SAMPLE_SIZE = 2000
+
+
+# Create function to list the stability field names of a year
+def stability_field_names(yearOfData):
+    return [name + "_" + yearOfData for name in STABILITY_FIELDS]
+
+
+# Create function to draw the coefficients of a chunk of replicates, one random stream each
+def perturbation_coefficients(indicatorValues, signs, perturbation, randoms, concentration=10.0):
+    """Return (scales, offsets): replicate raw scores are scales.dot(zMatrix.T) + offsets.
+
+    indicatorValues is the N x V array of indicators, signs the V signs (-1 for
+    negated indicators) and zMatrix the N x V array of signed z-scores; scales is
+    R x V and offsets has R values (a column vector).
+    """
+    recordCount, variableCount = indicatorValues.shape
+    if perturbation == "Weights":
+        alpha = numpy.full(variableCount, float(concentration))
+        scales = variableCount * numpy.array([random.dirichlet(alpha) for random in randoms])
+        return scales, numpy.zeros((len(randoms), 1))
+    if perturbation == "Bootstrap":
+        # Times each record is picked by each resample; z = (x - mean) / std, so the
+        # resampled statistics rescale and shift the unperturbed z-scores
+        pickCounts = numpy.array([numpy.bincount(random.randint(recordCount, size=recordCount), minlength=recordCount)
+                                  for random in randoms], dtype=numpy.float64)
+        deviations = indicatorValues - indicatorValues.mean(axis=0)
+        resampledMeans = pickCounts.dot(deviations) / recordCount
+        resampledVariances = (pickCounts.dot(deviations * deviations) - recordCount * resampledMeans ** 2) / (recordCount - 1)
+        resampledStd = numpy.sqrt(resampledVariances)
+        scales = indicatorValues.std(axis=0, ddof=1) / resampledStd
+        offsets = (-signs * resampledMeans / resampledStd).sum(axis=1)
+        return scales, offsets[:, None]
+    raise ValueError("unknown perturbation: " + str(perturbation))
+
+
+# Create function to classify every row (replicate) of a raw score matrix
+def classify_replicates(rawScores, classificationMethod, classNumber, sampleSize=None, randoms=None):
+    """Return an R x N array of classes (1 to classNumber).
+
+    Natural Breaks samples each replicate's raw scores from its random stream in
+    randoms (one per row), or from a stream seeded with the row number without them.
+    """
+    classNumber = int(float(classNumber))
+    replicateCount, recordCount = rawScores.shape
+    if classificationMethod == "Quantile":
+        # The value at the first rank of each class, by partial sort; a record moves up a
+        # class for each of these cut values it reaches
+        groupSize = classify.quantile_group_size(recordCount, classNumber)
+        cutRanks = groupSize * numpy.arange(1, classNumber)
+        cutRanks = cutRanks[cutRanks < recordCount]
+        classes = numpy.ones(rawScores.shape, dtype=numpy.int64)
+        if len(cutRanks) == 0:
+            return classes
+        cutValues = numpy.partition(rawScores, cutRanks, axis=1)[:, cutRanks]
+        tiedCounts = numpy.zeros(replicateCount, dtype=numpy.int64)
+        for cutNumber in range(len(cutRanks)):
+            cutColumn = cutValues[:, cutNumber:cutNumber + 1]
+            classes += rawScores >= cutColumn
+            tiedCounts += (rawScores == cutColumn).sum(axis=1) - 1
+        # Tied scores at a cut are split by record order, as classify.quantile_classes does
+        for replicate in numpy.flatnonzero(tiedCounts):
+            classes[replicate] = classify.quantile_classes(rawScores[replicate], classNumber)
+        return classes
+    if classificationMethod == "Equal Interval":
+        # Counting the breaks at or below each score is the binary search of classes_from_breaks
+        scoreMin = rawScores.min(axis=1)[:, None]
+        groupSize = (rawScores.max(axis=1)[:, None] - scoreMin) / float(classNumber)
+        classes = numpy.ones(rawScores.shape, dtype=numpy.int64)
+        for breakNumber in range(1, classNumber):
+            classes += rawScores >= scoreMin + groupSize * breakNumber
+        return classes
+    if classificationMethod == "Natural Breaks":
+        # One Jenks run per replicate, on a sample of its raw scores when sampleSize is given;
+        # the goodness of variance fit natural_breaks also calculates is not needed here
+        classes = numpy.empty(rawScores.shape, dtype=numpy.int64)
+        sampled = sampleSize and int(sampleSize) < recordCount
+        for replicate in range(replicateCount):
+            scores = rawScores[replicate]
+            if sampled:
+                random = randoms[replicate] if randoms is not None else numpy.random.RandomState(replicate)
+                scores = scores[random.randint(recordCount, size=int(sampleSize))]
+            breakValues = jenks.optimal_breaks(scores, numpy.ones(len(scores)), classNumber)
+            classes[replicate] = numpy.searchsorted(breakValues, rawScores[replicate], side="right") + 1
+        return classes
+    raise ValueError("unknown classification method: " + str(classificationMethod))
+
+
+# Create function to run the replicates and count each record's classes
+def calculate_stability(indicatorArray, varList, negList, yearOfData, classificationMethod, classNumber,
+                        replicateCount=1000, perturbation="Weights", concentration=10.0, noiseScale=0.0,
+                        seed=None, sampleSize=None, memoryBudget=MEMORY_BUDGET):
+    """Return (columns, classCounts).
+
+    columns maps INDEX_yy (the unperturbed index) and the stability fields to arrays;
+    classCounts is the N x classNumber array of replicates that put each record in
+    each class. sampleSize only applies to the Natural Breaks of the replicates: INDEX_yy
+    is classified from every raw score, as nc-pt1.py does.
+    """
+    classNumber = int(float(classNumber))
+    indicatorValues = numpy.column_stack([numpy.asarray(indicatorArray[variable], dtype=numpy.float64)
+                                          for variable in varList])
+    signs = numpy.array([-1.0 if variable in negList else 1.0 for variable in varList])
+    zMatrix = numpy.column_stack([zscore.calculate_zscores(indicatorValues[:, position])[2]
+                                  for position in range(len(varList))]) * signs
+    recordCount = len(zMatrix)
+    indexValues = classify.classify_scores(zMatrix.sum(axis=1), classificationMethod, classNumber)
+
+    # Raw scores, ranks and classes (or bootstrap pick counts) of a chunk each hold R x N values
+    chunkSize = max(int(memoryBudget // (32 * max(recordCount, 1))), 1)
+    zColumns = numpy.ascontiguousarray(zMatrix.T)
+    classCounts = numpy.zeros((recordCount, classNumber), dtype=numpy.int64)
+    for chunkStart in range(0, int(replicateCount), chunkSize):
+        replicates = range(chunkStart, min(chunkStart + chunkSize, int(replicateCount)))
+        randoms = [numpy.random.RandomState(None if seed is None else [int(seed), replicate]) for replicate in replicates]
+        scales, offsets = perturbation_coefficients(indicatorValues, signs, perturbation, randoms, concentration)
+        rawScores = scales.dot(zColumns) + offsets
+        if noiseScale:
+            # Independent noise on every z-score adds up to noise of scale * |coefficients| on the raw score
+            noiseStd = noiseScale * numpy.sqrt((scales * scales).sum(axis=1))
+            for row, random in enumerate(randoms):
+                rawScores[row] += random.normal(scale=noiseStd[row], size=recordCount)
+        classes = classify_replicates(rawScores, classificationMethod, classNumber, sampleSize, randoms)
+        for classValue in range(1, classNumber + 1):
+            classCounts[:, classValue - 1] += (classes == classValue).sum(axis=0)
+
+    modalClasses = classCounts.argmax(axis=1)
+    modeName, modeShareName, indexShareName = stability_field_names(yearOfData)
+    columns = OrderedDict()
+    columns["INDEX_" + yearOfData] = indexValues
+    columns[modeName] = (modalClasses + 1).astype(numpy.float64)
+    columns[modeShareName] = classCounts[numpy.arange(recordCount), modalClasses] / float(replicateCount)
+    columns[indexShareName] = classCounts[numpy.arange(recordCount), indexValues.astype(numpy.int64) - 1] / float(replicateCount)
+    return columns, classCounts
@@ -0,0 +1,241 @@
+"""
+LONG-LIVED SCORING SERVICE FOR WHAT-IF INDEX QUERIES.
+
+The attribute table is read once (without arcpy) and the z-scores of every numeric
+field are calculated once and kept in memory as one contiguous row per indicator.
+Each query names the indicators, the negated ones, optional weights and the
+classification, and the index is a weighted sum of stored rows plus one
+classification, with no table read or write. The raw scores and sort order of every
+recent indicator/weight combination are also kept, so trying other classification
+methods or numbers of classes on the same combination skips the sort.
+
+    python -m ncindex.service tracts.shp [--fields POV10;VAC10;INC10]
+        [--host 127.0.0.1 --port 8765 | --socket /tmp/ncindex.sock] [--workers 4]
+
+HTTP API (JSON):
+    GET  /fields   RECORD COUNT, AND THE MEAN AND STANDARD DEVIATION OF EACH INDICATOR
+    POST /index    {"indicators": ["POV10", "VAC10", "INC10"], "negative": ["POV10", "VAC10"],
+                    "weights": [1, 1, 2], "method": "Quantile", "classes": 5,
+                    "variants": [["Equal Interval", 5]], "rawScores": false}
+                   -> {"records": N, "INDEX": [...], "IDXE5": [...], "RAWSCR": [...]}
+Arrays are in record order, so position i is the feature with FID i.
+
+With several workers, the table is loaded before the workers are forked from the
+service process: they share its memory copy-on-write, so the z-scores exist once
+however many analysts query at the same time. Each worker keeps its own recent
+raw scores. On systems without fork (Windows) one process serves every request.
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import signal
+import sys
+from collections import OrderedDict
+
+try:
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    import SocketServer as socketserver
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+import numpy
+
+from ncindex import classify, dbf, zscore
+
+# Number of recent indicator/weight combinations whose raw scores are kept
+RECENT_SCORES = 32
+
+
+class ScoringService(object):
+    """Z-scores of a table's indicators held in memory, and the queries answered from them."""
+
+    def __init__(self, indicatorArray, fieldNames=None):
+        fieldNames = list(fieldNames or indicatorArray.dtype.names)
+        self.recordCount = len(indicatorArray)
+        self.statistics = OrderedDict()
+        zRows = []
+        for variable in fieldNames:
+            try:
+                mean, standardDev, zScores = zscore.calculate_zscores(indicatorArray[variable])
+            except ValueError:
+                # A constant field cannot be an indicator
+                continue
+            self.statistics[variable] = (mean, standardDev)
+            zRows.append(zScores)
+        self.fieldRows = dict((variable, row) for row, variable in enumerate(self.statistics))
+        self.zMatrix = numpy.array(zRows, dtype=numpy.float64).reshape(len(zRows), self.recordCount)
+        self._recentScores = OrderedDict()
+
+    # Create a service from a shapefile's .dbf, using every numeric field unless fields are given
+    @classmethod
+    def from_table(cls, table, fieldNames=None):
+        fieldNames = fieldNames or dbf.numeric_field_names(table)
+        return cls(dbf.read_columns(table, fieldNames), fieldNames)
+
+    # Return the raw scores of a combination of signed indicator weights and their sort order
+    def raw_scores(self, indicators, signedWeights):
+        key = (tuple(indicators), tuple(signedWeights))
+        if key in self._recentScores:
+            self._recentScores[key] = self._recentScores.pop(key)
+            return self._recentScores[key]
+        rows = [self.fieldRows[variable] for variable in indicators]
+        rawScores = numpy.dot(numpy.asarray(signedWeights, dtype=numpy.float64), self.zMatrix[rows])
+        self._recentScores[key] = (rawScores, numpy.argsort(rawScores, kind="mergesort"))
+        if len(self._recentScores) > RECENT_SCORES:
+            self._recentScores.popitem(last=False)
+        return self._recentScores[key]
+
+    def index(self, query):
+        """Return the response to an index query (a dictionary, see the module docstring)."""
+        indicators = list(query["indicators"])
+        unknown = [variable for variable in indicators if variable not in self.fieldRows]
+        if unknown:
+            raise ValueError("not an indicator of this table: " + ", ".join(unknown))
+        negList = set(query.get("negative") or [])
+        weights = query.get("weights") or [1.0] * len(indicators)
+        if len(weights) != len(indicators):
+            raise ValueError("there must be one weight per indicator")
+        signedWeights = [(-1.0 if variable in negList else 1.0) * float(weight)
+                         for variable, weight in zip(indicators, weights)]
+
+        rawScores, sortOrder = self.raw_scores(indicators, signedWeights)
+        classificationMethod = query.get("method", "Quantile")
+        classNumber = int(query.get("classes", 6))
+        variants = [(variantMethod, int(variantClasses)) for variantMethod, variantClasses in query.get("variants") or []]
+        if min([classNumber] + [variantClasses for variantMethod, variantClasses in variants]) < 1:
+            raise ValueError("the number of classes must be at least 1")
+        variantClasses = classify.classify_variants(rawScores, [(classificationMethod, classNumber)] + variants,
+                                                    query.get("sampleSize"), sortOrder)
+
+        response = OrderedDict([("records", self.recordCount), ("INDEX", variantClasses[0].astype(int).tolist())])
+        for (variantMethod, variantClassNumber), classes in zip(variants, variantClasses[1:]):
+            response["IDX" + classify.VARIANT_CODES[variantMethod] + str(variantClassNumber)] = classes.astype(int).tolist()
+        if query.get("rawScores"):
+            response["RAWSCR"] = rawScores.tolist()
+        return response
+
+    def fields(self):
+        return OrderedDict([("records", self.recordCount),
+                            ("indicators", OrderedDict((variable, {"mean": mean, "std": standardDev})
+                                                       for variable, (mean, standardDev) in self.statistics.items()))])
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Answers the HTTP API from the service of the server it belongs to."""
+
+    def _send_json(self, status, content):
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/fields":
+            self._send_json(200, self.server.service.fields())
+        else:
+            self._send_json(404, {"error": "unknown path " + self.path})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/index":
+            self._send_json(404, {"error": "unknown path " + self.path})
+            return
+        try:
+            query = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8"))
+            response = self.server.service.index(query)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(200, response)
+
+    # Unix sockets have no client address to report
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format, *arguments):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *arguments)
+
+
+class ServiceHTTPServer(HTTPServer):
+    def __init__(self, address, service, verbose=False):
+        HTTPServer.__init__(self, address, ServiceRequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class ServiceUnixServer(socketserver.UnixStreamServer):
+        def __init__(self, socketPath, service, verbose=False):
+            if os.path.exists(socketPath):
+                os.remove(socketPath)
+            socketserver.UnixStreamServer.__init__(self, socketPath, ServiceRequestHandler)
+            self.service = service
+            self.verbose = verbose
+
+
+# Create function to serve requests, from several forked workers where the system allows it
+def serve(server, workers=1):
+    if workers <= 1 or not hasattr(os, "fork"):
+        server.serve_forever()
+        return
+    # Objects that exist now never change, so the collector must not touch (and copy) their pages
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    workerIds = []
+    for worker in range(workers):
+        workerId = os.fork()
+        if workerId == 0:
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        workerIds.append(workerId)
+    try:
+        for workerId in workerIds:
+            os.waitpid(workerId, 0)
+    finally:
+        for workerId in workerIds:
+            try:
+                os.kill(workerId, signal.SIGTERM)
+            except OSError:
+                pass
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Serve what-if neighborhood change index queries from memory.")
+    parser.add_argument("table", help="input shapefile (or .dbf)")
+    parser.add_argument("--fields", help="indicator fields to load, separated by ';' (default: every numeric field)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="serve on this Unix socket instead of a TCP port")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes sharing the table")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    options = parser.parse_args(arguments)
+
+    service = ScoringService.from_table(options.table, options.fields.split(";") if options.fields else None)
+    if options.socket:
+        server = ServiceUnixServer(options.socket, service, options.verbose)
+        location = options.socket
+    else:
+        server = ServiceHTTPServer((options.host, options.port), service, options.verbose)
+        location = "http://" + options.host + ":" + str(server.server_address[1])
+    print("Serving " + str(len(service.statistics)) + " indicators of " + str(service.recordCount) +
+          " records at " + location)
+    sys.stdout.flush()
+    try:
+        serve(server, options.workers)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+FEATURE CENTROIDS READ FROM A SHAPEFILE'S GEOMETRY WITHOUT ARCPY.
+
+The spatial analysis of nc-pt2.py only needs one point per feature. The record
+offsets come from the .shx index, and the vertices of every record are gathered from
+the .shp with NumPy index arithmetic, never with a Python object per vertex:
+    POINTS           THE POINT
+    POLYGONS         THE AREA-WEIGHTED CENTROID OF THE RINGS (HOLES, WHICH WIND THE
+                     OTHER WAY, SUBTRACT), AS arcpy's SHAPE@XY GIVES
+    MULTIPOINTS AND  THE MEAN OF THE VERTICES
+    POLYLINES
+Null shapes get NaN coordinates.
+"""
+
+import os
+
+import numpy
+
+_POINT_TYPES = (1, 11, 21)
+_POLYGON_TYPES = (5, 15, 25)
+_PART_TYPES = (3, 13, 23, 5, 15, 25)
+_MULTIPOINT_TYPES = (8, 18, 28)
+
+
+# Create function to read the byte offset and length of every record from the .shx index
+def record_offsets(shapefile):
+    shxFile = os.path.splitext(shapefile)[0] + ".shx"
+    index = numpy.fromfile(shxFile, dtype=">i4", offset=100).reshape(-1, 2)
+    # Offsets and lengths are in 16-bit words; the content follows an 8-byte record header
+    return index[:, 0].astype(numpy.int64) * 2 + 8, index[:, 1].astype(numpy.int64) * 2
+
+
+# Create function to gather the little-endian values at many byte positions of a buffer
+def _gather(content, positions, dtype):
+    # Records start at any even byte, so the buffer is viewed as values at each alignment
+    itemSize = numpy.dtype(dtype).itemsize
+    values = numpy.empty(len(positions), dtype=dtype)
+    alignments = positions % itemSize
+    for alignment in numpy.unique(alignments):
+        aligned = alignments == alignment
+        valueCount = (len(content) - alignment) // itemSize
+        view = numpy.frombuffer(content, dtype=dtype, count=valueCount, offset=int(alignment))
+        values[aligned] = view[(positions[aligned] - alignment) // itemSize]
+    return values
+
+
+# Create function to read the centroid (x, y) of every feature into an (n, 2) array
+def read_centroids(shapefile):
+    contentStarts, contentLengths = record_offsets(shapefile)
+    content = numpy.memmap(os.path.splitext(shapefile)[0] + ".shp", dtype=numpy.uint8, mode="r")
+    recordCount = len(contentStarts)
+    centroids = numpy.full((recordCount, 2), numpy.nan)
+    if recordCount == 0:
+        return centroids
+    shapeTypes = numpy.where(contentLengths >= 4, _gather(content, contentStarts, "<i4"), 0)
+
+    points = numpy.flatnonzero(numpy.isin(shapeTypes, _POINT_TYPES))
+    if len(points):
+        centroids[points, 0] = _gather(content, contentStarts[points] + 4, "<f8")
+        centroids[points, 1] = _gather(content, contentStarts[points] + 12, "<f8")
+
+    # Multipoints list their vertices after the bounding box and count; parts come first in the others
+    multipoints = numpy.flatnonzero(numpy.isin(shapeTypes, _MULTIPOINT_TYPES))
+    withParts = numpy.flatnonzero(numpy.isin(shapeTypes, _PART_TYPES))
+    for records, pointCountOffset in ((multipoints, 36), (withParts, 40)):
+        if len(records) == 0:
+            continue
+        starts = contentStarts[records]
+        pointCounts = _gather(content, starts + pointCountOffset, "<i4").astype(numpy.int64)
+        partCounts = (_gather(content, starts + 36, "<i4").astype(numpy.int64) if pointCountOffset == 40
+                      else numpy.zeros(len(records), dtype=numpy.int64))
+        vertexStarts = starts + pointCountOffset + 4 + 4 * partCounts
+        recordFirstVertex = numpy.concatenate([[0], numpy.cumsum(pointCounts)[:-1]])
+        vertexPositions = (numpy.repeat(vertexStarts - 16 * recordFirstVertex, pointCounts) +
+                           16 * numpy.arange(pointCounts.sum()))
+        x = _gather(content, vertexPositions, "<f8")
+        y = _gather(content, vertexPositions + 8, "<f8")
+        hasVertices = pointCounts > 0
+        vertexSums = numpy.add.reduceat(numpy.column_stack([x, y]), recordFirstVertex[hasVertices], axis=0)
+        centroids[records[hasVertices]] = vertexSums / pointCounts[hasVertices, None]
+
+        polygons = numpy.isin(shapeTypes[records], _POLYGON_TYPES) & hasVertices
+        if not polygons.any():
+            continue
+        # Shoelace terms between each vertex and the next, except from the last vertex of a ring
+        recordFirstPart = numpy.concatenate([[0], numpy.cumsum(partCounts)[:-1]])
+        partPositions = numpy.repeat(starts + 44 - 4 * recordFirstPart, partCounts) + 4 * numpy.arange(partCounts.sum())
+        partStarts = _gather(content, partPositions, "<i4").astype(numpy.int64)
+        ringStarts = partStarts + numpy.repeat(recordFirstVertex, partCounts)
+        ringEnds = numpy.concatenate([ringStarts[1:], [len(x)]]) - 1
+        nextX = numpy.concatenate([x[1:], [0.0]])
+        nextY = numpy.concatenate([y[1:], [0.0]])
+        cross = x * nextY - nextX * y
+        cross[ringEnds] = 0.0
+        terms = numpy.column_stack([cross, (x + nextX) * cross, (y + nextY) * cross])
+        polygonRecords = numpy.flatnonzero(polygons)
+        sums = numpy.add.reduceat(terms, recordFirstVertex[hasVertices], axis=0)[numpy.searchsorted(
+            numpy.flatnonzero(hasVertices), polygonRecords)]
+        areas = sums[:, 0] / 2.0
+        withArea = areas != 0
+        centroids[records[polygonRecords[withArea]]] = sums[withArea, 1:] / (6.0 * areas[withArea, None])
+    return centroids
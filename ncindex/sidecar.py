@@ -0,0 +1,56 @@
+"""
+RESULT ATTRIBUTES WRITTEN TO A SIDECAR TABLE INSTEAD OF A COPY OF THE SHAPEFILE.
+
+Copying a shapefile to add result fields rewrites every polygon, although only
+attribute columns change. A sidecar is a dBASE table (.dbf, no geometry) holding the
+result fields and a key, INPUT_FID, equal to the FID of each record of the input
+shapefile. It is written in one bulk operation without arcpy (ncindex/dbf.py) and is
+joined back to the input's geometry on FID = INPUT_FID, in ArcMap (Joins > Add Join)
+or with arcio.join_table, which makes a joined feature layer without copying anything.
+
+Like a shapefile run through the tools for several years, one sidecar can collect the
+fields of several runs: when the sidecar exists and has one record per input feature,
+new fields are added to it and existing ones overwritten. A sidecar with another
+number of records (written for another input) is an error rather than replaced.
+"""
+
+import os
+from collections import OrderedDict
+
+import numpy
+
+from ncindex import dbf
+
+# Key field holding the input FID of each record
+SIDECAR_KEY = "INPUT_FID"
+KEY_FIELD = ("LONG", 10, 0, "")
+
+
+# Create function to name the sidecar table of an output (a .dbf is used as it is)
+def sidecar_path(output):
+    base, extension = os.path.splitext(output)
+    return output if extension.lower() == ".dbf" else base + "_attr.dbf"
+
+
+# Create function to write result columns (field name -> array) to a sidecar table
+def write_sidecar(sidecarTable, columns):
+    """Create the sidecar, or add the columns to an existing one; return its path.
+
+    An existing sidecar with another number of records belongs to another input, and
+    is never replaced (which would discard the fields of earlier runs): ValueError.
+    """
+    sidecarTable = sidecar_path(sidecarTable)
+    recordCount = len(next(iter(columns.values())))
+    fieldSpecs = dbf.column_field_specs(columns)
+    if os.path.exists(sidecarTable):
+        sidecarCount = dbf.read_header(sidecarTable)[0]
+        if sidecarCount != recordCount:
+            raise ValueError("the sidecar table " + sidecarTable + " has " + str(sidecarCount) + " records, not the " +
+                             str(recordCount) + " of the input; delete it or choose another output name")
+        dbf.write_columns(sidecarTable, columns, fieldSpecs)
+        return sidecarTable
+    keyedColumns = OrderedDict([(SIDECAR_KEY, numpy.arange(recordCount))])
+    keyedColumns.update(columns)
+    fieldSpecs[SIDECAR_KEY] = KEY_FIELD
+    dbf.create_table(sidecarTable, keyedColumns, fieldSpecs)
+    return sidecarTable
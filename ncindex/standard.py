@@ -0,0 +1,188 @@
+"""
+THE STANDARD PROCESSING MODE OF nc-pt1.py, STEP BY STEP THROUGH ARCPY.
+
+Every intermediate field (MEAN, STDV, ZSCR, ZNEG, RAWSCR) is added to the output
+shapefile and filled with its own cursor pass, so that each step can be inspected in
+ArcMap; the MEAN and STDV fields are deleted at the end. This module imports arcpy and
+is only imported when the Standard processing mode runs with the arcpy backend.
+"""
+
+import arcpy
+
+from ncindex import arcio, classify, jenks, zscore
+
+
+# Create function to calculate the index of a shapefile one step (and field) at a time
+def run_standard(nameOfInputShapefile, nameOfOutputShapefile, varList, negList, yearOfData, classificationMethod,
+                 classNumber, breaksSampleSize, variants, timer):
+    zScoreList = []  # a list of the variable fields that will count towards raw score (combination of z-scores and some z-scores * -1)
+
+    # Replicate the input shapefile
+    with timer.stage("COPY INPUT"):
+        arcpy.Copy_management(nameOfInputShapefile, nameOfOutputShapefile)
+
+    """ STEP ONE: CALCULATE Z-SCORE OF EACH INDICATOR FIELD """
+    # Read every indicator column into memory once, so that the mean and standard
+    # deviation of each indicator are calculated once instead of once per record
+    with timer.stage("STEP ONE: READ INDICATORS"):
+        indicatorArray = arcpy.da.TableToNumPyArray(nameOfOutputShapefile, varList)
+
+    # Process each variable in the user-defined variable list
+    for variable in varList:
+        arcpy.AddMessage("Processing: " + variable)
+
+        with timer.stage("STEP ONE: ZSCR " + variable, len(indicatorArray)):
+            # Concatenate the list order number to the field name and add a new field called "MEAN"
+            meanName = ("MEAN" + str(varList.index(variable)) + str("_" + yearOfData))
+            arcpy.AddField_management(nameOfOutputShapefile, meanName, "FLOAT", 20, 10)
+
+            # Concatenate the list order number to the field name and add a new field called "STDDEV"
+            stdDevName = ("STDV" + str(varList.index(variable)) + str("_" + yearOfData))
+            arcpy.AddField_management(nameOfOutputShapefile, stdDevName, "FLOAT", 20, 10)
+
+            # Concatenate the list order number to the field name and add another new field called "ZSCORE"
+            zName = ("ZSCR" + str(varList.index(variable)) + str("_" + yearOfData))
+            arcpy.AddField_management(nameOfOutputShapefile, zName, "FLOAT", 20, 10)
+
+            # Calculate sample mean, standard deviation and every z-score in one pass
+            mean, standardDev, zScores = zscore.calculate_zscores(indicatorArray[variable])
+
+            # Write the mean, standard deviation and z-score columns in a single cursor pass
+            with arcpy.da.UpdateCursor(nameOfOutputShapefile, [meanName, stdDevName, zName]) as enumerationOfRecords:
+                for recordNumber, nextRecord in enumerate(enumerationOfRecords):
+                    enumerationOfRecords.updateRow([mean, standardDev, zScores[recordNumber]])
+
+            # add the zscore field name for this variable to the zScoreList
+            zScoreList.append(zName)
+
+            arcpy.AddMessage("The mean value if this indicator is " + str(mean))
+            arcpy.AddMessage("The standard deviation of this indicator is " + str(standardDev))
+            arcpy.AddMessage("Z-score calculated" + "\n")
+
+
+        """ STEP TWO: MAKE THE ZSCORES OF USER CHOSEN VARIABLES NEGATIVE TO DETRACT FROM SCORE """
+        if variable in negList:
+            with timer.stage("STEP TWO: ZNEG " + variable, len(indicatorArray)):
+                # Concatenate the list order number to the field name
+                # Add another new field called "ZNEG"
+                zNegName = ("ZNEG" + str(varList.index(variable)) + str("_" + yearOfData))
+                arcpy.AddField_management(nameOfOutputShapefile, zNegName, "FLOAT", 20, 10)
+
+                # Create an enumeration of updatable records from the shapefile's attribute table
+                enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefile)
+                for nextRecord in enumerationOfRecords:
+                    #Multiply z-score by -1
+                    nextNeg   = nextRecord.getValue(zName)
+                    calcNegZ   = nextNeg * -1
+                    nextRecord.setValue(zNegName,calcNegZ)
+                    enumerationOfRecords.updateRow(nextRecord)
+
+                # add the zscore field name for the negative variable to the zScoreList, and remove the
+                # regular zscore field name for this same variable from the list
+                zScoreList.append(zNegName)
+                zScoreList.remove(zName)
+
+                # Add message
+                arcpy.AddMessage("Negative of Z-score calculated" + "\n")
+
+                # Delete row and update cursor objects to avoid locking attribute table
+                del nextRecord
+                del enumerationOfRecords
+
+    """ STEP THREE: ADD Z-SCORES TOGETHER FOR RAW INDEX SCORE """
+    with timer.stage("STEP THREE: RAWSCR", len(indicatorArray)):
+        arcpy.AddMessage("These fields are used to calculate the z-score: " + str(zScoreList))
+        rawField = ("RAWSCR_" + yearOfData)
+        arcpy.AddField_management(nameOfOutputShapefile, rawField, "FLOAT", 20, 10)
+
+        # Create an enumeration of updatable records from the shapefile's attribute table
+        enumerationOfRecords = arcpy.UpdateCursor(nameOfOutputShapefile)
+
+        # Loop through that enumeration, calculating each record's raw score
+        for nextRecord in enumerationOfRecords:
+            newList = []
+            for i in list(zScoreList):
+                newList.append(nextRecord.getValue(i))
+            rawScore = sum(newList)
+            nextRecord.setValue(rawField,rawScore)
+            enumerationOfRecords.updateRow(nextRecord)
+
+        # Add message
+        arcpy.AddMessage("Raw score calculated" + "\n")
+
+        # Delete row and update cursor objects to avoid locking attribute table
+        del nextRecord
+        del enumerationOfRecords
+
+    """ STEP FOUR: DEFINE CLASSIFICATION AND ASSIGN INDEX SCORE """
+    # Read the raw score column once; the classes are assigned in record order, so the
+    # table is never sorted into a second shapefile
+    with timer.stage("STEP FOUR: CLASSIFY", len(indicatorArray)):
+        rawScores = arcio.read_columns(nameOfOutputShapefile, [rawField])[rawField]
+
+        """ STEP 4.01: IF USER CHOOSES QUANTILE CLASSIFICATION """
+        if classificationMethod == "Quantile":
+            arcpy.AddMessage("Calculating index score based on Quantile classification method")
+            arcpy.AddMessage("Count of features is " + str(len(rawScores)))
+
+            # Divide count into specified number of groups to get the size of each classification group
+            groupSizeInt = classify.quantile_group_size(len(rawScores), classNumber)
+            arcpy.AddMessage("Index groups each have " + str(groupSizeInt) + " features in them" + "\n")
+
+        """ STEP 4.02: IF USER CHOOSES EQUAL INTERVAL CLASSIFICATION """
+        if classificationMethod == "Equal Interval":
+            arcpy.AddMessage("Calculating index score based on Equal Interval classification method")
+            arcpy.AddMessage("The range of raw score values is " + str(rawScores.max() - rawScores.min()))
+
+            # Define value of variable feature at break point locations in list
+            breakValueList = classify.equal_interval_breaks(rawScores, classNumber)
+            arcpy.AddMessage("The minimum value of the raw score field is " + str(rawScores.min()))
+            arcpy.AddMessage("The break values between index groups are " + str(list(breakValueList)) + "\n")
+
+        """ STEP 4.03: IF USER CHOOSES NATURAL BREAKS CLASSIFICATION """
+        if classificationMethod == "Natural Breaks":
+            arcpy.AddMessage("Calculating index score based on Natural Breaks classification method")
+            naturalBreaks = jenks.natural_breaks(rawScores, classNumber, breaksSampleSize)
+            breakValueList = naturalBreaks.breakValues
+            for breaksMessage in jenks.breaks_messages(naturalBreaks):
+                arcpy.AddMessage(breaksMessage)
+            arcpy.AddMessage("")
+
+        """ STEP 4.04: ASSIGN INDEX SCORE """
+        # Create index field
+        index = ("INDEX_" + yearOfData)
+        arcpy.AddField_management(nameOfOutputShapefile, index, "FLOAT", 20, 10)
+
+        arcpy.AddMessage("Assigning index score to each feature" + "\n")
+        if classificationMethod == "Natural Breaks":
+            # Reuse the breaks reported above rather than calculating them again
+            indexScores = classify.classes_from_breaks(rawScores, breakValueList)
+        else:
+            indexScores = classify.classify_scores(rawScores, classificationMethod, classNumber)
+        indexColumns = {index: indexScores}
+
+        """ STEP 4.05: CLASSIFICATION VARIANTS, ALL FROM ONE SORT OF THE RAW SCORE """
+        if variants:
+            for (variantMethod, variantClassNumber), classes in zip(variants, classify.classify_variants(
+                    rawScores, variants, breaksSampleSize)):
+                variantName = classify.variant_field_name(variantMethod, variantClassNumber, yearOfData)
+                arcpy.AddField_management(nameOfOutputShapefile, variantName, "FLOAT", 20, 10)
+                indexColumns[variantName] = classes
+            arcpy.AddMessage("Classification variants calculated: " + str([name for name in indexColumns if name != index]) + "\n")
+
+        # Write the index and every variant in one cursor pass
+        arcio.write_columns(nameOfOutputShapefile, indexColumns)
+
+    """ STEP FIVE: DELETE INTERMEDIATE COLUMNS """
+    # Delete intermediate columns for each variable in the user-defined variable list
+    with timer.stage("STEP FIVE: DELETE FIELDS"):
+        for variable in varList:
+            arcpy.AddMessage("Deleting intermediate columns for: " + variable)
+
+            # Concatenate the list order number to the field name and delete the field called "MEAN"
+            meanName = ("MEAN" + str(varList.index(variable)) + str("_" + yearOfData))
+            arcpy.DeleteField_management (nameOfOutputShapefile, meanName)
+
+            # Concatenate the list order number to the field name and delete the field called "STDDEV"
+            stdDevName = ("STDV" + str(varList.index(variable)) + str("_" + yearOfData))
+            arcpy.DeleteField_management (nameOfOutputShapefile, stdDevName)
@@ -0,0 +1,246 @@
+"""
+OUT-OF-CORE CALCULATION OF THE NEIGHBORHOOD CHANGE INDEX.
+
+For inputs too large to hold in memory (parcel-level runs with millions of features),
+the index is calculated from batches of records in three passes, so peak memory
+depends on the batch size rather than the number of features:
+    1. READ PASS     MEAN AND STANDARD DEVIATION OF EACH INDICATOR ARE ACCUMULATED WITH
+                     MERGEABLE ONE-PASS MOMENTS (WELFORD / CHAN)
+    2. READ PASS     RAW SCORES ARE CALCULATED PER BATCH AND FED TO A MERGEABLE QUANTILE
+                     SKETCH (QUANTILE, NATURAL BREAKS) OR A RUNNING MINIMUM AND MAXIMUM
+                     (EQUAL INTERVAL)
+    3. WRITE PASS    ZSCR, ZNEG, RAWSCR AND INDEX ARE WRITTEN FOR EVERY RECORD
+
+Raw scores depend on every indicator's mean and standard deviation, so their class
+breaks cannot be known before the first pass has finished; that is why the two read
+passes are separate. Quantile breaks are approximate: the sketch keeps a guaranteed
+bound on how far (in records) the rank of each break may be from its exact rank.
+Natural breaks are the Jenks breaks of the values the sketch keeps, weighted by the
+number of records each stands for, so the same rank bound holds for them.
+"""
+
+from __future__ import division
+
+import bisect
+import math
+
+import numpy
+
+from ncindex import classify, jenks
+
+
+class MomentAccumulator(object):
+    """Running count, mean and sum of squared deviations for each column of a batch."""
+
+    def __init__(self, columnCount):
+        self.count = 0
+        self.mean = numpy.zeros(columnCount, dtype=numpy.float64)
+        self.sumSquares = numpy.zeros(columnCount, dtype=numpy.float64)
+
+    # Merge the moments of another batch or accumulator (Chan et al. pairwise update)
+    def _combine(self, count, mean, sumSquares):
+        if count == 0:
+            return
+        totalCount = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / totalCount)
+        self.sumSquares = self.sumSquares + sumSquares + delta ** 2 * (self.count * count / totalCount)
+        self.count = totalCount
+
+    def update(self, chunkValues):
+        chunkValues = numpy.asarray(chunkValues, dtype=numpy.float64)
+        if len(chunkValues) == 0:
+            return
+        chunkMean = chunkValues.mean(axis=0)
+        self._combine(len(chunkValues), chunkMean, ((chunkValues - chunkMean) ** 2).sum(axis=0))
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.sumSquares)
+
+    # Sample (n - 1) standard deviation, the convention of Statistics_analysis STD
+    def std(self):
+        return numpy.sqrt(self.sumSquares / (self.count - 1))
+
+
+class QuantileSketch(object):
+    """Mergeable quantile sketch built from a stack of compactors.
+
+    Values enter level 0 with a weight of one. When a level holds more than
+    `capacity` values it is sorted and every other value (from a random offset) moves
+    up a level with twice the weight. Each compaction of a level with weight w moves
+    any rank by at most w, and the sum of those weights is kept in rankErrorBound, a
+    guaranteed bound on the rank error of every quantile the sketch returns.
+    """
+
+    def __init__(self, capacity=20000, seed=None):
+        self.capacity = max(int(capacity), 2)
+        self.levels = [numpy.empty(0, dtype=numpy.float64)]
+        self.count = 0
+        self.rankErrorBound = 0
+        self._random = numpy.random.RandomState(seed)
+
+    # Create a sketch whose rank error stays below errorBound * expectedCount
+    @classmethod
+    def for_error_bound(cls, errorBound, expectedCount, seed=None):
+        errorBound = float(errorBound)
+        if not 0 < errorBound < 1:
+            raise ValueError("the quantile error bound must be a share of records between 0 and 1, not " +
+                             str(errorBound))
+        # Every level adds at most count / capacity to the rank error
+        levelCount = max(math.log(max(expectedCount, 2), 2), 1.0)
+        return cls(math.ceil(levelCount / errorBound), seed)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            values = self.levels[level]
+            if len(values) > self.capacity:
+                values = numpy.sort(values)
+                # An odd value out stays at this level so no weight is lost
+                keep = values[-1:] if len(values) % 2 else values[:0]
+                paired = values[:len(values) - len(keep)]
+                promoted = paired[self._random.randint(2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(numpy.empty(0, dtype=numpy.float64))
+                self.levels[level + 1] = numpy.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+                self.rankErrorBound += 2 ** level
+            level += 1
+
+    def update(self, values):
+        values = numpy.asarray(values, dtype=numpy.float64).ravel()
+        self.levels[0] = numpy.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(numpy.empty(0, dtype=numpy.float64))
+        for level, values in enumerate(other.levels):
+            self.levels[level] = numpy.concatenate([self.levels[level], values])
+        self.count += other.count
+        self.rankErrorBound += other.rankErrorBound
+        self._compress()
+
+    # Return the values kept by the sketch and the number of stream values each stands for
+    def weighted_values(self):
+        values = numpy.concatenate(self.levels)
+        weights = numpy.concatenate([numpy.full(len(levelValues), 2 ** level, dtype=numpy.int64)
+                                     for level, levelValues in enumerate(self.levels)])
+        return values, weights
+
+    # Return the value at each (zero-based) rank of the full stream
+    def values_at_ranks(self, ranks):
+        values, weights = self.weighted_values()
+        sortOrder = numpy.argsort(values, kind="mergesort")
+        cumulativeWeights = numpy.cumsum(weights[sortOrder])
+        positions = numpy.searchsorted(cumulativeWeights, numpy.asarray(ranks) + 1, side="left")
+        return values[sortOrder][numpy.minimum(positions, len(values) - 1)]
+
+
+class StreamingIndex(object):
+    """Three-pass index calculation over batches of indicator values.
+
+    Every batch is a two-dimensional array with one column per indicator, in the order
+    of varList.
+    """
+
+    def __init__(self, varList, negList, yearOfData, classificationMethod, classNumber,
+                 errorBound=0.001, expectedCount=1000000, seed=0):
+        self.varList = list(varList)
+        self.yearOfData = yearOfData
+        self.classificationMethod = classificationMethod
+        self.classNumber = int(float(classNumber))
+        self.signs = numpy.array([-1.0 if variable in negList else 1.0 for variable in self.varList])
+        self.moments = MomentAccumulator(len(self.varList))
+        self.sketch = QuantileSketch.for_error_bound(errorBound, expectedCount, seed)
+        self.scoreMin = numpy.inf
+        self.scoreMax = -numpy.inf
+        self.breakValues = None
+
+    # Output fields, in the order they are added to the shapefile
+    def output_field_names(self):
+        fieldNames = []
+        for position, sign in enumerate(self.signs):
+            fieldNames.append("ZSCR" + str(position) + "_" + self.yearOfData)
+            if sign < 0:
+                fieldNames.append("ZNEG" + str(position) + "_" + self.yearOfData)
+        return fieldNames + ["RAWSCR_" + self.yearOfData, "INDEX_" + self.yearOfData]
+
+    # PASS ONE: MEAN AND STANDARD DEVIATION
+    def add_statistics_chunk(self, chunkValues):
+        self.moments.update(chunkValues)
+
+    def statistics(self):
+        return list(zip(self.varList, self.moments.mean, self.moments.std()))
+
+    # PASS TWO: RAW SCORE DISTRIBUTION
+    def raw_scores(self, chunkValues):
+        zScores = (numpy.asarray(chunkValues, dtype=numpy.float64) - self.moments.mean) / self.moments.std()
+        return zScores.dot(self.signs)
+
+    def add_raw_score_chunk(self, chunkValues):
+        rawScores = self.raw_scores(chunkValues)
+        if len(rawScores) == 0:
+            return
+        self.scoreMin = min(self.scoreMin, rawScores.min())
+        self.scoreMax = max(self.scoreMax, rawScores.max())
+        if self.classificationMethod in ("Quantile", "Natural Breaks"):
+            self.sketch.update(rawScores)
+
+    # Find the class break values once the raw score distribution is known
+    def finish_breaks(self):
+        if self.classificationMethod == "Quantile":
+            # Break j is the value at the first rank of class j + 1
+            groupSize = classify.quantile_group_size(self.sketch.count, self.classNumber)
+            breakRanks = groupSize * numpy.arange(1, self.classNumber)
+            self.breakValues = self.sketch.values_at_ranks(breakRanks)
+        elif self.classificationMethod == "Equal Interval":
+            groupSize = (self.scoreMax - self.scoreMin) / float(self.classNumber)
+            self.breakValues = self.scoreMin + groupSize * numpy.arange(1, self.classNumber)
+        elif self.classificationMethod == "Natural Breaks":
+            # Jenks breaks of the sketch's values, each weighted by the records it stands for
+            sketchValues, sketchWeights = self.sketch.weighted_values()
+            self.breakValues = jenks.optimal_breaks(sketchValues, sketchWeights, self.classNumber)
+        else:
+            raise ValueError("unknown classification method: " + str(self.classificationMethod))
+
+        # Plain Python copies of the coefficients for score_row
+        self._rowCoefficients = list(zip(self.moments.mean.tolist(), self.moments.std().tolist(),
+                                         self.signs.tolist()))
+        self._rowBreaks = self.breakValues.tolist()
+        return self.breakValues
+
+    # Largest distance, in records, between an approximate break's rank and its exact rank
+    def rank_error_bound(self):
+        if self.classificationMethod in ("Quantile", "Natural Breaks"):
+            return self.sketch.rankErrorBound
+        return 0
+
+    # PASS THREE: OUTPUT VALUES
+    def score_chunk(self, chunkValues):
+        """Return a list of output columns (arrays) in the order of output_field_names."""
+        zScores = (numpy.asarray(chunkValues, dtype=numpy.float64) - self.moments.mean) / self.moments.std()
+        rawScores = zScores.dot(self.signs)
+        outputColumns = []
+        for position, sign in enumerate(self.signs):
+            outputColumns.append(zScores[:, position])
+            if sign < 0:
+                outputColumns.append(-zScores[:, position])
+        outputColumns.append(rawScores)
+        outputColumns.append(classify.classes_from_breaks(rawScores, self.breakValues))
+        return outputColumns
+
+    # Row-at-a-time version of score_chunk for cursors that update one record at a time
+    def score_row(self, rowValues):
+        outputValues = []
+        rawScore = 0.0
+        for value, (mean, standardDev, sign) in zip(rowValues, self._rowCoefficients):
+            zScore = (value - mean) / standardDev
+            outputValues.append(zScore)
+            if sign < 0:
+                outputValues.append(-zScore)
+            rawScore += sign * zScore
+        outputValues.append(rawScore)
+        outputValues.append(float(bisect.bisect_right(self._rowBreaks, rawScore) + 1))
+        return outputValues
@@ -0,0 +1,143 @@
+"""
+PER-STAGE TIMING AND OPT-IN PROFILING OF THE INDEX TOOLS.
+
+Each named stage of a run (STEP ONE, a cursor pass, one indicator...) is wrapped in
+recorder.stage(name, rows). When the recorder is enabled it keeps, for every stage:
+    stage             NAME OF THE STAGE
+    seconds           WALL TIME
+    rows              RECORDS PROCESSED (WHEN KNOWN)
+    rows_per_second   RECORDS PER SECOND (WHEN ROWS ARE KNOWN)
+    peak_rss_bytes    PEAK RESIDENT MEMORY OF THE PROCESS AT THE END OF THE STAGE
+and appends it as one JSON line to the timing log. summary() formats every stage as a
+table for the tool messages. Stages named in the profile list (or "*" for all) also
+run under cProfile, and their statistics are saved next to the timing log.
+
+When the recorder is disabled, stage() hands back one shared do-nothing context
+manager, so instrumented code costs a method call per stage and nothing per record.
+
+The environment variables NCINDEX_TIMING (path of the timing log) and NCINDEX_PROFILE
+(comma-separated stage names) turn the recorder on without changing the tools' inputs.
+"""
+
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Create function to find the peak resident memory of this process, in bytes
+def peak_rss_bytes():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                    ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    return None
+
+
+class _DisabledStage(object):
+    """Context manager that does nothing, shared by every stage of a disabled recorder."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, exceptionTraceback):
+        return False
+
+
+_DISABLED_STAGE = _DisabledStage()
+
+
+class _Stage(object):
+    """Context manager that times (and optionally profiles) one stage."""
+
+    def __init__(self, recorder, name, rows):
+        self.recorder = recorder
+        self.name = name
+        self.rows = rows
+        self.profile = None
+
+    def __enter__(self):
+        if self.recorder.profiles(self.name):
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.startTime = time.time()
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, exceptionTraceback):
+        seconds = time.time() - self.startTime
+        if self.profile is not None:
+            self.profile.disable()
+            self.recorder.save_profile(self.name, self.profile)
+        self.recorder.record(self.name, seconds, self.rows)
+        return False
+
+
+class StageRecorder(object):
+    """Collects the timing of every stage of one run."""
+
+    def __init__(self, enabled=False, logFile=None, profileStages=None):
+        self.enabled = bool(enabled or logFile or profileStages)
+        self.logFile = logFile
+        self.profileStages = set(profileStages or [])
+        self.records = []
+
+    # Create a recorder configured by NCINDEX_TIMING and NCINDEX_PROFILE (and an optional log file)
+    @classmethod
+    def from_environment(cls, logFile=None):
+        profileText = os.environ.get("NCINDEX_PROFILE", "")
+        return cls(logFile=logFile or os.environ.get("NCINDEX_TIMING") or None,
+                   profileStages=[name.strip() for name in profileText.split(",") if name.strip()])
+
+    def stage(self, name, rows=None):
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return _Stage(self, name, rows)
+
+    def profiles(self, name):
+        return "*" in self.profileStages or name in self.profileStages
+
+    def record(self, name, seconds, rows=None):
+        stageRecord = {"stage": name, "seconds": seconds, "rows": rows,
+                       "rows_per_second": rows / seconds if rows and seconds > 0 else None,
+                       "peak_rss_bytes": peak_rss_bytes()}
+        self.records.append(stageRecord)
+        if self.logFile:
+            with open(self.logFile, "a") as timingLog:
+                timingLog.write(json.dumps(stageRecord) + "\n")
+
+    # Save the cProfile statistics of a stage next to the timing log (or in the working folder)
+    def save_profile(self, name, profile):
+        profileFolder = os.path.dirname(os.path.abspath(self.logFile)) if self.logFile else os.getcwd()
+        fileName = "".join(character if character.isalnum() else "_" for character in name) + ".prof"
+        profile.dump_stats(os.path.join(profileFolder, fileName))
+
+    def summary(self):
+        lines = ["%-40s %10s %12s %14s %12s" % ("STAGE", "SECONDS", "ROWS", "ROWS/SECOND", "PEAK MB")]
+        for stageRecord in self.records:
+            lines.append("%-40s %10.3f %12s %14s %12s" % (
+                stageRecord["stage"][:40], stageRecord["seconds"],
+                "" if stageRecord["rows"] is None else stageRecord["rows"],
+                "" if stageRecord["rows_per_second"] is None else "%.0f" % stageRecord["rows_per_second"],
+                "" if stageRecord["peak_rss_bytes"] is None else "%.1f" % (stageRecord["peak_rss_bytes"] / 1e6)))
+        return "\n".join(lines)
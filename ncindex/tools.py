@@ -0,0 +1,367 @@
+"""
+THE INDEX AND CHANGE TOOLS, INDEPENDENT OF ARCPY.
+
+The scripts only read their parameters and call one of these functions with a backend
+(see ncindex/backends.py) that reads and writes the tables and reports the messages.
+With the NumPy backend nothing here imports arcpy:
+    run_index_tool          nc-pt1.py: EVERY PROCESSING MODE BUT STANDARD, WHICH NEEDS
+                            ARCPY (ncindex/standard.py) AND OTHERWISE RUNS AS THE FUSED
+                            PROCESSING MODE
+    run_change_tool         nc-pt2.py: THE CHANGE FIELDS AND THE NATIVE ENGINE; THE ARCGIS
+                            ENGINE NEEDS ARCPY AND OTHERWISE RUNS AS THE NATIVE ENGINE
+    run_panel_tool          nc-panel.py: THE INDEX OF SEVERAL YEARS AND THE CHANGE BETWEEN THEM
+    run_sensitivity_tool    nc-sensitivity.py: THE STABILITY OF EACH RECORD'S INDEX CLASS
+The processing modes and outputs are described in the docstrings of the scripts.
+"""
+
+from collections import OrderedDict
+
+from ncindex import (change, columnar, groups, jenks, moran, panel, pipeline, sensitivity, sidecar, streaming, timing,
+                     weights, zstore)
+from ncindex.fields import FLOAT_FIELD, TEXT_FIELD
+
+
+# Create function to calculate the index of the indicator fields of a table (nc-pt1.py)
+def run_index_tool(backend, nameOfInputShapefile, varList, negList, yearOfData, nameOfOutputShapefile,
+                   classificationMethod, classNumber, processingMode="Standard", chunkSize=100000,
+                   quantileErrorBound=0.001, groupField="", breaksSampleSize=None, variants=(), zScoreStoreFolder="",
+                   columnarOutput="", columnarOnly=False, attributeOnly=False, timer=None):
+    timer = timer or timing.StageRecorder()
+    columnarOnly = columnarOnly and bool(columnarOutput)
+    if attributeOnly and processingMode == "Streaming":
+        backend.warning("The Streaming processing mode writes an output shapefile, not an attribute table" + "\n")
+        attributeOnly = False
+
+    # Report input and output files
+    backend.message('\n' + "The input shapefile name is " + nameOfInputShapefile)
+    if attributeOnly:
+        backend.message("The output attribute table name is " + sidecar.sidecar_path(nameOfOutputShapefile))
+    elif not columnarOnly:
+        backend.message("The output shapefile name is " + nameOfOutputShapefile)
+    if columnarOutput:
+        backend.message("The columnar output file is " + columnarOutput)
+    backend.message("This is an index for year '" + yearOfData)
+    backend.message("The variables used as indicators in the index are " + str(varList) + "\n")
+
+    if processingMode == "Streaming" and not groupField:
+        _run_streaming(backend, nameOfInputShapefile, varList, negList, yearOfData, nameOfOutputShapefile,
+                       classificationMethod, classNumber, chunkSize, quantileErrorBound, variants, zScoreStoreFolder,
+                       columnarOutput, timer)
+    elif (processingMode in ("Fused", "Streaming") or groupField or columnarOutput or attributeOnly or
+          backend.name != "arcpy"):
+        if processingMode == "Standard" and not (groupField or columnarOutput or attributeOnly):
+            backend.message("The Standard processing mode needs arcpy; the index is calculated in the Fused processing mode")
+        _run_fused(backend, nameOfInputShapefile, varList, negList, yearOfData, nameOfOutputShapefile,
+                   classificationMethod, classNumber, groupField, breaksSampleSize, variants, zScoreStoreFolder,
+                   columnarOutput, columnarOnly, attributeOnly, timer)
+    else:
+        if zScoreStoreFolder:
+            backend.warning("The z-score store is not used in the Standard processing mode" + "\n")
+        # Imported here, as it imports arcpy
+        from ncindex.standard import run_standard
+        run_standard(nameOfInputShapefile, nameOfOutputShapefile, varList, negList, yearOfData, classificationMethod,
+                     classNumber, breaksSampleSize, variants, timer)
+
+    # Report the time, throughput and memory of each stage
+    if timer.enabled:
+        backend.message("\n" + timer.summary() + "\n")
+
+
+# Create function to run the Fused processing mode: read once, calculate in memory, write the final fields once
+def _run_fused(backend, nameOfInputShapefile, varList, negList, yearOfData, nameOfOutputShapefile,
+               classificationMethod, classNumber, groupField, breaksSampleSize, variants, zScoreStoreFolder,
+               columnarOutput, columnarOnly, attributeOnly, timer):
+    backend.message("Calculating index in memory (Fused processing mode)" + "\n")
+    if groupField:
+        if zScoreStoreFolder:
+            backend.warning("The z-score store is not used when the index is calculated separately for each group" + "\n")
+        # Calculate the index independently within each group, in parallel
+        with timer.stage("FUSED READ"):
+            indicatorArray = backend.read_columns(nameOfInputShapefile, varList + [groupField])
+        with timer.stage("FUSED GROUPED INDEX", len(indicatorArray)):
+            outputColumns, statistics, groupBreaks = groups.calculate_grouped_index(
+                indicatorArray, indicatorArray[groupField], varList, negList, yearOfData, classificationMethod,
+                classNumber, sampleSize=breaksSampleSize, variants=variants)
+        backend.message("Index calculated separately for " + str(len(statistics) // len(varList)) +
+                        " groups of " + groupField)
+        for groupValue, naturalBreaks in groupBreaks:
+            for breaksMessage in jenks.breaks_messages(naturalBreaks):
+                backend.message(groupField + " " + str(groupValue) + ": " + breaksMessage)
+    elif zScoreStoreFolder:
+        # Reuse stored z-scores; only indicators that are new or whose values changed are read and calculated
+        with timer.stage("FUSED STORED Z-SCORES"):
+            zScoreResults, calculated = zstore.ZScoreStore(zScoreStoreFolder).zscores(
+                nameOfInputShapefile, varList, yearOfData, backend.read_columns)
+        backend.message("Z-scores calculated for " + str(calculated) + "; the others were stored")
+        with timer.stage("FUSED INDEX", len(zScoreResults[varList[0]][2])):
+            outputColumns, statistics, naturalBreaks = pipeline.combine_index(zScoreResults, varList, negList,
+                                                                              yearOfData, classificationMethod,
+                                                                              classNumber, breaksSampleSize, variants)
+    else:
+        with timer.stage("FUSED READ"):
+            indicatorArray = backend.read_columns(nameOfInputShapefile, varList)
+        with timer.stage("FUSED INDEX", len(indicatorArray)):
+            outputColumns, statistics, naturalBreaks = pipeline.calculate_index(indicatorArray, varList, negList,
+                                                                                yearOfData, classificationMethod,
+                                                                                classNumber, breaksSampleSize, variants)
+    if not groupField:
+        for variable, mean, standardDev in statistics:
+            backend.message("The mean value of " + variable + " is " + str(mean) +
+                            " and its standard deviation is " + str(standardDev))
+        if naturalBreaks is not None:
+            for breaksMessage in jenks.breaks_messages(naturalBreaks):
+                backend.message(breaksMessage)
+    recordCount = len(outputColumns["RAWSCR_" + yearOfData])
+
+    # Write the final fields as typed columns keyed by FID
+    if columnarOutput:
+        with timer.stage("COLUMNAR WRITE", recordCount):
+            columnar.write_columns(columnarOutput, outputColumns)
+        backend.message("Columns written to " + columnarOutput + ", keyed by " + columnar.FID_FIELD)
+
+    # Write the final fields to the sidecar table, leaving the geometry where it is
+    if attributeOnly:
+        with timer.stage("SIDECAR WRITE", recordCount):
+            sidecarTable = sidecar.write_sidecar(nameOfOutputShapefile, outputColumns)
+        backend.message("Fields written to " + sidecarTable + "; join it to the input on FID = " + sidecar.SIDECAR_KEY)
+
+    # Replicate the input shapefile, then add and fill only the final fields
+    elif not columnarOnly:
+        with timer.stage("COPY INPUT"):
+            backend.copy(nameOfInputShapefile, nameOfOutputShapefile)
+        with timer.stage("FUSED WRITE", recordCount):
+            backend.write_fields(nameOfOutputShapefile, outputColumns,
+                                 OrderedDict((name, FLOAT_FIELD) for name in outputColumns))
+    backend.message("Fields written: " + str(list(outputColumns.keys())) + "\n")
+
+
+# Create function to run the Streaming processing mode: batched passes whose memory use does not grow with feature count
+def _run_streaming(backend, nameOfInputShapefile, varList, negList, yearOfData, nameOfOutputShapefile,
+                   classificationMethod, classNumber, chunkSize, quantileErrorBound, variants, zScoreStoreFolder,
+                   columnarOutput, timer):
+    backend.message("Calculating index in batches of " + str(chunkSize) + " records (Streaming processing mode)" + "\n")
+    if variants:
+        backend.warning("Classification variants are not calculated in the Streaming processing mode" + "\n")
+    if zScoreStoreFolder:
+        backend.warning("The z-score store is not used in the Streaming processing mode" + "\n")
+    if columnarOutput:
+        backend.warning("Columnar output is not written in the Streaming processing mode" + "\n")
+    featureCount = backend.count_rows(nameOfInputShapefile)
+    streamingIndex = streaming.StreamingIndex(varList, negList, yearOfData, classificationMethod, classNumber,
+                                              quantileErrorBound, featureCount)
+
+    # First read pass: mean and standard deviation of every indicator
+    with timer.stage("STREAMING STATISTICS PASS", featureCount):
+        for chunkValues in backend.read_chunks(nameOfInputShapefile, varList, chunkSize):
+            streamingIndex.add_statistics_chunk(chunkValues)
+    for variable, mean, standardDev in streamingIndex.statistics():
+        backend.message("The mean value of " + variable + " is " + str(mean) +
+                        " and its standard deviation is " + str(standardDev))
+
+    # Second read pass: distribution of the raw score, then the class breaks
+    with timer.stage("STREAMING RAW SCORE PASS", featureCount):
+        for chunkValues in backend.read_chunks(nameOfInputShapefile, varList, chunkSize):
+            streamingIndex.add_raw_score_chunk(chunkValues)
+        breakValueList = streamingIndex.finish_breaks()
+    backend.message("The break values between index groups are " + str(list(breakValueList)))
+    if classificationMethod in ("Quantile", "Natural Breaks"):
+        rankError = streamingIndex.rank_error_bound()
+        backend.message(classificationMethod + " breaks are within " + str(rankError) + " records (" +
+                        str(100.0 * rankError / max(streamingIndex.sketch.count, 1)) +
+                        "% of features) of their exact rank" + "\n")
+
+    # Replicate the input shapefile, then write every output field in one more pass
+    with timer.stage("STREAMING WRITE", featureCount):
+        backend.copy(nameOfInputShapefile, nameOfOutputShapefile)
+        backend.write_streaming_scores(nameOfOutputShapefile, varList, streamingIndex, chunkSize)
+    backend.message("Fields written: " + str(streamingIndex.output_field_names()) + "\n")
+
+
+# Create function to compare the index of two years and analyze the clusters of change (nc-pt2.py)
+def run_change_tool(backend, nameOfInputShapefile1, yearField1, yearField2, yearOfData1, yearOfData2,
+                    nameOfOutputShapefile, clusterEngine="ArcGIS", permutations=499, randomSeed=None,
+                    distanceThreshold=None, weightsCacheFolder="", columnarOutput="", columnarOnly=False,
+                    attributeOnly=False, geometryShapefile="", timer=None):
+    timer = timer or timing.StageRecorder()
+    columnarOnly = columnarOnly and bool(columnarOutput)
+    geometryShapefile = geometryShapefile or nameOfInputShapefile1
+
+    # Report input and output files
+    backend.message('\n' + "The input shapefile name for year 1 is " + nameOfInputShapefile1)
+
+    if clusterEngine != "Native" and backend.name != "arcpy":
+        backend.warning("The ArcGIS engine needs arcpy; clusters and outliers are found with the Native engine")
+        clusterEngine = "Native"
+    if columnarOnly and clusterEngine != "Native" and not attributeOnly:
+        backend.warning("The ArcGIS engine needs the output shapefiles, so they are written as well")
+        columnarOnly = False
+    writeShapefiles = not (columnarOnly or attributeOnly)
+    if attributeOnly:
+        sidecarTable = sidecar.sidecar_path(nameOfOutputShapefile)
+        backend.message("The output attribute table name is " + sidecarTable)
+    elif writeShapefiles:
+        backend.message("The output shapefile name is " + nameOfOutputShapefile)
+    if columnarOutput:
+        backend.message("The columnar output file is " + columnarOutput)
+    backend.message("This is a report for the change in index score for years '" + yearOfData1 + " and '" + yearOfData2 + "\n")
+
+    """ STEPS ONE TO THREE: INDEX CATEGORY SHIFT, RECLASSIFICATION AND REPORT """
+    # Read both index fields once and calculate all three change fields as arrays
+    with timer.stage("STEPS ONE TO THREE: READ"):
+        indexArray = backend.read_columns(nameOfInputShapefile1, [yearField1, yearField2])
+    with timer.stage("STEPS ONE TO THREE: CHANGE", len(indexArray)):
+        changeColumns, reportCodes, reportLabels = change.calculate_change(indexArray[yearField1], indexArray[yearField2],
+                                                                           yearOfData1, yearOfData2)
+    chngeName, reclassName, reportName = change.change_field_names(yearOfData1, yearOfData2)
+
+    backend.message("Change of index score between years '" + str(yearOfData1) + " and '" + str(yearOfData2) + " calculated")
+    backend.message("Positive/No/Negative change reclassification between years '" + str(yearOfData1) + " and '" + str(yearOfData2) + " calculated")
+    backend.message("Index value change between years '" + str(yearOfData1) + " and '" + str(yearOfData2) + " reported (" +
+                    str(len(reportLabels)) + " distinct changes)" + "\n")
+
+    # The ArcGIS engine reads the change from the sidecar; the Native engine writes all of its fields at once
+    if attributeOnly and clusterEngine != "Native":
+        with timer.stage("SIDECAR WRITE", len(indexArray)):
+            sidecar.write_sidecar(sidecarTable, changeColumns)
+
+    # Replicate the input shapefile, then write the three fields in one pass
+    if writeShapefiles:
+        with timer.stage("COPY INPUT"):
+            backend.copy(nameOfInputShapefile1, nameOfOutputShapefile)
+        with timer.stage("STEPS ONE TO THREE: WRITE", len(indexArray)):
+            backend.write_fields(nameOfOutputShapefile, changeColumns,
+                                 {chngeName: FLOAT_FIELD, reclassName: FLOAT_FIELD, reportName: TEXT_FIELD})
+    outputColumns = OrderedDict(changeColumns)
+
+    """ STEP FOUR: SPATIAL ANALYSIS """
+    nameOfOutputShapefile2 = nameOfOutputShapefile[:-4] + "_SA"
+
+    secondOutput = (nameOfOutputShapefile2 + "_rclss")
+
+    if clusterEngine == "Native":
+        # Local Moran's I of the reclassified change, calculated from the feature centroids
+        reclassValues = changeColumns[reclassName]
+        with timer.stage("STEP FOUR: SPATIAL WEIGHTS", len(reclassValues)):
+            spatialWeights, fromCache = weights.cached_inverse_distance_weights(
+                backend.read_centroids(geometryShapefile), float(distanceThreshold) if distanceThreshold else None,
+                cacheFolder=weightsCacheFolder or None)
+        if fromCache:
+            backend.message("Spatial weights loaded from cache")
+        backend.message("Neighbors are features within a distance of " + str(spatialWeights.threshold))
+        with timer.stage("STEP FOUR: LOCAL MORAN'S I", len(reclassValues)):
+            moranColumns = moran.local_morans_i(reclassValues, spatialWeights, permutations,
+                                                int(randomSeed) if randomSeed else None)
+
+        outputColumns.update(moranColumns)
+
+        if attributeOnly:
+            with timer.stage("SIDECAR WRITE", len(reclassValues)):
+                sidecar.write_sidecar(sidecarTable, outputColumns)
+            backend.message("Change, cluster and outlier fields written to " + sidecarTable + "; join it to the input on FID = " +
+                            sidecar.SIDECAR_KEY + "\n")
+
+        # Replicate the output shapefile once and write the cluster and outlier fields
+        elif writeShapefiles:
+            with timer.stage("STEP FOUR: WRITE", len(reclassValues)):
+                backend.copy(nameOfOutputShapefile, secondOutput)
+                backend.write_fields(secondOutput, OrderedDict(moranColumns),
+                                     dict((name, TEXT_FIELD if name == "COType" else FLOAT_FIELD)
+                                          for name, values in moranColumns))
+            backend.message("Cluster and outlier analysis written to " + secondOutput + "\n")
+
+    elif attributeOnly:
+        with timer.stage("STEP FOUR: CLUSTERS AND OUTLIERS", len(indexArray)):
+            # Analyze the geometry joined to the sidecar, without replicating either
+            changeLayer = backend.join_table(geometryShapefile, sidecarTable, sidecar.SIDECAR_KEY, "nc_change_layer")
+            backend.clusters_outliers(changeLayer, backend.joined_field_name(changeLayer, reclassName), secondOutput)
+        backend.message("Cluster and outlier analysis written to " + secondOutput + "\n")
+
+    else:
+        with timer.stage("STEP FOUR: CLUSTERS AND OUTLIERS", len(indexArray)):
+            # Replicate the output shapefile
+            backend.copy(nameOfOutputShapefile, nameOfOutputShapefile2)
+            backend.clusters_outliers(nameOfOutputShapefile2, reclassName, secondOutput)
+
+    # Write the change (and cluster and outlier) fields as typed columns keyed by FID
+    if columnarOutput:
+        with timer.stage("COLUMNAR WRITE", len(indexArray)):
+            columnar.write_columns(columnarOutput, outputColumns)
+        backend.message("Columns " + str(list(outputColumns.keys())) + " written to " + columnarOutput +
+                        ", keyed by " + columnar.FID_FIELD + "\n")
+
+    # Report the time, throughput and memory of each stage
+    if timer.enabled:
+        backend.message("\n" + timer.summary() + "\n")
+
+
+# Create function to calculate the index of several years and the change between them (nc-panel.py)
+def run_panel_tool(backend, nameOfInputShapefile, yearFields, nameOfOutputShapefile, negList, classificationMethod,
+                   classNumber, pairMode="Consecutive", nameOfTransitionTable=""):
+    # Report input and output files
+    backend.message('\n' + "The input shapefile name is " + nameOfInputShapefile)
+    backend.message("The output shapefile name is " + nameOfOutputShapefile)
+    for yearOfData, varList in yearFields.items():
+        backend.message("The variables used as indicators for year '" + yearOfData + " are " + str(varList))
+
+    """ STEP ONE: READ EVERY YEAR'S INDICATORS ONCE """
+    allFields = []
+    for varList in yearFields.values():
+        allFields.extend(field for field in varList if field not in allFields)
+    indicatorArray = backend.read_columns(nameOfInputShapefile, allFields)
+
+    """ STEP TWO: CALCULATE EACH YEAR'S INDEX AND THE CHANGE BETWEEN YEARS """
+    outputColumns, transitions, statistics = panel.calculate_panel(indicatorArray, yearFields, negList,
+                                                                   classificationMethod, classNumber, pairMode)
+    for yearOfData, variable, mean, standardDev in statistics:
+        backend.message("Year '" + yearOfData + ": the mean value of " + variable + " is " + str(mean) +
+                        " and its standard deviation is " + str(standardDev))
+    for (yearOfData1, yearOfData2), counts in transitions.items():
+        backend.message("\n" + "Records moving between index classes from year '" + yearOfData1 +
+                        " (rows) to year '" + yearOfData2 + " (columns):" + "\n" + str(counts))
+
+    """ STEP THREE: WRITE EVERY FIELD IN ONE PASS """
+    backend.copy(nameOfInputShapefile, nameOfOutputShapefile)
+    backend.write_fields(nameOfOutputShapefile, outputColumns,
+                         OrderedDict((name, TEXT_FIELD if name.startswith("RPRT") else FLOAT_FIELD)
+                                     for name in outputColumns))
+    backend.message("\n" + "Fields written: " + str(list(outputColumns.keys())))
+
+    if nameOfTransitionTable:
+        panel.write_transitions(nameOfTransitionTable, transitions)
+        backend.message("Transition matrices written to " + nameOfTransitionTable + "\n")
+
+
+# Create function to measure how stable each record's index class is under perturbation (nc-sensitivity.py)
+def run_sensitivity_tool(backend, nameOfInputShapefile, varList, negList, yearOfData, nameOfOutputShapefile,
+                         classificationMethod, classNumber, replicateCount=1000, perturbation="Weights",
+                         concentration=10.0, noiseScale=0.0, randomSeed=None, breaksSampleSize=None):
+    # Report input and output files
+    backend.message('\n' + "The input shapefile name is " + nameOfInputShapefile)
+    backend.message("The output shapefile name is " + nameOfOutputShapefile)
+    backend.message("The variables used as indicators in the index are " + str(varList))
+    backend.message("Running " + str(replicateCount) + " replicates with " + perturbation + " perturbation" + "\n")
+
+    """ STEP ONE: READ THE INDICATORS ONCE """
+    indicatorArray = backend.read_columns(nameOfInputShapefile, varList)
+    if classificationMethod == "Natural Breaks" and breaksSampleSize and breaksSampleSize < len(indicatorArray):
+        backend.message("Natural breaks are calculated from a sample of " + str(breaksSampleSize) +
+                        " raw scores; with 95% confidence each break is within " +
+                        str(jenks.sample_rank_error_bound(len(indicatorArray), breaksSampleSize)) +
+                        " records of its sampled rank" + "\n")
+
+    """ STEP TWO: CALCULATE THE INDEX AND THE CLASS OF EVERY RECORD IN EVERY REPLICATE """
+    outputColumns, classCounts = sensitivity.calculate_stability(indicatorArray, varList, negList, yearOfData,
+                                                                 classificationMethod, classNumber, replicateCount,
+                                                                 perturbation, concentration, noiseScale, randomSeed,
+                                                                 breaksSampleSize)
+    modeName, modeShareName, indexShareName = sensitivity.stability_field_names(yearOfData)
+    backend.message("On average, records stay in their index class in " +
+                    str(100.0 * outputColumns[indexShareName].mean()) + "% of replicates")
+    backend.message(str((outputColumns[indexShareName] < 0.5).sum()) +
+                    " records leave their index class in most replicates" + "\n")
+
+    """ STEP THREE: WRITE EVERY FIELD IN ONE PASS """
+    backend.copy(nameOfInputShapefile, nameOfOutputShapefile)
+    backend.write_fields(nameOfOutputShapefile, outputColumns,
+                         OrderedDict((name, FLOAT_FIELD) for name in outputColumns))
+    backend.message("Fields written: " + str(list(outputColumns.keys())) + "\n")
@@ -0,0 +1,150 @@
+"""
+SPARSE INVERSE-DISTANCE SPATIAL WEIGHTS BUILT FROM FEATURE CENTROIDS.
+
+Neighbors are the features whose centroids are within a distance threshold of each
+other (Euclidean distance), found with a KD-tree, and each neighbor is weighted by one
+over its distance. The weights are kept in compressed sparse row (CSR) form:
+    indptr      NEIGHBORS OF FEATURE i ARE indices[indptr[i]:indptr[i + 1]]
+    indices     FEATURE NUMBER OF EACH NEIGHBOR
+    weights     WEIGHT OF EACH NEIGHBOR
+When no threshold is given, the default of arcpy's Cluster and Outlier Analysis is
+used: the smallest distance that gives every feature at least one neighbor.
+
+Built weights can be kept in a cache folder, one subfolder of .npy files per layer,
+and are loaded with memory mapping. The cache key is a hash of the centroids the
+weights are built from, the distance method and the threshold, so tract geometry
+that is the same from one run to the next (00 to 10, 10 to 15...) skips the neighbor
+search, and a change to any feature's geometry that moves its centroid makes a new key.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict, namedtuple
+
+import numpy
+
+from ncindex import atomic
+
+SpatialWeights = namedtuple("SpatialWeights", ["indptr", "indices", "weights", "threshold"])
+
+# Number of features compared at once when scipy is not available
+_BLOCK_SIZE = 512
+
+# Distance method of the weights, part of the cache key
+DISTANCE_METHOD = "INVERSE_DISTANCE EUCLIDEAN_DISTANCE"
+
+# Folder used for the weights cache when none is given
+DEFAULT_CACHE_FOLDER = os.environ.get("NCINDEX_CACHE") or os.path.join(os.path.expanduser("~"), ".ncindex", "weights")
+
+
+# Create function to build a KD-tree of the centroids, or None without scipy (imported
+# only when weights are built, because it takes longer to load than the tools take to start)
+def _kd_tree(coordinates):
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        return None
+    return cKDTree(coordinates)
+
+
+# Create function to find the distance that gives every feature at least one neighbor
+def default_threshold(coordinates):
+    tree = _kd_tree(coordinates)
+    if tree is not None:
+        distances, neighbors = tree.query(coordinates, k=2)
+        return float(distances[:, 1].max())
+    nearest = numpy.empty(len(coordinates))
+    for start in range(0, len(coordinates), _BLOCK_SIZE):
+        block = _block_distances(coordinates, start)
+        block[numpy.arange(len(block)), numpy.arange(start, start + len(block))] = numpy.inf
+        nearest[start:start + len(block)] = block.min(axis=1)
+    return float(nearest.max())
+
+
+def _block_distances(coordinates, start):
+    block = coordinates[start:start + _BLOCK_SIZE]
+    return numpy.sqrt(((block[:, None, :] - coordinates[None, :, :]) ** 2).sum(axis=2))
+
+
+# Create function to list every pair of features within the threshold, both directions
+def _neighbor_pairs(coordinates, threshold):
+    tree = _kd_tree(coordinates)
+    if tree is not None:
+        pairs = tree.query_pairs(threshold, output_type="ndarray")
+        distances = numpy.sqrt(((coordinates[pairs[:, 0]] - coordinates[pairs[:, 1]]) ** 2).sum(axis=1))
+        return (numpy.concatenate([pairs[:, 0], pairs[:, 1]]),
+                numpy.concatenate([pairs[:, 1], pairs[:, 0]]),
+                numpy.concatenate([distances, distances]))
+
+    # Without scipy, compare blocks of features against all others (O(n^2) time, bounded memory)
+    rows, columns, distances = [], [], []
+    for start in range(0, len(coordinates), _BLOCK_SIZE):
+        block = _block_distances(coordinates, start)
+        blockRows, blockColumns = numpy.nonzero(block <= threshold)
+        blockRows = blockRows + start
+        notSelf = blockRows != blockColumns
+        rows.append(blockRows[notSelf])
+        columns.append(blockColumns[notSelf])
+        distances.append(block[blockRows[notSelf] - start, blockColumns[notSelf]])
+    return numpy.concatenate(rows), numpy.concatenate(columns), numpy.concatenate(distances)
+
+
+# Create function to build inverse-distance weights from an (n, 2) array of centroids
+def inverse_distance_weights(coordinates, threshold=None, rowStandardize=False):
+    coordinates = numpy.asarray(coordinates, dtype=numpy.float64)
+    if threshold is None:
+        threshold = default_threshold(coordinates)
+    rows, columns, distances = _neighbor_pairs(coordinates, threshold)
+
+    # Coincident features get the weight of the closest distinct neighbor pair
+    positive = distances[distances > 0]
+    distances = numpy.where(distances > 0, distances, positive.min() if len(positive) else 1.0)
+
+    # Sort the pairs by feature to build the CSR arrays
+    pairOrder = numpy.lexsort((columns, rows))
+    rows, columns, weights = rows[pairOrder], columns[pairOrder], 1.0 / distances[pairOrder]
+    indptr = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(rows, minlength=len(coordinates)))])
+    if rowStandardize:
+        weights = weights / numpy.bincount(rows, weights, minlength=len(coordinates))[rows]
+    return SpatialWeights(indptr.astype(numpy.int64), columns.astype(numpy.int64), weights, float(threshold))
+
+
+# Create function to calculate the weighted sum of neighbor values for every feature
+def spatial_lag(spatialWeights, values):
+    featureNumbers = numpy.repeat(numpy.arange(len(spatialWeights.indptr) - 1), numpy.diff(spatialWeights.indptr))
+    return numpy.bincount(featureNumbers, spatialWeights.weights * values[spatialWeights.indices],
+                          minlength=len(spatialWeights.indptr) - 1)
+
+
+# Create function to hash the centroids, distance method and threshold of a set of weights
+def weights_fingerprint(coordinates, threshold=None, rowStandardize=False):
+    coordinates = numpy.ascontiguousarray(coordinates, dtype=numpy.float64)
+    fingerprint = hashlib.sha1(coordinates.tobytes())
+    fingerprint.update(json.dumps([len(coordinates), DISTANCE_METHOD, threshold, bool(rowStandardize)]).encode("utf-8"))
+    return fingerprint.hexdigest()
+
+
+# Create function to load weights from the cache, building and saving them on a cache miss
+def cached_inverse_distance_weights(coordinates, threshold=None, rowStandardize=False, cacheFolder=None):
+    """Return (weights, True if they came from the cache)."""
+    cacheEntry = os.path.join(cacheFolder or DEFAULT_CACHE_FOLDER,
+                              weights_fingerprint(coordinates, threshold, rowStandardize))
+    if os.path.exists(os.path.join(cacheEntry, "threshold.json")):
+        with open(os.path.join(cacheEntry, "threshold.json")) as thresholdFile:
+            cachedThreshold = json.load(thresholdFile)
+        return SpatialWeights(numpy.load(os.path.join(cacheEntry, "indptr.npy"), mmap_mode="r"),
+                              numpy.load(os.path.join(cacheEntry, "indices.npy"), mmap_mode="r"),
+                              numpy.load(os.path.join(cacheEntry, "weights.npy"), mmap_mode="r"),
+                              cachedThreshold), True
+
+    spatialWeights = inverse_distance_weights(coordinates, threshold, rowStandardize)
+
+    # Feature numbers fit in 32 bits for any realistic layer, halving the file size; the
+    # entry is renamed into place, so a failed or concurrent run never leaves half of one
+    indexType = numpy.int32 if len(coordinates) < 2 ** 31 else numpy.int64
+    atomic.save_entry_folder(cacheEntry, OrderedDict([("indptr", spatialWeights.indptr),
+                                                      ("indices", spatialWeights.indices.astype(indexType)),
+                                                      ("weights", spatialWeights.weights)]),
+                             {"threshold.json": spatialWeights.threshold})
+    return spatialWeights, False
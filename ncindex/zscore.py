@@ -0,0 +1,26 @@
+"""
+VECTORIZED Z-SCORES FOR THE INDEX INDICATORS.
+
+Each indicator column is read into an array once; its mean and standard deviation are
+found with one pass over that array and every z-score is calculated in bulk. The
+standard deviation is the sample (n - 1) standard deviation, which is the convention
+used by the STD statistic of arcpy.Statistics_analysis.
+"""
+
+import numpy
+
+
+def calculate_zscores(values):
+    """Return (mean, standard deviation, z-scores) for one indicator column."""
+    values = numpy.asarray(values, dtype=numpy.float64)
+
+    # Calculate sample mean and sample standard deviation
+    mean = values.mean()
+    standardDev = values.std(ddof=1)
+    if not standardDev > 0:
+        raise ValueError("indicator has a standard deviation of " + str(standardDev) +
+                         ", so its z-score cannot be calculated")
+
+    # Calculate every z-score at once
+    zScores = (values - mean) / standardDev
+    return mean, standardDev, zScores
@@ -0,0 +1,118 @@
+"""
+MEMO STORE OF PER-INDICATOR Z-SCORES.
+
+The mean, standard deviation and z-scores of an indicator are saved in a store folder
+and reused by later runs, so adding an indicator to the index, or choosing other
+negated indicators, only calculates what is new. Two kinds of entries are kept:
+    TABLE ENTRIES     HASH OF THE TABLE'S .dbf CONTENT -> HASH OF EACH FIELD'S VALUES
+    Z-SCORE ENTRIES   (HASH OF THE FIELD'S VALUES, FIELD NAME, YEAR) -> MEAN, STANDARD
+                      DEVIATION AND Z-SCORES (.npy, LOADED WITH MEMORY MAPPING)
+When the .dbf is unchanged, the stored fields are not even read from the table. When
+it has changed, the fields are read and hashed, and only those whose values changed
+are calculated again. Z-scores are stored before negation: negation is a change of
+sign applied when the index is combined (pipeline.combine_index), so it never makes a
+z-score stale. Tables without a .dbf (geodatabase tables) skip the table entries.
+
+Entries are written into a temporary folder and renamed into place, as in the spatial
+weights cache, so a failed or concurrent run never leaves a half-written entry.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy
+
+from ncindex import atomic, zscore
+from ncindex.dbf import dbf_path
+
+# Folder used for the store when none is given
+DEFAULT_STORE_FOLDER = os.environ.get("NCINDEX_ZSCORES") or os.path.join(os.path.expanduser("~"), ".ncindex", "zscores")
+
+# Bytes hashed at a time
+_HASH_BLOCK = 16 * 1024 * 1024
+
+
+# Create function to hash the attribute content of a table (its .dbf), or None without one
+def table_fingerprint(table):
+    dbfFile = dbf_path(table)
+    if not os.path.isfile(dbfFile):
+        return None
+    fingerprint = hashlib.sha1()
+    with open(dbfFile, "rb") as dbfContent:
+        for block in iter(lambda: dbfContent.read(_HASH_BLOCK), b""):
+            fingerprint.update(block)
+    return fingerprint.hexdigest()
+
+
+# Create function to hash the values of one field
+def column_fingerprint(values):
+    return hashlib.sha1(numpy.ascontiguousarray(values, dtype=numpy.float64).tobytes()).hexdigest()
+
+
+# Create function to write an entry folder atomically
+def _save_entry(entryFolder, arrays, metadata):
+    # A table entry grows as new fields are stored, so an old one is replaced
+    atomic.save_entry_folder(entryFolder, arrays, {"entry.json": metadata}, replace=True)
+
+
+class ZScoreStore(object):
+    """Stored z-scores of indicator fields, keyed by content hash, field name and year."""
+
+    def __init__(self, storeFolder=None):
+        self.storeFolder = storeFolder or DEFAULT_STORE_FOLDER
+
+    def _table_entry(self, tableHash):
+        return os.path.join(self.storeFolder, "tables", tableHash)
+
+    def _zscore_entry(self, columnHash, variable, yearOfData):
+        entryName = hashlib.sha1(json.dumps([columnHash, variable, yearOfData]).encode("utf-8")).hexdigest()
+        return os.path.join(self.storeFolder, "zscores", entryName)
+
+    def _load_zscores(self, columnHash, variable, yearOfData):
+        entryFolder = self._zscore_entry(columnHash, variable, yearOfData)
+        if not os.path.exists(os.path.join(entryFolder, "entry.json")):
+            return None
+        with open(os.path.join(entryFolder, "entry.json")) as metadataFile:
+            metadata = json.load(metadataFile)
+        return metadata["mean"], metadata["std"], numpy.load(os.path.join(entryFolder, "zscores.npy"), mmap_mode="r")
+
+    # Create function to return the z-scores of every variable, calculating only what is not stored
+    def zscores(self, table, varList, yearOfData, readColumns):
+        """Return (zScoreResults, calculated).
+
+        zScoreResults maps each variable to its (mean, standard deviation, z-scores) as
+        pipeline.combine_index expects, and calculated lists the variables whose
+        z-scores were not in the store. readColumns(table, fields) reads fields into a
+        structured array (arcio.read_columns or dbf.read_columns).
+        """
+        tableHash = table_fingerprint(table)
+        columnHashes = {}
+        if tableHash is not None and os.path.exists(os.path.join(self._table_entry(tableHash), "entry.json")):
+            with open(os.path.join(self._table_entry(tableHash), "entry.json")) as metadataFile:
+                columnHashes = json.load(metadataFile)
+
+        zScoreResults = OrderedDict()
+        for variable in varList:
+            if variable in columnHashes:
+                zScoreResults[variable] = self._load_zscores(columnHashes[variable], variable, yearOfData)
+
+        # Read the fields the table entry does not know (or whose z-scores are gone)
+        calculated = []
+        unknownFields = [variable for variable in varList if zScoreResults.get(variable) is None]
+        if unknownFields:
+            indicatorArray = readColumns(table, unknownFields)
+            for variable in unknownFields:
+                columnHashes[variable] = column_fingerprint(indicatorArray[variable])
+                zScoreResults[variable] = self._load_zscores(columnHashes[variable], variable, yearOfData)
+                if zScoreResults[variable] is None:
+                    mean, standardDev, zScores = zscore.calculate_zscores(indicatorArray[variable])
+                    _save_entry(self._zscore_entry(columnHashes[variable], variable, yearOfData),
+                                {"zscores": zScores}, {"mean": mean, "std": standardDev})
+                    zScoreResults[variable] = (mean, standardDev, zScores)
+                    calculated.append(variable)
+            if tableHash is not None:
+                _save_entry(self._table_entry(tableHash), {}, columnHashes)
+
+        return OrderedDict((variable, zScoreResults[variable]) for variable in varList), calculated
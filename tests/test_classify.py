@@ -0,0 +1,45 @@
+"""
+TESTS OF THE INDEX CLASSIFICATION (ncindex/classify.py, ncindex/pipeline.py).
+
+    python -m pytest tests
+"""
+
+import unittest
+
+import numpy
+
+from ncindex import classify, pipeline
+
+
+class VariantsTest(unittest.TestCase):
+    """Classification variants are extra fields; they never change INDEX."""
+
+    def setUp(self):
+        random = numpy.random.RandomState(5)
+        self.zScoreResults = dict((variable, (0.0, 1.0, random.standard_normal(20000)))
+                                  for variable in ("POV10", "VAC10", "INC10"))
+
+    # Create function to calculate the index fields with the given variants
+    def index_columns(self, classificationMethod, classNumber, sampleSize, variants):
+        return pipeline.combine_index(self.zScoreResults, ["POV10", "VAC10", "INC10"], ["VAC10"], "10",
+                                      classificationMethod, classNumber, sampleSize, variants)
+
+    def test_index_is_identical_with_and_without_variants(self):
+        variants = [("Quantile", 4), ("Natural Breaks", 3), ("Equal Interval", 5)]
+        for classificationMethod, sampleSize in [("Natural Breaks", 500), ("Natural Breaks", None),
+                                                 ("Quantile", None), ("Equal Interval", None)]:
+            columns, statistics, naturalBreaks = self.index_columns(classificationMethod, 6, sampleSize, [])
+            variantColumns, statistics, variantBreaks = self.index_columns(classificationMethod, 6, sampleSize, variants)
+            numpy.testing.assert_array_equal(columns["INDEX_10"], variantColumns["INDEX_10"])
+            if naturalBreaks is not None:
+                numpy.testing.assert_array_equal(naturalBreaks.breakValues, variantBreaks.breakValues)
+
+    def test_natural_breaks_variant_matches_its_own_index(self):
+        rawScores = numpy.random.RandomState(6).standard_normal(20000)
+        variantClasses = classify.classify_variants(rawScores, [("Quantile", 6), ("Natural Breaks", 4)], 500)
+        numpy.testing.assert_array_equal(variantClasses[1],
+                                         classify.classify_scores(rawScores, "Natural Breaks", 4, 500))
+
+
+if __name__ == "__main__":
+    unittest.main()
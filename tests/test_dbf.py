@@ -0,0 +1,69 @@
+"""
+TESTS OF THE MEMORY-MAPPED DBF READER AND WRITER (ncindex/dbf.py).
+
+    python -m pytest tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy
+
+from ncindex import dbf
+from ncindex.fields import FLOAT_FIELD, TEXT_FIELD
+
+COUNTIES = [u"Doña Ana", u"Bernalillo", u"Doña Ana"]
+
+
+class TableEncodingTest(unittest.TestCase):
+    """Text is decoded with the table's .cpg, its language driver byte, or latin-1."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.table = os.path.join(self.folder, "counties.dbf")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    # Create function to write a table of latin-1 text with no .cpg, like most older shapefiles
+    def write_latin1_table(self, languageDriver=0):
+        dbf.create_table(self.table, OrderedDict([("A", numpy.arange(3.0)), ("CNTY", numpy.array(COUNTIES))]),
+                         {"A": FLOAT_FIELD, "CNTY": TEXT_FIELD}, encoding="latin-1")
+        os.remove(os.path.join(self.folder, "counties.cpg"))
+        with open(self.table, "r+b") as table:
+            table.seek(29)
+            table.write(bytearray([languageDriver]))
+
+    def test_text_without_code_page_is_latin1(self):
+        self.write_latin1_table()
+        self.assertEqual(dbf.table_encoding(self.table), "iso8859-1")
+        self.assertEqual(list(dbf.read_columns(self.table, ["CNTY"])["CNTY"]), COUNTIES)
+
+    def test_language_driver_names_the_code_page(self):
+        self.write_latin1_table(0x57)
+        self.assertEqual(dbf.table_encoding(self.table), "cp1252")
+        self.assertEqual(list(dbf.read_columns(self.table, ["CNTY"])["CNTY"]), COUNTIES)
+
+    def test_code_page_file_wins(self):
+        self.write_latin1_table(0x57)
+        for codePage, encoding in [("UTF-8", "utf-8"), ("65001", "utf-8"), ("ANSI 1251", "cp1251"),
+                                   ("88591", "iso8859-1"), ("unknown", "cp1252")]:
+            with open(os.path.join(self.folder, "counties.cpg"), "w") as codePageFile:
+                codePageFile.write(codePage + "\n")
+            self.assertEqual(dbf.table_encoding(self.table), encoding)
+
+    def test_new_text_fields_keep_the_table_encoding(self):
+        self.write_latin1_table()
+        dbf.write_columns(self.table, OrderedDict([("NAME", numpy.array(COUNTIES[::-1]))]), {"NAME": TEXT_FIELD})
+        columns = dbf.read_columns(self.table, ["CNTY", "NAME"])
+        self.assertEqual(list(columns["CNTY"]), COUNTIES)
+        self.assertEqual(list(columns["NAME"]), COUNTIES[::-1])
+        dbf.write_rows(self.table, 1, OrderedDict([("NAME", numpy.array([u"Santa Fé"]))]))
+        self.assertEqual(dbf.read_columns(self.table, ["NAME"])["NAME"][1], u"Santa Fé")
+
+
+if __name__ == "__main__":
+    unittest.main()
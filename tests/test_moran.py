@@ -0,0 +1,68 @@
+"""
+TESTS OF THE NATIVE LOCAL MORAN'S I (ncindex/moran.py).
+
+    python -m pytest tests
+"""
+
+import unittest
+
+import numpy
+
+from ncindex import moran, weights
+
+
+# Create function to build the weights of a grid of points one unit apart
+def grid_weights(columns, rows, threshold):
+    coordinates = numpy.array([(x, y) for x in range(columns) for y in range(rows)], dtype=numpy.float64)
+    return weights.inverse_distance_weights(coordinates, threshold)
+
+
+class TiedDiscreteFieldTest(unittest.TestCase):
+    """A -1/0/1 field like RCLSS, where most permutations tie the observed Local Moran's I."""
+
+    def test_random_field_is_rarely_significant(self):
+        values = numpy.random.RandomState(3).randint(-1, 2, 500)
+        pValues = dict(moran.local_morans_i(values, grid_weights(25, 20, 1.0), 999, seed=1, processes=1))["LMiPValue"]
+        # About 5% of spatially random features are significant at 0.05, not 15%
+        self.assertLess((pValues < 0.05).sum(), 40)
+
+    def test_tied_feature_is_not_significant(self):
+        # A feature at the mean has I = 0, as has every permutation
+        values = numpy.repeat([0.0, -1.0, 1.0], [34, 33, 33])
+        numpy.random.RandomState(4).shuffle(values[1:])
+        pValues = dict(moran.local_morans_i(values, grid_weights(10, 10, 1.5), 199, seed=1, processes=1))["LMiPValue"]
+        self.assertEqual(pValues[0], 1.0)
+
+
+class DenseNeighborhoodTest(unittest.TestCase):
+    """Neighbors are drawn without replacement even when nearly every feature is a neighbor."""
+
+    def test_complete_graph(self):
+        spatialWeights = grid_weights(12, 10, 100.0)
+        self.assertEqual(numpy.diff(spatialWeights.indptr).min(), 119)
+        values = numpy.random.RandomState(5).randint(-1, 2, 120)
+        pValues = dict(moran.local_morans_i(values, spatialWeights, 99, seed=1, processes=1))["LMiPValue"]
+        self.assertTrue(((pValues > 0) & (pValues <= 1)).all())
+
+    def test_draws_are_distinct(self):
+        draws = moran._draw_distinct(numpy.random.RandomState(6), 50, 20, 40)
+        self.assertTrue(all(len(set(row)) == 40 for row in draws))
+        self.assertTrue((draws >= 0).all() and (draws < 50).all())
+
+
+class ArcGISScalingTest(unittest.TestCase):
+    """LMiIndex is scaled by S_i^2, the variance of the other n - 1 features, as in ArcGIS."""
+
+    def test_local_morans_i_matches_hand_computed_values(self):
+        # Mean 3, deviations -2, -1, 0, 3; S_i^2 = (14 - deviation_i^2) / 3
+        values = numpy.array([1.0, 2.0, 3.0, 6.0])
+        spatialWeights = weights.SpatialWeights(numpy.array([0, 1, 2, 3, 5]), numpy.array([1, 0, 3, 1, 2]),
+                                                numpy.array([1.0, 1.0, 1.0, 0.5, 0.5]), 1.0)
+        localI = dict(moran.local_morans_i(values, spatialWeights, 9, seed=1, processes=1))["LMiIndex"]
+        # Feature 0: -2 / (10 / 3) * -1; feature 1: -1 / (13 / 3) * -2; feature 2: 0;
+        # feature 3: 3 / (5 / 3) * (0.5 * -1 + 0.5 * 0)
+        numpy.testing.assert_allclose(localI, [0.6, 6.0 / 13.0, 0.0, -0.9])
+
+
+if __name__ == "__main__":
+    unittest.main()